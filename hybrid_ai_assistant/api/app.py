@@ -1,24 +1,42 @@
-from flask import Flask, request, jsonify
-from hybrid_ai_assistant.orchestrator.graph import compiled_graph
+import json
+import threading
+import uuid
+from flask import Flask, Response, request, jsonify
+from hybrid_ai_assistant.orchestrator.graph import get_graph
 from hybrid_ai_assistant.state.state import ProjectState
+from hybrid_ai_assistant.api.jobs import JobManager, QueueFull, JobConflict, ACTIVE_STATUSES
+from hybrid_ai_assistant.api.events import EventLog
+from hybrid_ai_assistant.state import blobs
+from hybrid_ai_assistant.utils.sandbox import get_sandbox
+from hybrid_ai_assistant.utils.instrumentation import registry
+from pydantic_core import to_jsonable_python
 
 app = Flask(__name__)
 
-# Basic storage for run IDs if needed, but client should track them
-# For demo, the client sends run_id
+# Graph runs execute on a bounded worker pool so requests return immediately.
+# The client tracks the run_id returned by /start.
+events = EventLog()
+jobs = JobManager(events=events)
+# In the background: importing the Docker SDK and reaching the daemon shouldn't hold up importing the app
+threading.Thread(target=get_sandbox().warm, name="sandbox-warm", daemon=True).start()
+
+# Seconds between SSE keep-alive comments while a run is quiet
+STREAM_HEARTBEAT = 15
+
+def _queue_full(e):
+    response = jsonify({"error": str(e)})
+    response.headers["Retry-After"] = "5"
+    return response, 429
 
 @app.route('/start', methods=['POST'])
 def start():
     objective = request.json.get('objective')
     if not objective:
         return jsonify({"error": "Objective required"}), 400
-        
-    # Start graph
+
     # config needs a thread_id for persistence
-    import uuid
     thread_id = str(uuid.uuid4())
-    config = {"configurable": {"thread_id": thread_id}}
-    
+
     initial_state = {
         "objective": objective,
         "logs": [],
@@ -26,55 +44,154 @@ def start():
         "file_system_state": {},
         "run_id": thread_id
     }
-    
-    # Invoke until interrupt
-    # invoke returns the final state of that step
-    # We want to run it until it hits interrupt
-    # We can use stream or just invoke. 
-    # Since it is async/interruptible, invoke might return early if interrupted?
-    # LangGraph invoke runs until end or interruption.
-    
-    result = compiled_graph.invoke(initial_state, config=config)
-    
-    return jsonify({"run_id": thread_id, "status": "started"})
+
+    # Queued; a worker runs the graph until it ends or hits the human_selection interrupt
+    try:
+        jobs.submit(thread_id, initial_state)
+    except QueueFull as e:
+        return _queue_full(e)
+
+    return jsonify({"run_id": thread_id, "status": "queued"}), 202
+
+def _sync_events(run_id):
+    # Thread and async workers publish events live. Otherwise (process workers, or a run
+    # from before a restart) catch up on new log lines from the checkpoint.
+    if jobs.live_events and events.has(run_id):
+        return True
+    state = get_graph().get_state({"configurable": {"thread_id": run_id}})
+    if not state.values:
+        # No checkpoint yet: still queued, its first node is running, or it was
+        # cancelled or failed before writing one. The job manager still knows it.
+        return events.has(run_id) or jobs.get(run_id) is not None
+    logs = state.values.get("logs", [])
+    seen = events.log_count(run_id)
+    if len(logs) > seen or not events.has(run_id):
+        events.publish(run_id, {"type": "logs", "logs": logs[seen:]})
+    return True
 
 @app.route('/poll/<run_id>', methods=['GET'])
 def poll(run_id):
+    since = request.args.get('since', type=int)
+    if since is not None:
+        # Incremental variant: only the events after the client's cursor
+        if not _sync_events(run_id):
+            return jsonify({"status": "not_found"})
+        return jsonify({
+            "status": jobs.status(run_id),
+            "events": events.read(run_id, since),
+            "cursor": events.cursor(run_id),
+        })
+
+    job_status = jobs.status(run_id)
+    if job_status in ACTIVE_STATUSES:
+        return jsonify({"status": job_status})
+
     config = {"configurable": {"thread_id": run_id}}
-    state = compiled_graph.get_state(config)
-    
-    if not state.values:
+    state = get_graph().get_state(config)
+    current_values = state.values
+
+    # Checked first: a job cancelled while queued, or one that failed before its
+    # first node finished, has no checkpoint
+    if job_status in ("failed", "cancelled"):
+        job = jobs.get(run_id)
+        return jsonify({"status": job_status, "error": job.error, "logs": current_values.get("logs", [])})
+
+    if not current_values:
         return jsonify({"status": "not_found"})
 
-    current_values = state.values
-    if current_values.get("plan_options"):
-        # We are at selection phase or past it
-        return jsonify({"options": [opt.dict() for opt in current_values["plan_options"]]})
-    
-    return jsonify({"status": "running", "logs": current_values.get("logs", [])})
+    # Pending nodes with no active job means the graph stopped at an interrupt
+    status = "interrupted" if state.next else "completed"
+    if current_values.get("plan_options") and not current_values.get("selected_plan"):
+        # We are at selection phase
+        options = blobs.load(current_values["plan_options"])
+        return jsonify({"status": status, "options": [opt.dict() for opt in options]})
+
+    return jsonify({"status": status, "logs": current_values.get("logs", [])})
+
+@app.route('/stream/<run_id>', methods=['GET'])
+def stream(run_id):
+    # Server-Sent Events: per-node completions and new log lines as they happen.
+    # Resume with ?since=<cursor> or Last-Event-ID. The stream ends with the
+    # job's status event; reconnect after /select to follow the resumed run.
+    since = request.args.get('since', type=int)
+    if since is None:
+        since = int(request.headers.get('Last-Event-ID') or 0)
+    if not _sync_events(run_id):
+        return jsonify({"error": "Run not found"}), 404
+
+    live = jobs.live_events
+
+    def generate(cursor):
+        while True:
+            batch = events.wait(run_id, cursor, timeout=STREAM_HEARTBEAT if live else 1)
+            if not batch and not live:
+                _sync_events(run_id)
+                batch = events.read(run_id, cursor)
+            if not batch:
+                if jobs.status(run_id) not in ACTIVE_STATUSES:
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            for event in batch:
+                cursor = event["seq"]
+                yield f"id: {cursor}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                # An older status event may precede a resumed job; only stop once nothing is running
+                if event["type"] == "status" and jobs.status(run_id) not in ACTIVE_STATUSES:
+                    return
+
+    return Response(generate(since), mimetype='text/event-stream', headers={"Cache-Control": "no-cache"})
 
 @app.route('/select/<run_id>', methods=['POST'])
 def select(run_id):
     option_id = request.json.get('option_id')
+    if jobs.status(run_id) in ACTIVE_STATUSES:
+        return jsonify({"error": "Run is still in progress"}), 409
+
     config = {"configurable": {"thread_id": run_id}}
-    state_snapshot = compiled_graph.get_state(config)
-    
+    state_snapshot = get_graph().get_state(config)
+
     if not state_snapshot.values:
          return jsonify({"error": "Run not found"}), 404
-         
-    options = state_snapshot.values.get("plan_options")
-    if not options or option_id >= len(options):
+
+    options = blobs.load(state_snapshot.values.get("plan_options"))
+    if not options or option_id is None or not 0 <= option_id < len(options):
         return jsonify({"error": "Invalid option"}), 400
 
     # Update state
     selected = options[option_id]
-    compiled_graph.update_state(config, {"selected_plan": selected})
-    
-    # Resume
-    # To resume, we invoke again with None input (or specific input), using same config
-    compiled_graph.invoke(None, config=config)
-    
-    return jsonify({"status": "resumed"})
+    get_graph().update_state(config, {"selected_plan": selected})
+
+    # Resume: invoking with None input continues from the checkpoint for this thread
+    try:
+        jobs.submit(run_id, None)
+    except QueueFull as e:
+        return _queue_full(e)
+    except JobConflict as e:
+        return jsonify({"error": str(e)}), 409
+
+    return jsonify({"run_id": run_id, "status": "queued"}), 202
+
+@app.route('/blobs/<digest>', methods=['GET'])
+def get_blob(digest):
+    # Full values behind the references kept in state and in "[blob:<digest>]" log lines
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        return jsonify({"error": "Invalid blob id"}), 400
+    try:
+        value = blobs.load({blobs.REF_KEY: digest})
+    except (KeyError, FileNotFoundError):
+        return jsonify({"error": "Blob not found"}), 404
+    return jsonify({"blob": digest, "value": to_jsonable_python(value)})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Prometheus text format. With JOB_WORKER_KIND=process, calls made in worker processes aren't included.
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/cancel/<run_id>', methods=['POST'])
+def cancel(run_id):
+    if not jobs.cancel(run_id):
+        return jsonify({"error": "No cancellable job for this run"}), 404
+    return jsonify({"run_id": run_id, "status": jobs.status(run_id)})
 
 if __name__ == '__main__':
-    app.run(port=5000)
+    app.run(port=5000, threaded=True)
@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+
+class EventLog:
+    """In-memory, per-run event buffer read with a cursor.
+
+    Every event gets a per-run sequence number starting at 1; readers pass the
+    last sequence number they saw and get everything after it. Only the most
+    recent max_events per run and max_runs runs are kept.
+    """
+
+    def __init__(self, max_runs=1000, max_events=5000):
+        self.max_runs = max_runs
+        self.max_events = max_events
+        self._runs = OrderedDict()  # run_id -> {"events": [...], "seq": int, "log_count": int}
+        self._cond = threading.Condition()
+
+    def publish(self, run_id, event):
+        with self._cond:
+            run = self._runs.get(run_id)
+            if run is None:
+                run = self._runs[run_id] = {"events": [], "seq": 0, "log_count": 0}
+                while len(self._runs) > self.max_runs:
+                    self._runs.popitem(last=False)
+            run["seq"] += 1
+            event = dict(event, seq=run["seq"])
+            run["events"].append(event)
+            run["log_count"] += len(event.get("logs", []))
+            if len(run["events"]) > self.max_events:
+                del run["events"][: len(run["events"]) - self.max_events]
+            self._cond.notify_all()
+            return event
+
+    def has(self, run_id):
+        return run_id in self._runs
+
+    def log_count(self, run_id):
+        run = self._runs.get(run_id)
+        return run["log_count"] if run else 0
+
+    def cursor(self, run_id):
+        run = self._runs.get(run_id)
+        return run["seq"] if run else 0
+
+    def read(self, run_id, since=0):
+        with self._cond:
+            return self._read(run_id, since)
+
+    def wait(self, run_id, since=0, timeout=None):
+        """Like read(), but block up to timeout seconds for something new."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.cursor(run_id) > since, timeout=timeout)
+            return self._read(run_id, since)
+
+    def _read(self, run_id, since):
+        run = self._runs.get(run_id)
+        if run is None:
+            return []
+        return [e for e in run["events"] if e["seq"] > since]
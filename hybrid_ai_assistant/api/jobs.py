@@ -0,0 +1,227 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils.aio import new_event_loop
+
+class QueueFull(Exception):
+    """Raised when admitting another job would exceed the queue depth limit."""
+
+class JobConflict(Exception):
+    """Raised when a run already has a queued or running job."""
+
+ACTIVE_STATUSES = ("queued", "running", "cancelling")
+
+def run_graph(graph_input, thread_id, cancel_event=None, on_event=None):
+    """Drive the graph for one thread until it finishes or hits an interrupt.
+
+    Runs in a worker thread or process and returns "interrupted", "done" or
+    "cancelled". Cancellation is cooperative: the flag is checked after every
+    node, so the node in flight always completes and its checkpoint is kept.
+    on_event receives the per-node events from orchestrator.events.
+    """
+    from hybrid_ai_assistant.orchestrator.graph import get_graph
+    from hybrid_ai_assistant.orchestrator.events import node_events
+    compiled_graph = get_graph()
+    run_config = {"configurable": {"thread_id": thread_id}}
+
+    if graph_input is None:
+        # Resuming: only lines added after the checkpoint are new
+        logs = compiled_graph.get_state(run_config).values.get("logs", [])
+    else:
+        logs = graph_input.get("logs", [])
+
+    for event in node_events(compiled_graph.stream(graph_input, config=run_config), logs):
+        if on_event is not None:
+            on_event(event)
+        if cancel_event is not None and cancel_event.is_set():
+            return "cancelled"
+    return "interrupted" if compiled_graph.get_state(run_config).next else "done"
+
+async def arun_graph(graph_input, thread_id, cancel_event=None, on_event=None):
+    """run_graph for the async graph: drives astream on the job runner's event loop."""
+    from hybrid_ai_assistant.orchestrator.graph import aget_graph
+    from hybrid_ai_assistant.orchestrator.events import anode_events
+    graph = await aget_graph()
+    run_config = {"configurable": {"thread_id": thread_id}}
+
+    if graph_input is None:
+        logs = (await graph.aget_state(run_config)).values.get("logs", [])
+    else:
+        logs = graph_input.get("logs", [])
+
+    async for event in anode_events(graph.astream(graph_input, config=run_config), logs):
+        if on_event is not None:
+            on_event(event)
+        if cancel_event is not None and cancel_event.is_set():
+            return "cancelled"
+    return "interrupted" if (await graph.aget_state(run_config)).next else "done"
+
+class AsyncExecutor:
+    """Runs coroutine functions as tasks on one event loop in a background thread.
+
+    submit() has the ThreadPoolExecutor signature and returns a
+    concurrent.futures.Future, so JobManager treats both alike. At most
+    max_workers tasks run at once; the rest stay pending and cancellable.
+    """
+
+    def __init__(self, max_workers):
+        self.loop = new_event_loop()
+        self._slots = asyncio.Semaphore(max_workers)  # Binds to self.loop on first use
+        self._thread = threading.Thread(target=self.loop.run_forever, name="graph-async", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args):
+        future = Future()
+
+        async def run():
+            async with self._slots:
+                if not future.set_running_or_notify_cancel():
+                    return  # Cancelled while waiting for a slot
+                try:
+                    future.set_result(await fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+
+        asyncio.run_coroutine_threadsafe(run(), self.loop)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        async def stop():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            if cancel_futures:
+                for task in tasks:
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.loop.is_running():
+            done = asyncio.run_coroutine_threadsafe(stop(), self.loop)
+            if wait:
+                done.result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+class Job:
+    def __init__(self, run_id, future=None):
+        self.run_id = run_id
+        self.future = future
+        self.cancel_event = threading.Event()
+        self.submitted_at = time.time()
+
+    @property
+    def status(self):
+        f = self.future
+        if f.cancelled():
+            return "cancelled"
+        if f.running():
+            return "cancelling" if self.cancel_event.is_set() else "running"
+        if not f.done():
+            return "queued"
+        if f.exception() is not None:
+            return "failed"
+        return f.result()
+
+    @property
+    def error(self):
+        f = self.future
+        if f.done() and not f.cancelled() and f.exception() is not None:
+            return str(f.exception())
+        return None
+
+class JobManager:
+    """Bounded worker pool for graph runs, keyed by run id.
+
+    kind is "thread", "process" or "async". Async jobs are tasks on one
+    event loop driving the async graph (see AsyncExecutor), so max_workers can
+    be in the hundreds. Queued jobs can always be cancelled; running jobs can
+    only be cancelled in thread and async mode, since the cancel flag can't be
+    shared with a worker process. Likewise, per-node events are only
+    published to events live in thread and async mode; every job publishes a
+    final {"type": "status"} event when it ends.
+    """
+
+    def __init__(self, max_workers=None, max_queue=None, kind=None, max_history=1000, events=None):
+        self.kind = kind or config.JOB_WORKER_KIND
+        self.max_workers = max_workers or (config.JOB_ASYNC_MAX_RUNS if self.kind == "async" else config.JOB_WORKERS)
+        self.max_queue = max_queue if max_queue is not None else config.JOB_MAX_QUEUE
+        self.max_history = max_history
+        self.events = events
+        self._jobs = {}
+        self._lock = threading.Lock()
+        if self.kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        elif self.kind == "async":
+            self._executor = AsyncExecutor(self.max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="graph-job")
+
+    @property
+    def live_events(self):
+        """Whether node events are published as they happen (not with process workers)."""
+        return self.kind != "process"
+
+    def submit(self, run_id, graph_input, fn=None):
+        fn = fn or (arun_graph if self.kind == "async" else run_graph)
+        with self._lock:
+            current = self._jobs.get(run_id)
+            if current is not None and current.status in ACTIVE_STATUSES:
+                raise JobConflict(f"Run {run_id} already has an active job")
+            if self.queue_depth() >= self.max_queue:
+                raise QueueFull(f"Job queue is full ({self.max_queue} waiting)")
+
+            job = Job(run_id)
+            if self.kind == "process":
+                job.future = self._executor.submit(fn, graph_input, run_id)
+            else:
+                on_event = (lambda e: self.events.publish(run_id, e)) if self.events else None
+                job.future = self._executor.submit(fn, graph_input, run_id, job.cancel_event, on_event)
+            self._jobs[run_id] = job
+            if self.events is not None:
+                job.future.add_done_callback(lambda _: self.events.publish(run_id, {"type": "status", "status": job.status}))
+            self._prune()
+            return job
+
+    def get(self, run_id):
+        return self._jobs.get(run_id)
+
+    def status(self, run_id):
+        job = self._jobs.get(run_id)
+        return job.status if job else None
+
+    def cancel(self, run_id):
+        job = self._jobs.get(run_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return False
+        if job.future.cancel():
+            return True
+        if self.kind == "process":
+            return False
+        job.cancel_event.set()
+        return True
+
+    def queue_depth(self):
+        return sum(1 for j in list(self._jobs.values()) if j.status == "queued")
+
+    def stats(self):
+        statuses = [j.status for j in list(self._jobs.values())]
+        return {
+            "workers": self.max_workers,
+            "kind": self.kind,
+            "max_queue": self.max_queue,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running") + statuses.count("cancelling"),
+        }
+
+    def _prune(self):
+        # Forget the oldest finished jobs; their outcome still lives in the checkpointer
+        if len(self._jobs) <= self.max_history:
+            return
+        finished = sorted(
+            (j for j in self._jobs.values() if j.future.done()),
+            key=lambda j: j.submitted_at,
+        )
+        for job in finished[: len(self._jobs) - self.max_history]:
+            del self._jobs[job.run_id]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from langchain_core.messages import AIMessage, AIMessageChunk
+from hybrid_ai_assistant.state.state import ProjectOption
+from hybrid_ai_assistant.utils.exec_session import ExecResult
+from hybrid_ai_assistant.utils.sandbox import Sandbox
+
+class Latency:
+    """A fixed delay plus seeded jitter, so repeated benchmark runs sleep the same amounts."""
+
+    def __init__(self, seconds=0.0, jitter=0.0, seed=0):
+        self.seconds = seconds
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next(self):
+        if not self.jitter:
+            return self.seconds
+        with self._lock:
+            return max(0.0, self.seconds * (1 + self._random.uniform(-self.jitter, self.jitter)))
+
+    def sleep(self):
+        delay = self.next()
+        if delay:
+            time.sleep(delay)
+
+    async def asleep(self):
+        delay = self.next()
+        if delay:
+            await asyncio.sleep(delay)
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")[:40] or "step"
+
+def scripted_reply(prompt: str) -> str:
+    """The fake model's answer to each prompt the graph sends, recognised by its wording."""
+    if "Classify task:" in prompt:
+        return "Research"
+    if "Assess ambiguity in:" in prompt:
+        return "The objective is clear enough to proceed."
+    if "Generate 3-5 research queries" in prompt:
+        return "python web frameworks\nsqlite vs postgres\ndeploying small apps"
+    if "Reflect on results" in prompt:
+        return "The results cover the main options; a small Python service is a good fit."
+    if "Break down the implementation" in prompt:
+        return "Create the data model [after: none]\nCreate the helpers [after: none]\nCreate the entry point [after: 1, 2]"
+    step = re.search(r"Current Step: (.*)", prompt)
+    if step:
+        name = _slug(step.group(1))
+        return json.dumps({"filename": f"{name}.py", "content": f"print({name!r})\n"})
+    return "OK"
+
+def scripted_options():
+    return [
+        ProjectOption(tech_stack=stack, pros=["Simple"], cons=["Limited"], why_fits="Fits the objective", complexity=level)
+        for stack, level in (("Python + Flask", "Low"), ("Python + FastAPI", "Medium"), ("Node + Express", "Medium"))
+    ]
+
+class FakeChatModel:
+    """Deterministic stand-in for ChatOpenAI/ChatOllama.
+
+    Answers come from scripted_reply(). latency is slept before the first
+    token; stream() then yields chunk_size characters per chunk with
+    chunk_delay between them. Counts calls per kind in calls.
+    """
+
+    def __init__(self, model="fake", latency=None, chunk_delay=0.0, chunk_size=16):
+        self.model = model
+        self.latency = latency or Latency()
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.calls = {"invoke": 0, "stream": 0, "structured": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+
+    def invoke(self, prompt):
+        self._count("invoke")
+        self.latency.sleep()
+        return AIMessage(content=scripted_reply(str(prompt)))
+
+    async def ainvoke(self, prompt):
+        self._count("invoke")
+        await self.latency.asleep()
+        return AIMessage(content=scripted_reply(str(prompt)))
+
+    def stream(self, prompt):
+        self._count("stream")
+        self.latency.sleep()
+        content = scripted_reply(str(prompt))
+        for i in range(0, len(content), self.chunk_size):
+            if i and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield AIMessageChunk(content=content[i:i + self.chunk_size])
+
+    def bind(self, **kwargs):
+        # Sampling options don't change scripted answers
+        return self
+
+    def with_structured_output(self, schema):
+        return _StructuredFake(self, schema)
+
+class _StructuredFake:
+    def __init__(self, llm, schema):
+        self.llm = llm
+        self.schema = schema
+
+    def invoke(self, prompt):
+        self.llm._count("structured")
+        self.llm.latency.sleep()
+        # The only structured call in the graph is option_generator's OptionList
+        return self.schema(options=scripted_options())
+
+    async def ainvoke(self, prompt):
+        self.llm._count("structured")
+        await self.llm.latency.asleep()
+        return self.schema(options=scripted_options())
+
+class FakeSearch:
+    """Search backend returning canned results for any query after a delay."""
+
+    def __init__(self, latency=None, results=3):
+        self.latency = latency or Latency()
+        self.results = results
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, query):
+        with self._lock:
+            self.calls += 1
+        self.latency.sleep()
+        return self._results(query)
+
+    async def asearch(self, query):
+        with self._lock:
+            self.calls += 1
+        await self.latency.asleep()
+        return self._results(query)
+
+    def _results(self, query):
+        return [{"url": f"https://example.com/{_slug(query)}/{i}", "content": f"Result {i} for {query}"}
+                for i in range(self.results)]
+
+class FakeSandbox(Sandbox):
+    """In-memory sandbox: files live in dicts and every command succeeds after a delay."""
+
+    name = "fake"
+
+    def __init__(self, latency=None, acquire_latency=None):
+        self.latency = latency or Latency()
+        self.acquire_latency = acquire_latency or Latency()
+        self.files = {}
+        self.commands = 0
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def acquire(self, run_id=None, existing_id=None):
+        if existing_id:
+            return existing_id
+        self.acquire_latency.sleep()
+        with self._lock:
+            self._next += 1
+            sandbox_id = f"fake-{self._next}"
+            self.files[sandbox_id] = {}
+        return sandbox_id
+
+    def release(self, run_id=None, sandbox_id=None):
+        with self._lock:
+            self.files.pop(sandbox_id, None)
+
+    def write_files(self, sandbox_id, files):
+        with self._lock:
+            self.files.setdefault(sandbox_id, {}).update(files)
+        return {path: "ok" for path in files}
+
+    def read_files(self, sandbox_id, paths):
+        with self._lock:
+            stored = self.files.get(sandbox_id, {})
+            return {path: stored.get(path) for path in paths}
+
+    def run(self, sandbox_id, cmd, timeout=None, on_output=None):
+        with self._lock:
+            self.commands += 1
+        started = time.monotonic()
+        self.latency.sleep()
+        if on_output is not None:
+            on_output("stdout", "ok\n")
+        return ExecResult(exit_code=0, stdout="ok\n", duration=time.monotonic() - started)
@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+# Cumulative import time per entry point, in milliseconds. Measured at a quarter to a third of these on a
+# laptop; a breach means something heavy is being imported at module level again.
+BUDGETS_MS = {
+    "hybrid_ai_assistant.main": 500,
+    "hybrid_ai_assistant.api.app": 700,
+    "hybrid_ai_assistant.orchestrator.graph": 50,
+    "hybrid_ai_assistant.tools.search": 150,
+}
+
+# Loaded on first use only; none of them should appear after importing an entry point
+DEFERRED = ("langgraph", "langchain_community", "langchain_openai", "docker", "numpy")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+def measure(module):
+    """Import module in a fresh interpreter with -X importtime.
+
+    Returns (cumulative ms, heaviest direct imports as [(name, ms)], deferred
+    modules that got loaded).
+    """
+    code = f"import sys, json, {module}; print(json.dumps(sorted(m for m in {DEFERRED!r} if m in sys.modules)))"
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    # The API warms the sandbox in a background thread; the local backend keeps that thread from importing docker
+    env["SANDBOX_BACKEND"] = "local"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env, timeout=120)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    # Children are printed before their parent, so collect direct imports until the next top-level line
+    total, children, pending = None, [], []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, depth, name = int(match.group(2)), len(match.group(3)) // 2, match.group(4)
+        if depth == 1:
+            pending.append((name, cumulative / 1000))
+        elif depth == 0:
+            if name == module:
+                total, children = cumulative / 1000, pending
+            pending = []
+    children.sort(key=lambda c: -c[1])
+    return total, children[:5], json.loads(proc.stdout.strip().splitlines()[-1])
+
+def run(modules, repeat=3):
+    report = {}
+    for module in modules:
+        runs = [measure(module) for _ in range(repeat)]
+        # The fastest run is the least disturbed by the rest of the machine
+        total, heaviest, deferred = min(runs, key=lambda r: r[0] or 0)
+        budget = BUDGETS_MS.get(module)
+        report[module] = {
+            "ms": total, "budget_ms": budget,
+            "over_budget": budget is not None and total is not None and total > budget,
+            "heaviest": [{"module": name, "ms": ms} for name, ms in heaviest],
+            "deferred_loaded": deferred,
+        }
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check import times of the entry points against their budgets.")
+    parser.add_argument("--module", dest="modules", action="append", help="Module to measure (repeatable; default: all budgeted)")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module; the fastest counts")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.modules or list(BUDGETS_MS), args.repeat)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    failed = [m for m, r in report.items() if r["over_budget"] or r["deferred_loaded"]]
+    for module in failed:
+        print(f"{module}: {report[module]['ms']:.0f}ms (budget {report[module]['budget_ms']}ms), "
+              f"loaded {report[module]['deferred_loaded']}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.state import blobs
+from hybrid_ai_assistant.tools import search
+from hybrid_ai_assistant.utils import llm_registry, routing
+from hybrid_ai_assistant.utils.aio import offload, run as run_async
+from hybrid_ai_assistant.utils.gateway import set_gateway
+from hybrid_ai_assistant.utils.disk_cache import DiskCache
+from hybrid_ai_assistant.utils.sandbox import get_sandbox, set_sandbox
+from hybrid_ai_assistant.orchestrator.checkpoints import CheckpointMetrics, open_async_checkpointer, open_checkpointer
+from hybrid_ai_assistant.orchestrator.graph import build_graph, set_async_graph, set_graph
+from hybrid_ai_assistant.bench.fakes import FakeChatModel, FakeSandbox, FakeSearch, Latency
+
+# One objective per route, so both router decisions are measured
+OBJECTIVES = [
+    "Research and compare architecture options for a chat platform",
+    "Fix the bug in my parse function",
+]
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+
+    def rank(p):
+        # Nearest-rank percentile
+        return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+    return {
+        "count": len(values), "mean": sum(values) / len(values),
+        "p50": rank(50), "p90": rank(90), "p99": rank(99), "max": values[-1],
+    }
+
+class Fakes:
+    def __init__(self, args):
+        self.args = args
+        self.llms = {}
+        self.search = FakeSearch(Latency(args.search_latency, args.jitter, args.seed))
+        self.sandbox = FakeSandbox(Latency(args.exec_latency, args.jitter, args.seed),
+                                   Latency(args.acquire_latency, args.jitter, args.seed))
+
+    def llm(self, provider, model, host=None):
+        # Called under the registry lock, once per (provider, model, host)
+        llm = FakeChatModel(model, Latency(self.args.llm_latency, self.args.jitter, self.args.seed + len(self.llms)),
+                            chunk_delay=self.args.llm_chunk_delay)
+        self.llms[f"{provider}:{model}"] = llm
+        return llm
+
+    def calls(self):
+        return {
+            "llm": {name: dict(llm.calls) for name, llm in self.llms.items()},
+            "search": self.search.calls,
+            "sandbox_commands": self.sandbox.commands,
+        }
+
+@contextmanager
+def offline(workdir, args):
+    """Point every external dependency at a fake and every store at workdir; restores both on exit."""
+    overrides = {
+        "CHECKPOINT_DB": os.path.join(workdir, "checkpoints.db"),
+        "SEARCH_CACHE_ENABLED": False,
+        "LLM_CACHE_NODES": set(),
+        "ROUTER_LOG_PATH": "",
+        "JOB_WORKER_KIND": args.job_kind,  # Not "process": worker processes wouldn't see the fakes
+        "SPECULATIVE_CANDIDATES": args.candidates,
+        "RATE_LIMITS": args.rate_limits,
+    }
+    saved = {name: getattr(config, name) for name in overrides}
+    saved_router, saved_blobs, saved_sandbox = routing.router, blobs._default, get_sandbox()
+    fakes = Fakes(args)
+    router_cache = DiskCache(os.path.join(workdir, "routing.db"))
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    llm_registry.set_factory(fakes.llm)
+    search.set_backend(fakes.search)
+    set_sandbox(fakes.sandbox)
+    routing.router = routing.Router(model=routing.RouterModel.from_keywords(), cache=router_cache)
+    blobs._default = blobs.Blobs(blobs.FileBlobStore(os.path.join(workdir, "blobs")))
+    set_graph(None)  # The API's graphs are built on first use, against the checkpoint path above
+    set_async_graph(None)
+    set_gateway(None)  # Rebuilt with the rate limits above
+    try:
+        yield fakes
+    finally:
+        for name, value in saved.items():
+            setattr(config, name, value)
+        llm_registry.set_factory(None)
+        search.set_backend(None)
+        set_sandbox(saved_sandbox)
+        routing.router, blobs._default = saved_router, saved_blobs
+        set_graph(None)
+        set_async_graph(None)
+        set_gateway(None)
+        router_cache.close()
+
+def drive(graph, objective, choice=0):
+    """Run one objective through the graph, choosing option `choice` at the interrupt.
+
+    Returns (node timings, final state values). A node's time is the wall time
+    from the previous update to its own, so it includes the checkpoint write
+    in between.
+    """
+    thread_id = str(uuid.uuid4())
+    run_config = {"configurable": {"thread_id": thread_id}}
+    timings = []
+
+    def consume(graph_input):
+        last = time.perf_counter()
+        for update in graph.stream(graph_input, config=run_config, stream_mode="updates"):
+            last = _time_update(update, last, timings)
+
+    consume(_initial_state(objective, thread_id))
+    snapshot = graph.get_state(run_config)
+    if snapshot.next:
+        options = blobs.load(snapshot.values["plan_options"])
+        graph.update_state(run_config, {"selected_plan": options[choice]})
+        consume(None)
+    return timings, graph.get_state(run_config).values
+
+async def adrive(graph, objective, choice=0):
+    """drive() for an async graph, with astream."""
+    thread_id = str(uuid.uuid4())
+    run_config = {"configurable": {"thread_id": thread_id}}
+    timings = []
+
+    async def consume(graph_input):
+        last = time.perf_counter()
+        async for update in graph.astream(graph_input, config=run_config, stream_mode="updates"):
+            last = _time_update(update, last, timings)
+
+    await consume(_initial_state(objective, thread_id))
+    snapshot = await graph.aget_state(run_config)
+    if snapshot.next:
+        options = await offload(blobs.load, snapshot.values["plan_options"])
+        await graph.aupdate_state(run_config, {"selected_plan": options[choice]})
+        await consume(None)
+    return timings, (await graph.aget_state(run_config)).values
+
+def _initial_state(objective, thread_id):
+    return {
+        "objective": objective, "logs": [], "completed_steps": [], "file_system_state": {},
+        "research_memory": [], "plan_options": [], "execution_steps": [], "run_id": thread_id,
+    }
+
+def _time_update(update, last, timings):
+    now = time.perf_counter()
+    for node in update:
+        if not node.startswith("__"):
+            timings.append((node, now - last))
+    return now
+
+def bench_graph(args, workdir):
+    metrics = CheckpointMetrics()
+    path = os.path.join(workdir, "bench-checkpoints.db")
+    nodes, durations, failures = {}, [], []
+    lock = threading.Lock()
+
+    def finish(started, outcome):
+        if isinstance(outcome, Exception):
+            with lock:
+                failures.append(f"{type(outcome).__name__}: {outcome}")
+            return
+        timings, final = outcome
+        with lock:
+            if not final.get("completed_steps"):
+                failures.append("RuntimeError: Run ended without executing any steps")
+                return
+            durations.append(time.perf_counter() - started)
+            for node, seconds in timings:
+                nodes.setdefault(node, []).append(seconds)
+
+    def one(i):
+        started = time.perf_counter()
+        try:
+            outcome = drive(graph, args.objectives[i % len(args.objectives)])
+        except Exception as e:
+            outcome = e
+        finish(started, outcome)
+
+    async def aone(i, slots):
+        async with slots:
+            started = time.perf_counter()
+            try:
+                outcome = await adrive(graph, args.objectives[i % len(args.objectives)])
+            except Exception as e:
+                outcome = e
+            finish(started, outcome)
+
+    async def arun_all():
+        # Every run is a task on this loop, at most --concurrency in flight
+        checkpointer = await open_async_checkpointer(path, metrics=metrics)
+        nonlocal graph
+        graph = build_graph(checkpointer=checkpointer, asynchronous=True)
+        slots = asyncio.Semaphore(args.concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*(aone(i, slots) for i in range(args.runs)))
+        wall = time.perf_counter() - started
+        checkpointer.conn.close()
+        return wall
+
+    graph = None
+    if args.asynchronous:
+        wall = run_async(arun_all())
+    else:
+        checkpointer = open_checkpointer(path, metrics=metrics)
+        graph = build_graph(checkpointer=checkpointer)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(one, range(args.runs)))
+        wall = time.perf_counter() - started
+        checkpointer.conn.close()
+
+    writes = metrics.summary()
+    for m in writes.values():
+        m["mean_seconds"] = m["seconds"] / m["writes"]
+        m["mean_bytes"] = m["bytes"] / m["writes"]
+    total_writes = sum(m["writes"] for m in writes.values())
+    total_seconds = sum(m["seconds"] for m in writes.values())
+    return {
+        "runs": args.runs, "concurrency": args.concurrency, "async": args.asynchronous, "failed": len(failures), "errors": failures[:5],
+        "wall_seconds": wall, "runs_per_second": len(durations) / wall if wall else 0.0,
+        "run_seconds": percentiles(durations),
+        "nodes": {node: percentiles(values) for node, values in nodes.items()},
+        "checkpoints": {
+            "writes": total_writes, "seconds": total_seconds,
+            "mean_seconds": total_seconds / total_writes if total_writes else 0.0,
+            "per_run_seconds": total_seconds / len(durations) if durations else 0.0,
+            "nodes": writes,
+        },
+    }
+
+def bench_api(args):
+    """Drive the Flask app with api_concurrency clients: /start, poll, /select, poll until done."""
+    # Imported here so the app's job pool picks up the offline config
+    from hybrid_ai_assistant.api import app as api
+    from hybrid_ai_assistant.api.jobs import ACTIVE_STATUSES
+    durations, failures = [], []
+    lock = threading.Lock()
+
+    def post(client, path, body):
+        while True:
+            response = client.post(path, json=body)
+            if response.status_code not in (409, 429):  # Busy: the job is still finishing or the queue is full
+                return response
+            time.sleep(args.poll_interval)
+
+    def settle(client, run_id):
+        while True:
+            body = client.get(f"/poll/{run_id}").get_json()
+            if body["status"] not in ACTIVE_STATUSES:
+                return body
+            time.sleep(args.poll_interval)
+
+    def one(i):
+        client = api.app.test_client()
+        started = time.perf_counter()
+        try:
+            run_id = post(client, "/start", {"objective": args.objectives[i % len(args.objectives)]}).get_json()["run_id"]
+            body = settle(client, run_id)
+            if body["status"] == "interrupted":
+                post(client, f"/select/{run_id}", {"option_id": 0})
+                body = settle(client, run_id)
+            if body["status"] != "completed":
+                raise RuntimeError(f"Run ended as {body['status']}: {body.get('error')}")
+        except Exception as e:
+            with lock:
+                failures.append(f"{type(e).__name__}: {e}")
+            return
+        with lock:
+            durations.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.api_concurrency) as pool:
+        list(pool.map(one, range(args.api_runs)))
+    wall = time.perf_counter() - started
+    api.jobs.shutdown()
+    return {
+        "runs": args.api_runs, "concurrency": args.api_concurrency, "job_kind": api.jobs.kind, "job_workers": api.jobs.max_workers,
+        "failed": len(failures), "errors": failures[:5],
+        "wall_seconds": wall, "runs_per_second": len(durations) / wall if wall else 0.0,
+        "run_seconds": percentiles(durations),
+    }
+
+def _max_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def run_benchmark(args, workdir):
+    if args.tracemalloc:
+        tracemalloc.start()
+    report = {"settings": {k: v for k, v in vars(args).items() if k != "out"}}
+    with offline(workdir, args) as fakes:
+        report["graph"] = bench_graph(args, workdir)
+        report["memory"] = {"max_rss_mb_after_graph": _max_rss_mb()}
+        if args.api_runs:
+            report["api"] = bench_api(args)
+            report["memory"]["max_rss_mb_after_api"] = _max_rss_mb()
+        report["calls"] = fakes.calls()
+    if args.tracemalloc:
+        report["memory"]["tracemalloc_peak_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return report
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark with fake LLM, search and sandbox backends.")
+    parser.add_argument("--runs", type=int, default=20, help="Graph runs driven in-process")
+    parser.add_argument("--concurrency", type=int, default=4, help="Graph runs at once")
+    parser.add_argument("--async", dest="asynchronous", action="store_true",
+                        help="Drive the async graph with astream, all runs on one event loop")
+    parser.add_argument("--job-kind", choices=("thread", "async"), default="thread", help="API job workers")
+    parser.add_argument("--api-runs", type=int, default=None, help="Runs through the Flask API (default: --runs; 0 skips)")
+    parser.add_argument("--api-concurrency", type=int, default=None, help="Concurrent API clients (default: --concurrency)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds before each fake LLM reply")
+    parser.add_argument("--llm-chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="Seconds per fake search query")
+    parser.add_argument("--exec-latency", type=float, default=0.02, help="Seconds per sandbox command")
+    parser.add_argument("--acquire-latency", type=float, default=0.0, help="Seconds to acquire a sandbox")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Relative +/- jitter on every latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate-limits", default="", help="Gateway rate limits, as in RATE_LIMITS (default: none)")
+    parser.add_argument("--candidates", type=int, default=config.SPECULATIVE_CANDIDATES, help="Speculative candidates per step")
+    parser.add_argument("--objective", dest="objectives", action="append", help="Objective to run (repeatable)")
+    parser.add_argument("--poll-interval", type=float, default=0.01, help="Seconds between API polls")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report the peak of Python allocations (slower)")
+    parser.add_argument("--workdir", help="Directory for checkpoints, blobs and caches (default: a temporary one)")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    args.objectives = args.objectives or OBJECTIVES
+    args.api_runs = args.runs if args.api_runs is None else args.api_runs
+    args.api_concurrency = args.api_concurrency or args.concurrency
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run_benchmark(args, args.workdir or tmp)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    failed = report["graph"]["failed"] + report.get("api", {}).get("failed", 0)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
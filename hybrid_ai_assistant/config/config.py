@@ -9,6 +9,101 @@ class Config:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     DOCKER_IMAGE = "python:3.11-slim"
     RETRY_BUDGET = 3
+    EXECUTION_MAX_PARALLEL = int(os.getenv("EXECUTION_MAX_PARALLEL", "3"))  # Plan steps run at once
+    # Speculative execution: generate this many candidates per attempt and keep the first that passes (1 disables)
+    SPECULATIVE_CANDIDATES = int(os.getenv("SPECULATIVE_CANDIDATES", "1"))
+    SPECULATIVE_MAX_PARALLEL = int(os.getenv("SPECULATIVE_MAX_PARALLEL", "2"))  # Candidates generated at once
+    SPECULATIVE_TEMPERATURES = [float(t) for t in os.getenv("SPECULATIVE_TEMPERATURES", "0.2,0.6,0.9").split(",") if t.strip()]
     PROJECT_DIR = os.path.expanduser("~/MyProjects")  # Host mount point
 
+    # Research fan-out
+    RESEARCH_MAX_CONCURRENCY = int(os.getenv("RESEARCH_MAX_CONCURRENCY", "4"))
+    RESEARCH_QUERY_TIMEOUT = float(os.getenv("RESEARCH_QUERY_TIMEOUT", "20"))  # Seconds per query
+    RESEARCH_BATCH_TIMEOUT = float(os.getenv("RESEARCH_BATCH_TIMEOUT", "45"))  # Seconds for the whole batch
+    # Search results reach prompts as deduplicated, BM25-ranked chunks within a token budget
+    RESEARCH_CONTEXT_TOKENS = int(os.getenv("RESEARCH_CONTEXT_TOKENS", "1500"))  # Per prompt
+    RESEARCH_CHUNK_WORDS = int(os.getenv("RESEARCH_CHUNK_WORDS", "120"))
+    RESEARCH_DEDUP_THRESHOLD = float(os.getenv("RESEARCH_DEDUP_THRESHOLD", "0.8"))  # Estimated Jaccard similarity
+
+    # On-disk caches
+    CACHE_DIR = os.getenv("CACHE_DIR", os.path.expanduser("~/.cache/hybrid_ai_assistant"))
+    SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+    SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(7 * 24 * 3600)))  # Seconds
+    SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+    # LLM memoization is opt-in per node: comma-separated node names, or "*" for all
+    LLM_CACHE_NODES = {n.strip() for n in os.getenv("LLM_CACHE_NODES", "").split(",") if n.strip()}
+    LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))  # Seconds
+    LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+
+    # Shared LLM clients
+    LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+    LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))  # Seconds per request
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "0"))  # Client-side retries; the call gateway retries 429s and timeouts
+
+    # Call gateway (utils.gateway): token buckets for providers ("openai", "ollama", "tavily") and provider:model pairs,
+    # as name=rate/s or name=rate/m with an optional @burst; names not listed are unlimited
+    RATE_LIMITS = os.getenv("RATE_LIMITS", "openai=5/s@10,tavily=5/s@5")
+    GATEWAY_COALESCE = os.getenv("GATEWAY_COALESCE", "true").lower() == "true"  # Share identical in-flight calls
+    GATEWAY_MAX_RETRIES = int(os.getenv("GATEWAY_MAX_RETRIES", "4"))
+    GATEWAY_BACKOFF = float(os.getenv("GATEWAY_BACKOFF", "0.5"))  # Seconds before the first retry; doubles each time, jittered
+    GATEWAY_BACKOFF_MAX = float(os.getenv("GATEWAY_BACKOFF_MAX", "20"))
+
+    # API job execution
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "16"))  # Waiting jobs before /start returns 429
+    JOB_WORKER_KIND = os.getenv("JOB_WORKER_KIND", "thread")  # "thread", "process" or "async"
+    # JOB_WORKER_KIND=async: runs are tasks on one event loop driving the async graph, this many at once
+    JOB_ASYNC_MAX_RUNS = int(os.getenv("JOB_ASYNC_MAX_RUNS", "256"))
+    ASYNC_EXECUTION_SLOTS = int(os.getenv("ASYNC_EXECUTION_SLOTS", "128"))  # Async runs in the (threaded) execution node at once
+    ASYNC_BLOCKING_THREADS = int(os.getenv("ASYNC_BLOCKING_THREADS", "32"))  # Async graph's SQLite, blob and index work
+
+    # Checkpoint store
+    CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", os.path.join(CACHE_DIR, "checkpoints.db"))
+    CHECKPOINT_BUSY_TIMEOUT = float(os.getenv("CHECKPOINT_BUSY_TIMEOUT", "30"))  # Seconds
+    CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "10"))  # Per thread; 0 keeps all
+    CHECKPOINT_COMPLETED_TTL_HOURS = float(os.getenv("CHECKPOINT_COMPLETED_TTL_HOURS", "0"))  # 0 disables
+
+    # Bulky state fields are kept out of checkpoints in a content-addressed blob store
+    BLOB_BACKEND = os.getenv("BLOB_BACKEND", "file")  # "file" or "sqlite"
+    BLOB_PATH = os.getenv("BLOB_PATH", os.path.join(CACHE_DIR, "blobs.db" if BLOB_BACKEND == "sqlite" else "blobs"))
+    BLOB_GC_MIN_AGE = float(os.getenv("BLOB_GC_MIN_AGE", "3600"))  # Seconds; younger blobs may belong to a running step
+    BLOB_INLINE_LIMIT = int(os.getenv("BLOB_INLINE_LIMIT", "2048"))  # Encoded bytes kept inline
+    BLOB_LOG_INLINE_CHARS = int(os.getenv("BLOB_LOG_INLINE_CHARS", "500"))  # Longer log lines are truncated
+
+    # Warm container pool (0 disables pooling)
+    CONTAINER_POOL_SIZE = int(os.getenv("CONTAINER_POOL_SIZE", "2"))
+    CONTAINER_IDLE_TIMEOUT = float(os.getenv("CONTAINER_IDLE_TIMEOUT", "1800"))  # Seconds before an idle lease is reaped
+    CONTAINER_POOL_INTERVAL = float(os.getenv("CONTAINER_POOL_INTERVAL", "30"))  # Seconds between maintenance passes
+
+    # Commands in containers run through one persistent shell session per container
+    EXEC_PERSISTENT = os.getenv("EXEC_PERSISTENT", "true").lower() == "true"
+    EXEC_TIMEOUT = float(os.getenv("EXEC_TIMEOUT", "60"))  # Seconds per command
+    EXEC_MAX_OUTPUT = int(os.getenv("EXEC_MAX_OUTPUT", str(64 * 1024)))  # Bytes kept per stream
+    # Reading several files from one directory fetches it as one archive unless it is larger than this
+    CONTAINER_ARCHIVE_MAX_BYTES = int(os.getenv("CONTAINER_ARCHIVE_MAX_BYTES", str(4 * 1024 * 1024)))
+
+    # Where generated code runs: "docker" or "local" (host subprocesses with rlimits, no isolation from the host)
+    SANDBOX_BACKEND = os.getenv("SANDBOX_BACKEND", "docker")
+    SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", "60"))  # Local backend limits; 0 disables each
+    SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "1024"))
+    SANDBOX_FILE_SIZE_MB = int(os.getenv("SANDBOX_FILE_SIZE_MB", "64"))
+
+    # Cloud/local routing: a hashed n-gram model answers when confident, the router LLM otherwise
+    ROUTER_CONFIDENCE = float(os.getenv("ROUTER_CONFIDENCE", "0.8"))
+    ROUTER_MODEL_PATH = os.getenv("ROUTER_MODEL_PATH", os.path.join(CACHE_DIR, "router_model.npz"))
+    ROUTER_LOG_PATH = os.getenv("ROUTER_LOG_PATH", os.path.join(CACHE_DIR, "routing.jsonl"))  # Empty disables
+    ROUTER_CACHE_TTL = float(os.getenv("ROUTER_CACHE_TTL", str(30 * 24 * 3600)))  # Seconds
+    ROUTE_LOCAL_SKIP_RESEARCH = os.getenv("ROUTE_LOCAL_SKIP_RESEARCH", "false").lower() == "true"  # "local" goes straight to options
+
+    # Prefix log lines with the trace (run) and span ids of the node that wrote them
+    TRACE_LOG_IDS = os.getenv("TRACE_LOG_IDS", "true").lower() == "true"
+
+    # Headless batch runs (python main.py --batch): concurrent runs, and the policy that picks an option
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    BATCH_SELECTION_POLICY = os.getenv("BATCH_SELECTION_POLICY", "simplest")  # first, simplest or module:function
+
+    # Workspace context given to the coder model
+    REPO_MAP_TOKEN_BUDGET = int(os.getenv("REPO_MAP_TOKEN_BUDGET", "1024"))
+
 config = Config()
@@ -10,19 +10,30 @@ parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
-from hybrid_ai_assistant.orchestrator.graph import compiled_graph
+from hybrid_ai_assistant.orchestrator.graph import get_graph
+from hybrid_ai_assistant.orchestrator.events import node_events
+from hybrid_ai_assistant.state import blobs
+from hybrid_ai_assistant.utils.sandbox import get_sandbox
+from hybrid_ai_assistant.utils.instrumentation import format_summary
 from hybrid_ai_assistant.config.config import config as app_config
 
 def main():
+    if "--batch" in sys.argv[1:]:
+        # Headless: objectives from JSONL, options picked by a policy, see orchestrator.batch
+        from hybrid_ai_assistant.orchestrator.batch import main as batch_main
+        return batch_main(sys.argv[1:])
+
     if len(sys.argv) < 2:
-        print("Usage: python main.py 'Your project intent'")
+        print("Usage: python main.py 'Your project intent'  or  python main.py --batch objectives.jsonl --out results.jsonl")
         # Fallback for dev
         objective = "Create a simple calculator in Python"
     else:
         objective = sys.argv[1]
 
     print(f"Starting Project: {objective}")
+    get_sandbox().warm()
     
+    compiled_graph = get_graph()
     thread_id = str(uuid.uuid4())
     run_config = {"configurable": {"thread_id": thread_id}}
     
@@ -43,13 +54,12 @@ def main():
         # We can stream events to show progress
         # compiled_graph.invoke(initial_state, config=run_config)
         
-        # Using stream to show logs
-        for event in compiled_graph.stream(initial_state, config=run_config):
-             for k, v in event.items():
-                 print(f"Finished node: {k}")
-                 if "logs" in v and v["logs"]:
-                     print(f"Log: {v['logs'][-1]}")
-                     
+        # Using stream to show logs (same per-node events the API streams over SSE)
+        for event in node_events(compiled_graph.stream(initial_state, config=run_config), initial_state["logs"]):
+            print(f"Finished node: {event['node']}")
+            for line in event["logs"]:
+                print(f"Log: {line}")
+
     except Exception as e:
         print(f"Graph execution paused or error: {e}")
 
@@ -58,7 +68,7 @@ def main():
     
     # Check if we have options
     if state_snapshot.values and state_snapshot.values.get("plan_options"):
-        options = state_snapshot.values["plan_options"]
+        options = blobs.load(state_snapshot.values["plan_options"])
         print("\nGenerated Options:")
         for i, opt in enumerate(options):
             print(f"[{i}] {opt.tech_stack}")
@@ -85,18 +95,17 @@ def main():
             
             # Resume
             print("Resuming execution...")
-            for event in compiled_graph.stream(None, config=run_config):
-                for k, v in event.items():
-                    print(f"Finished node: {k}")
-                    if "logs" in v and v["logs"]:
-                         # We might want to see the new logs
-                         # Note: simplistic log print, might print duplicates if not careful
-                         # but sufficient for demo
-                         pass
-                         
+            logs = compiled_graph.get_state(run_config).values.get("logs", [])
+            for event in node_events(compiled_graph.stream(None, config=run_config), logs):
+                print(f"Finished node: {event['node']}")
+                for line in event["logs"]:
+                    print(f"Log: {line}")
+
     print("Workflow completed.")
     final_state = compiled_graph.get_state(run_config)
     print("Final State Keys:", final_state.values.keys())
+    print(f"\nTimings for run {thread_id}:")
+    print(format_summary(thread_id))
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,13 +1,23 @@
-from langchain_openai import ChatOpenAI
 from hybrid_ai_assistant.state.state import ProjectState
 from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils.llm_registry import cloud_llm
+from hybrid_ai_assistant.utils.llm_cache import ainvoke_text, invoke_text
+
+def _prompt(state):
+    return f"Assess ambiguity in: {state['objective']}. If high, suggest clarifications."
 
 def clarify_request(state: ProjectState) -> ProjectState:
-    llm = ChatOpenAI(model=config.CLOUD_LLM, api_key=config.OPENAI_API_KEY)
+    llm = cloud_llm()
     # Analyze ambiguity, generate questions if needed
-    response = llm.invoke(f"Assess ambiguity in: {state['objective']}. If high, suggest clarifications.")
+    response = invoke_text(llm, _prompt(state), node="clarification")
+    return _apply(state, response)
+
+async def aclarify_request(state: ProjectState) -> ProjectState:
+    return _apply(state, await ainvoke_text(cloud_llm(), _prompt(state), node="clarification"))
+
+def _apply(state, response):
     # Logic to set clarification_status and potentially interrupt for user input
-    if "ambiguous" in response.content.lower():
+    if "ambiguous" in response.lower():
         state["clarification_status"] = False
         state["logs"].append("Clarification needed.")
     else:
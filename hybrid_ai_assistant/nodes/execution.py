@@ -1,71 +1,304 @@
-from langchain_community.chat_models import ChatOllama
+import asyncio
+import contextvars
+import posixpath
+import shlex
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack, closing
 from hybrid_ai_assistant.state.state import ProjectState
-from hybrid_ai_assistant.tools.file_ops import write_file, mkdir, list_dir
-from hybrid_ai_assistant.utils.docker_utils import get_or_create_container, exec_in_container
-from hybrid_ai_assistant.utils.repo_map import generate_repo_map
+from hybrid_ai_assistant.state import blobs
+from hybrid_ai_assistant.utils.sandbox import get_sandbox
+from hybrid_ai_assistant.utils.container_files import WORKSPACE, resolve_path
+from hybrid_ai_assistant.utils.repo_map import RepoMapIndex, index_for
+from hybrid_ai_assistant.utils.step_graph import run_dag
 from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils.llm_registry import coder_llm, with_sampling
+from hybrid_ai_assistant.utils.llm_cache import stream_text
+from hybrid_ai_assistant.utils.codegen import CodeStreamParser, GenerationStats, generation_metrics, speculation_metrics
+from hybrid_ai_assistant.utils.instrumentation import retries
+
+# Speculative candidates run in scratch copies of the workspace under this directory
+SCRATCH_DIR = ".spec"
+
+class FileLocks:
+    """Per-path locks so concurrent steps never write or run over the same file at once.
+
+    Each path also remembers which writer last wrote it. Files are written
+    as they stream in, so before running them a step checks, under the
+    lock, that no other step overwrote them in the meantime.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._writers = {}
+        self._guard = threading.Lock()
+
+    @staticmethod
+    def _key(path):
+        try:
+            return resolve_path(path)
+        except ValueError:
+            return path  # Rejected by the write anyway
+
+    def hold(self, paths):
+        stack = ExitStack()
+        with self._guard:
+            locks = [self._locks.setdefault(p, threading.Lock()) for p in sorted({self._key(p) for p in paths})]
+        for lock in locks:  # Sorted order, so two steps can't deadlock on overlapping files
+            stack.enter_context(lock)
+        return stack
+
+    def wrote(self, paths, writer):
+        """Record writer as the last to write paths; call while holding them."""
+        with self._guard:
+            for p in paths:
+                self._writers[self._key(p)] = writer
+
+    def overwritten(self, paths, writer):
+        """The paths someone other than writer wrote last; call while holding them."""
+        with self._guard:
+            return [p for p in paths if self._writers.get(self._key(p)) is not writer]
+
+def _generate(llm, prompt, salt, on_entry=None, cancelled=None):
+    """Stream one generation through the parser; returns (parser, stats).
+
+    on_entry gets each file entry as soon as it is complete. The stream is
+    closed, which stops the model, once the reply is complete, can no
+    longer be valid, or cancelled is set.
+    """
+    parser = CodeStreamParser()
+    stats = GenerationStats()
+    stream = stream_text(llm, prompt, node="execution", salt=salt, keep=lambda _: parser.done)
+    with closing(stream):
+        for chunk in stream:
+            stats.chunk(chunk)
+            for entry in parser.feed(chunk):
+                if on_entry is not None:
+                    on_entry(entry)
+            if parser.done or parser.error or (cancelled is not None and cancelled.is_set()):
+                break
+    stats.finish()
+    if not parser.done and not parser.error and cancelled is not None and cancelled.is_set():
+        parser.error = "Cancelled"
+    generation_metrics.record(stats, aborted=bool(parser.error))
+    parser.finish()
+    return parser, stats
+
+def _describe(run):
+    status = "timed out" if run.timed_out else f"exit {run.exit_code}"
+    return f"[{status}] {run.output}"
+
+def _speculate(llm, prompt, attempt, sandbox, container_id, file_locks, step):
+    """Generate config.SPECULATIVE_CANDIDATES candidates at once and keep the first that passes.
+
+    Each candidate streams with its own temperature and seed, then runs in a
+    scratch copy of the workspace. The winner's files are written to the
+    real workspace and the other candidates are cancelled. Returns
+    (logs, passed).
+    """
+    count = config.SPECULATIVE_CANDIDATES
+    temperatures = config.SPECULATIVE_TEMPERATURES or [None]
+    cancelled = threading.Event()
+
+    def candidate(k):
+        if cancelled.is_set():
+            return None
+        variant = with_sampling(llm, temperature=temperatures[k % len(temperatures)], seed=attempt * count + k)
+        parser, stats = _generate(variant, prompt, salt=[attempt, k], cancelled=cancelled)
+        if parser.error:
+            return False, f"Candidate {k} for {step}: {parser.error} ({stats.describe()})", None
+        files = parser.files
+        if not files:
+            return False, f"Candidate {k} for {step}: no files", None
+
+        scratch = f"{SCRATCH_DIR}/{uuid.uuid4().hex}"
+        try:
+            # Copy the workspace so the candidate sees the files earlier steps wrote
+            sandbox.run(container_id, f"mkdir -p {scratch} && tar --exclude=./{SCRATCH_DIR} -cf - . | tar -xf - -C {scratch}")
+            # Workspace-relative, so absolute paths like /workspace/app.py land in the scratch copy too
+            relative = {path: posixpath.relpath(resolve_path(path), WORKSPACE) for path in files}
+            scratch_files = {f"{scratch}/{relative[path]}": content for path, content in files.items()}
+            written = sandbox.write_files(container_id, scratch_files)
+            failed = {path: r for path, r in written.items() if r != "ok"}
+            if failed:
+                return False, f"Candidate {k} for {step}: error writing files: {failed}", None
+            filename = next(iter(files))
+            if cancelled.is_set():
+                return None
+            if not filename.endswith(".py"):
+                return True, f"Candidate {k} for {step}: File written", files
+            run = sandbox.run(container_id, f"cd {scratch} && python {shlex.quote(relative[filename])}")
+            return run.ok, f"Candidate {k} for {step}: {_describe(run)}", files
+        except Exception as e:
+            return False, f"Candidate {k} for {step}: {e}", None
+        finally:
+            sandbox.run(container_id, f"rm -rf {scratch}; rmdir {SCRATCH_DIR} 2>/dev/null || true")
+
+    logs = []
+    winner = None
+    pool = ThreadPoolExecutor(max_workers=max(1, config.SPECULATIVE_MAX_PARALLEL), thread_name_prefix="candidate")
+    try:
+        pending = {pool.submit(contextvars.copy_context().run, candidate, k): k for k in range(count)}
+        while pending and winner is None:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            # Lowest index first when several finish together
+            for future in sorted(done, key=pending.get):
+                k = pending.pop(future)
+                outcome = future.result()
+                if outcome is None:
+                    continue
+                passed, line, files = outcome
+                logs.append(blobs.log_text(line))
+                if passed and winner is None:
+                    winner = (k, files)
+                    cancelled.set()
+    finally:
+        # Losers stop at their next chunk or before running; their scratch copies clean themselves up
+        cancelled.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    speculation_metrics.record(count, None if winner is None else winner[0], cancelled=len(pending))
+    if winner is None:
+        return logs, False
+    k, files = winner
+    with file_locks.hold(files):
+        written = sandbox.write_files(container_id, files)
+        file_locks.wrote(files, object())
+    failed = {path: r for path, r in written.items() if r != "ok"}
+    if failed:
+        logs.append(f"Executed {step}: Error writing files: {failed}")
+        return logs, False
+    logs.append(f"Executed {step}: candidate {k} of {count} passed and was promoted")
+    return logs, True
 
 def execute_plan(state: ProjectState) -> ProjectState:
-    llm = ChatOllama(model=config.LOCAL_CODER_MODEL, base_url=config.OLLAMA_HOST)
-    
-    # UPDATED: Get or create container and store ID in state
+    llm = coder_llm()
+    sandbox = get_sandbox()
+
+    # UPDATED: Get or create the run's sandbox and store its ID in state
     if not state.get("container_id"):
         # Pass run_id if available to ensure isolation
-        state["container_id"] = get_or_create_container(run_id=state.get("run_id"))
-    
+        state["container_id"] = sandbox.acquire(run_id=state.get("run_id"))
+
     container_id = state["container_id"]
-    
+    # Signatures of what's already in the workspace, re-parsed only where files changed
+    workspace = sandbox.workspace(container_id, run_id=state.get("run_id"))
+    repo_index = index_for(workspace) if workspace else RepoMapIndex()
+    file_locks = FileLocks()
+
     steps = state.get("execution_steps", [])
-    completed = []
-    
-    for step in steps:
+
+    def run_step(i):
+        # Runs on a worker thread; logs are returned and merged in step order afterwards
+        step = steps[i]
+        logs = []
         for attempt in range(config.RETRY_BUDGET):
-            # Generate context
-            # We would normally generate the file tree dynamically
-            # For this 'simulated' file structure, we can skip or pass empty
-            # context = generate_repo_map(state.get("file_system_state", {}))
-            context = "" # simplified for demo
-            
+            if attempt:
+                retries.inc(kind="node", name="execution")
+            # Generate context from the workspace as it is now
+            repo_index.refresh()
+            context = repo_index.render(config.REPO_MAP_TOKEN_BUDGET, focus=step)
+
             code_prompt = f"""
-            You are a coding assistant. 
+            You are a coding assistant.
             Objective: {state['objective']}
             Current Step: {step}
             Tech Stack: {state['selected_plan'].tech_stack if state.get('selected_plan') else 'Python'}
-            
+            Existing files:
+            {context or '(none yet)'}
+
             Return a JSON object with two keys: "filename" and "content".
             Example: {{"filename": "main.py", "content": "print('hello')"}}
+            If the step needs several files, return {{"files": [{{"filename": ..., "content": ...}}, ...]}}
+            with the file to run first.
             Do not include markdown formatting or backticks.
             """
-            
+
             try:
-                # 2. Invoke LLM
-                response = llm.invoke(code_prompt).content
-                
-                # Clean up response if it has backticks
-                response = response.replace("```json", "").replace("```", "").strip()
-
-                import json
-                data = json.loads(response)
-                
-                filename = data.get('filename')
-                content = data.get('content')
-                
-                if filename and content:
-                    # 3. Write File
-                    write_file.invoke({"path": filename, "content": content, "container_id": container_id})
-                    
-                    # 4. Execute (if python)
-                    result = "File written"
-                    if filename.endswith(".py"):
-                        result = exec_in_container(container_id, f"python {filename}")
-                    
-                    state["logs"].append(f"Executed {step}: {result}")
-                    if "error" not in result.lower():
+                if config.SPECULATIVE_CANDIDATES > 1:
+                    attempt_logs, passed = _speculate(llm, code_prompt, attempt, sandbox, container_id, file_locks, step)
+                    logs.extend(attempt_logs)
+                    if passed:
+                        break
+                    continue
+
+                # 2. Stream the generation; each file is written as soon as its entry is complete
+                written = {}
+                writer = object()  # This attempt, as far as file_locks is concerned
+
+                def write_entry(entry):
+                    with file_locks.hold([entry["filename"]]):
+                        written.update(sandbox.write_files(container_id, {entry["filename"]: entry["content"]}))
+                        file_locks.wrote([entry["filename"]], writer)
+
+                # Salted with the attempt so a retry never replays the generation that just failed
+                parser, stats = _generate(llm, code_prompt, salt=attempt, on_entry=write_entry)
+                logs.append(f"Generated {step}: {stats.describe()}")
+                if parser.error:
+                    raise ValueError(parser.error)
+
+                files = parser.files
+                if files:
+                    failed = {path: r for path, r in written.items() if r != "ok"}
+                    filename = next(iter(files))
+
+                    # 3. Execute (if python)
+                    result, ok = "File written", not failed
+                    if failed:
+                        result = f"Error writing files: {failed}"
+                    elif filename.endswith(".py"):
+                        # One hold across the check, any rewrite and the run, so the step runs the code it wrote
+                        with file_locks.hold(files):
+                            stale = {p: files[p] for p in file_locks.overwritten(files, writer)}
+                            rewritten = sandbox.write_files(container_id, stale) if stale else {}
+                            file_locks.wrote(stale, writer)
+                            failed = {path: r for path, r in rewritten.items() if r != "ok"}
+                            run = None if failed else sandbox.run(container_id, f"python {filename}")
+                        if failed:
+                            ok, result = False, f"Error writing files: {failed}"
+                        else:
+                            ok, result = run.ok, _describe(run)
+
+                    logs.append(blobs.log_text(f"Executed {step}: {result}"))
+                    if ok:
                         break
             except Exception as e:
-                state["logs"].append(f"Error executing step {step}: {e}")
-                
-        completed.append(step)
+                logs.append(f"Error executing step {step}: {e}")
+        return logs
+
+    # Steps whose dependencies are done run concurrently; see utils.step_graph
+    step_logs = run_dag(len(steps), state.get("step_dependencies"), run_step, config.EXECUTION_MAX_PARALLEL)
+    for logs in step_logs:
+        state["logs"].extend(logs)
 
-    state["completed_steps"] = completed
+    state["completed_steps"] = list(steps)
+    repo_index.refresh()
+    state["file_system_state"] = repo_index.manifest()
+    # Execution is the last node, so hand the sandbox back now rather than leaving it running
+    sandbox.release(run_id=state.get("run_id"), sandbox_id=container_id)
+    state["container_id"] = None
     return state
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _execution_pool():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config.ASYNC_EXECUTION_SLOTS, thread_name_prefix="execution")
+    return _executor
+
+async def aexecute_plan(state: ProjectState) -> ProjectState:
+    """execute_plan for the async graph, on a worker thread.
+
+    Sandbox calls go through the Docker SDK or subprocesses, which block, and
+    steps and candidates already run concurrently on threads. The pool holds
+    ASYNC_EXECUTION_SLOTS threads, so a burst of runs reaching this node
+    queues instead of becoming a burst of threads and containers.
+    """
+    loop = asyncio.get_running_loop()
+    # In a copy of the context, so the node's span stays current
+    return await loop.run_in_executor(_execution_pool(), contextvars.copy_context().run, execute_plan, state)
@@ -1,5 +1,35 @@
-from langchain_openai import ChatOpenAI
+from hybrid_ai_assistant.state.state import ProjectState
 from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils.aio import offload
+from hybrid_ai_assistant.utils.llm_registry import cloud_llm
+from hybrid_ai_assistant.utils.llm_cache import ainvoke_text, invoke_text
+from hybrid_ai_assistant.utils.step_graph import parse_steps, sequential
+from hybrid_ai_assistant.utils.research_index import index_for
+
+def _step_prompt(state, selected_plan):
+    research = index_for(state.get("research_memory", [])).render(f"{state['objective']} {selected_plan.tech_stack}")
+    step_prompt = f"""
+            Break down the implementation of '{state['objective']}' using {selected_plan.tech_stack} 
+            into a list of 3-5 coding tasks, in the order they should be done.
+            Return ONLY the list of tasks, separated by newlines.
+            Do not number them.
+            End each task with [after: N, M] naming the 1-based positions of the earlier tasks
+            it needs, or [after: none] if it can be done independently.
+            """
+    if research:
+        step_prompt += f"\nRelevant research:\n{research}\n"
+    return step_prompt
+
+def _set_steps(state, response):
+    steps, dependencies = parse_steps(response)
+    state["execution_steps"] = steps
+    state["step_dependencies"] = dependencies
+
+def _fallback(state, e):
+    state["logs"].append(f"Error generating steps: {e}")
+    # Fallback
+    state["execution_steps"] = ["Create main file", "Create requirements.txt"]
+    state["step_dependencies"] = sequential(2)
 
 def request_selection(state: ProjectState) -> ProjectState:
     # UPDATED: Now processes after user has set selected_plan via update_state
@@ -10,21 +40,27 @@ def request_selection(state: ProjectState) -> ProjectState:
         
         # USE LLM TO GENERATE STEPS
         try:
-            llm = ChatOpenAI(model=config.CLOUD_LLM, api_key=config.OPENAI_API_KEY)
-            step_prompt = f"""
-            Break down the implementation of '{state['objective']}' using {selected_plan.tech_stack} 
-            into a list of 3-5 sequential coding tasks. 
-            Return ONLY the list of tasks, separated by newlines.
-            Do not number them.
-            """
-            response = llm.invoke(step_prompt)
-            steps = [s.strip() for s in response.content.split('\n') if s.strip()]
-            state["execution_steps"] = steps
+            llm = cloud_llm()
+            response = invoke_text(llm, _step_prompt(state, selected_plan), node="human_selection")
+            _set_steps(state, response)
         except Exception as e:
-            state["logs"].append(f"Error generating steps: {e}")
-            # Fallback
-            state["execution_steps"] = ["Create main file", "Create requirements.txt"]
+            _fallback(state, e)
     else:
         state["logs"].append("No plan selected; skipping step generation.")
 
     return state
+
+async def arequest_selection(state: ProjectState) -> ProjectState:
+    selected_plan = state.get("selected_plan")
+    if not selected_plan:
+        state["logs"].append("No plan selected; skipping step generation.")
+        return state
+
+    state["logs"].append(f"Selected: {selected_plan.tech_stack}")
+    try:
+        prompt = await offload(_step_prompt, state, selected_plan)  # Loads the research blob and ranks it
+        response = await ainvoke_text(cloud_llm(), prompt, node="human_selection")
+        _set_steps(state, response)
+    except Exception as e:
+        _fallback(state, e)
+    return state
@@ -1,6 +1,10 @@
-from langchain_openai import ChatOpenAI
 from hybrid_ai_assistant.state.state import ProjectState, ProjectOption
+from hybrid_ai_assistant.state import blobs
 from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils.aio import offload
+from hybrid_ai_assistant.utils.llm_registry import cloud_llm
+from hybrid_ai_assistant.utils.llm_cache import ainvoke_structured, invoke_structured
+from hybrid_ai_assistant.utils.research_index import index_for
 from pydantic import BaseModel, Field
 from typing import List
 
@@ -8,22 +12,32 @@ from typing import List
 class OptionList(BaseModel):
     options: List[ProjectOption]
 
-def generate_options(state: ProjectState) -> ProjectState:
-    # UPDATED: Use with_structured_output for robust parsing
-    llm = ChatOpenAI(model=config.CLOUD_LLM, api_key=config.OPENAI_API_KEY)
-    structured_llm = llm.with_structured_output(OptionList)
-    
-    prompt = f"""
-    Based on the following research results: {state['research_memory']}
+def _prompt(state):
+    return f"""
+    Based on the following research results:
+    {index_for(state.get('research_memory', [])).render(state['objective'])}
     
     Generate 3 distinct implementation options for the objective: "{state['objective']}".
     """
+
+def generate_options(state: ProjectState) -> ProjectState:
+    # UPDATED: Use with_structured_output for robust parsing
+    llm = cloud_llm()
     
     try:
-        result = structured_llm.invoke(prompt)
-        state["plan_options"] = result.options
+        result = invoke_structured(llm, _prompt(state), OptionList, node="option_generator")
+        state["plan_options"] = blobs.store(result.options)
     except Exception as e:
         state["logs"].append(f"Error parsing options: {e}")
         # Fallback logic or retry could go here
         
     return state
+
+async def agenerate_options(state: ProjectState) -> ProjectState:
+    try:
+        prompt = await offload(_prompt, state)  # Loads the research blob and ranks it
+        result = await ainvoke_structured(cloud_llm(), prompt, OptionList, node="option_generator")
+        state["plan_options"] = await offload(blobs.store, result.options)
+    except Exception as e:
+        state["logs"].append(f"Error parsing options: {e}")
+    return state
@@ -1,27 +1,48 @@
-from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_openai import ChatOpenAI
 from hybrid_ai_assistant.state.state import ProjectState
-from hybrid_ai_assistant.tools.search import tavily_tool
+from hybrid_ai_assistant.state import blobs
+from hybrid_ai_assistant.tools.search import asearch_many, search_many
 from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils.aio import offload
+from hybrid_ai_assistant.utils.llm_registry import cloud_llm
+from hybrid_ai_assistant.utils.llm_cache import ainvoke_text, invoke_text
+from hybrid_ai_assistant.utils.research_index import index_for
+
+def _queries(response):
+    # Clean up empty lines
+    return [q.strip() for q in response.split("\n") if q.strip()]
+
+def _queries_prompt(state):
+    return f"Generate 3-5 research queries for: {state['objective']}. Return just the queries, one per line."
 
 def perform_research(state: ProjectState) -> ProjectState:
-    llm = ChatOpenAI(model=config.CLOUD_LLM, api_key=config.OPENAI_API_KEY)
+    llm = cloud_llm()
     # Fan-out: Generate queries
-    queries = llm.invoke(f"Generate 3-5 research queries for: {state['objective']}. Return just the queries, one per line.").content.split("\n")
-    # Parallel search
-    results = []
-    # Clean up empty lines
-    queries = [q for q in queries if q.strip()]
-    
-    for q in queries:
-        try:
-            res = tavily_tool.invoke({"query": q})
-            results.append({"query": q, "results": res})
-        except Exception as e:
-             results.append({"query": q, "error": str(e)})
+    queries = _queries(invoke_text(llm, _queries_prompt(state), node="research"))
 
-    state["research_memory"] = results
-    # Reflection
-    reflection = llm.invoke(f"Reflect on results for {state['objective']}: {results}")
-    state["logs"].append(reflection.content)
+    # Parallel search, bounded by RESEARCH_MAX_CONCURRENCY and the query/batch deadlines.
+    # Slow queries come back as errors so reflection can start on what has arrived.
+    results = search_many(queries)
+
+    # Raw search payloads are bulky; the checkpoint only keeps a reference
+    state["research_memory"] = blobs.store(results)
+    reflection = invoke_text(llm, _reflection_prompt(state, results), node="research")
+    state["logs"].append(blobs.log_text(reflection))
+    return state
+
+async def aperform_research(state: ProjectState) -> ProjectState:
+    llm = cloud_llm()
+    queries = _queries(await ainvoke_text(llm, _queries_prompt(state), node="research"))
+    results = await asearch_many(queries)
+    # Blob writes and the index build are blocking; they run on the blocking pool
+    state["research_memory"] = await offload(blobs.store, results)
+    reflection = await ainvoke_text(llm, await offload(_reflection_prompt, state, results), node="research")
+    state["logs"].append(await offload(blobs.log_text, reflection))
     return state
+
+def _reflection_prompt(state, results):
+    # Reflection sees the best deduplicated chunks, not the raw payloads; later nodes reuse the same index
+    context = index_for(state["research_memory"]).render(state["objective"])
+    failed = [r["query"] for r in results if "error" in r]
+    if failed:
+        context += f"\nQueries that returned nothing: {failed}"
+    return f"Reflect on results for {state['objective']}:\n{context}"
@@ -0,0 +1,8 @@
+from hybrid_ai_assistant.state.state import ProjectState
+from hybrid_ai_assistant.utils.routing import route_task
+
+def route_request(state: ProjectState) -> ProjectState:
+    # Cheap classification before any model call; the router LLM is only asked when the local model isn't sure
+    state["route"] = route_task(state)
+    state["logs"].append(f"Routed to {state['route']}")
+    return state
@@ -0,0 +1,268 @@
+import argparse
+import asyncio
+import importlib
+import json
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pydantic_core import to_jsonable_python
+from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.state import blobs
+from hybrid_ai_assistant.utils.aio import offload, run as run_async
+from hybrid_ai_assistant.utils.instrumentation import run_timings
+
+# A run is resumed at most this many times before it's reported as stuck
+MAX_RESUMES = 8
+
+_COMPLEXITY = {"low": 0, "medium": 1, "high": 2}
+
+def first_option(options, values):
+    return 0
+
+def simplest_option(options, values):
+    """The option with the lowest complexity (Low < Medium < High); ties go to the earlier option."""
+    return min(range(len(options)), key=lambda i: _COMPLEXITY.get(str(options[i].complexity).strip().lower(), 1))
+
+POLICIES = {"first": first_option, "simplest": simplest_option}
+
+def load_policy(spec):
+    """A selection policy by name, or "module:function" for a custom one.
+
+    A policy is called with (options, state values) at the human_selection
+    interrupt and returns the index of the option to execute.
+    """
+    if callable(spec):
+        return spec
+    if spec in POLICIES:
+        return POLICIES[spec]
+    if ":" not in spec:
+        raise ValueError(f"Unknown selection policy {spec!r}; use one of {sorted(POLICIES)} or module:function")
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+def read_objectives(path):
+    """Objectives from a JSONL file: one {"objective": ..., "thread_id"?: ...} object (or plain string) per line."""
+    items = []
+    with open(path) as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"objective": item}
+            if not isinstance(item, dict) or not item.get("objective"):
+                raise ValueError(f"{path}:{lineno}: expected an object with an \"objective\"")
+            items.append(item)
+    return items
+
+def read_progress(path):
+    """{index: last record} from an earlier batch's output, for --resume."""
+    progress = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short when the batch was killed
+                if isinstance(record, dict) and "index" in record:
+                    progress[record["index"]] = record
+    except FileNotFoundError:
+        pass
+    return progress
+
+def _initial_state(objective, thread_id):
+    return {
+        "objective": objective,
+        "logs": [],
+        "completed_steps": [],
+        "file_system_state": {},
+        "research_memory": [],
+        "plan_options": [],
+        "execution_steps": [],
+        "run_id": thread_id,
+    }
+
+def _select(snapshot, policy):
+    """The option index policy picks if snapshot is waiting at the selection interrupt, else None."""
+    if "human_selection" not in snapshot.next or snapshot.values.get("selected_plan"):
+        return None
+    options = blobs.load(snapshot.values.get("plan_options")) or []
+    if not options:
+        raise RuntimeError("No options to select from")
+    choice = policy(options, snapshot.values)
+    if not 0 <= choice < len(options):
+        raise ValueError(f"Selection policy returned {choice!r} for {len(options)} options")
+    return choice, options[choice]
+
+def run_objective(graph, objective, thread_id, policy):
+    """Drive one thread to the end, resolving the human_selection interrupt with policy.
+
+    Picks up wherever the thread's checkpoint left off, so the same call
+    starts a new run or resumes one from an interrupted batch. Returns
+    (final state values, index of the selected option or None).
+    """
+    run_config = {"configurable": {"thread_id": thread_id}}
+    choice = None
+    if not graph.get_state(run_config).values:
+        for _ in graph.stream(_initial_state(objective, thread_id), config=run_config):
+            pass
+
+    for _ in range(MAX_RESUMES):
+        snapshot = graph.get_state(run_config)
+        if not snapshot.next:
+            return snapshot.values, choice
+        selected = _select(snapshot, policy)
+        if selected is not None:
+            choice, option = selected
+            graph.update_state(run_config, {"selected_plan": option})
+        # Resuming with None input continues from the checkpoint
+        for _ in graph.stream(None, config=run_config):
+            pass
+    raise RuntimeError(f"Run still paused at {list(graph.get_state(run_config).next)} after {MAX_RESUMES} resumes")
+
+async def arun_objective(graph, objective, thread_id, policy):
+    """run_objective for an async graph (see orchestrator.graph.open_async_graph)."""
+    run_config = {"configurable": {"thread_id": thread_id}}
+    choice = None
+    if not (await graph.aget_state(run_config)).values:
+        async for _ in graph.astream(_initial_state(objective, thread_id), config=run_config):
+            pass
+
+    for _ in range(MAX_RESUMES):
+        snapshot = await graph.aget_state(run_config)
+        if not snapshot.next:
+            return snapshot.values, choice
+        # Loading the options reads the blob store
+        selected = await offload(_select, snapshot, policy)
+        if selected is not None:
+            choice, option = selected
+            await graph.aupdate_state(run_config, {"selected_plan": option})
+        async for _ in graph.astream(None, config=run_config):
+            pass
+    raise RuntimeError(f"Run still paused at {list((await graph.aget_state(run_config)).next)} after {MAX_RESUMES} resumes")
+
+def run_batch(items, out, concurrency=None, policy=None, resume=False, graph=None, include_state=True, progress=None,
+              asynchronous=False):
+    """Run objectives through the graph concurrently, streaming JSONL records to out.
+
+    Each run writes a {"type": "started"} record with its thread id before it
+    begins and a {"type": "result"} record with its status, timings and final
+    state when it ends. With resume, runs whose last record in out is a
+    completed result are skipped and the rest continue from the checkpointer
+    under their recorded thread ids. Returns the result records of this call.
+
+    With asynchronous, the runs are tasks on one event loop driving the async
+    graph, so concurrency can be far higher than the thread pool's. The graph
+    and its checkpointer are opened on that loop; graph is ignored.
+    """
+    from hybrid_ai_assistant.orchestrator.graph import get_graph, open_async_graph
+    if not asynchronous:
+        graph = graph or get_graph()
+    concurrency = concurrency or config.BATCH_CONCURRENCY
+    policy = load_policy(policy or config.BATCH_SELECTION_POLICY)
+    earlier = read_progress(out) if resume else {}
+    write_lock = threading.Lock()
+    results = []
+
+    pending = []
+    for index, item in enumerate(items):
+        previous = earlier.get(index)
+        if previous and previous.get("type") == "result" and previous.get("status") == "completed":
+            continue
+        thread_id = item.get("thread_id") or (previous or {}).get("thread_id") or str(uuid.uuid4())
+        pending.append((index, item["objective"], thread_id, previous is not None))
+
+    with open(out, "a+" if resume else "w") as f:
+        if f.tell():
+            f.seek(f.tell() - 1)
+            if f.read(1) != "\n":
+                f.write("\n")  # Don't append to a line cut short when the batch was killed
+
+        def write(record):
+            line = json.dumps(to_jsonable_python(record, fallback=str))
+            with write_lock:
+                f.write(line + "\n")
+                f.flush()
+
+        def start(task):
+            index, objective, thread_id, resumed = task
+            write({"type": "started", "index": index, "thread_id": thread_id, "objective": objective, "resumed": resumed})
+            return {"type": "result", "index": index, "thread_id": thread_id, "objective": objective}, time.perf_counter()
+
+        def finish(record, started, outcome):
+            # outcome is run_objective's (values, choice) or the exception it raised
+            thread_id = record["thread_id"]
+            if isinstance(outcome, Exception):
+                record.update(status="failed", error=f"{type(outcome).__name__}: {outcome}")
+            else:
+                values, choice = outcome
+                record.update(status="completed", selected=choice, completed_steps=len(values.get("completed_steps") or []))
+                if include_state:
+                    record["state"] = values
+            record["seconds"] = time.perf_counter() - started
+            record["timings"] = run_timings.summary(thread_id)
+            write(record)
+            with write_lock:
+                results.append(record)
+                if progress is not None:
+                    print(f"[{len(results)}/{len(pending)}] {record['status']} {thread_id} ({record['seconds']:.1f}s)",
+                          file=progress)
+            return record
+
+        def one(task):
+            record, started = start(task)
+            try:
+                outcome = run_objective(graph, task[1], task[2], policy)
+            except Exception as e:
+                outcome = e
+            return finish(record, started, outcome)
+
+        async def arun_all():
+            agraph = await open_async_graph()
+            slots = asyncio.Semaphore(concurrency)
+
+            async def aone(task):
+                async with slots:
+                    record, started = start(task)
+                    try:
+                        outcome = await arun_objective(agraph, task[1], task[2], policy)
+                    except Exception as e:
+                        outcome = e
+                    return finish(record, started, outcome)
+
+            try:
+                await asyncio.gather(*(aone(task) for task in pending))
+            finally:
+                agraph.checkpointer.conn.close()
+
+        if asynchronous:
+            run_async(arun_all())
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+                list(pool.map(one, pending))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run objectives from a JSONL file headlessly.")
+    parser.add_argument("--batch", dest="input", required=True, help="JSONL file of objectives")
+    parser.add_argument("--out", required=True, help="JSONL file for the streamed records")
+    parser.add_argument("--concurrency", type=int, default=config.BATCH_CONCURRENCY, help="Runs at once")
+    parser.add_argument("--policy", default=config.BATCH_SELECTION_POLICY,
+                        help=f"Option selection: {', '.join(sorted(POLICIES))} or module:function")
+    parser.add_argument("--resume", action="store_true", help="Skip runs completed in --out and continue the rest")
+    parser.add_argument("--async", dest="asynchronous", action="store_true",
+                        help="Run on one event loop with the async graph (for high --concurrency)")
+    parser.add_argument("--no-state", dest="include_state", action="store_false", help="Leave final states out of the records")
+    args = parser.parse_args(argv)
+
+    results = run_batch(read_objectives(args.input), args.out, args.concurrency, args.policy, args.resume,
+                        include_state=args.include_state, progress=sys.stderr, asynchronous=args.asynchronous)
+    failed = sum(1 for r in results if r["status"] != "completed")
+    print(f"{len(results) - failed} completed, {failed} failed; records in {args.out}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
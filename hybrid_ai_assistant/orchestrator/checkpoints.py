@@ -0,0 +1,241 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from langgraph.checkpoint.sqlite import SqliteSaver
+from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.state.blobs import find_digests, get_blobs, serializer
+from hybrid_ai_assistant.utils.aio import offload
+from hybrid_ai_assistant.utils.instrumentation import observe_payload, record
+
+class CheckpointMetrics:
+    """Checkpoint write latency and size, aggregated per node."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.nodes = {}  # node -> {"writes", "seconds", "max_seconds", "bytes", "max_bytes"}
+
+    def record(self, node, seconds, size):
+        with self._lock:
+            m = self.nodes.setdefault(node, {"writes": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": 0, "max_bytes": 0})
+            m["writes"] += 1
+            m["seconds"] += seconds
+            m["max_seconds"] = max(m["max_seconds"], seconds)
+            m["bytes"] += size
+            m["max_bytes"] = max(m["max_bytes"], size)
+
+    def summary(self):
+        with self._lock:
+            return {node: dict(m) for node, m in self.nodes.items()}
+
+checkpoint_metrics = CheckpointMetrics()
+
+class CheckpointStore(SqliteSaver):
+    """SqliteSaver with connection tuning, per-thread retention and metrics.
+
+    keep_last bounds how many checkpoints each thread keeps; older ones (and
+    their pending writes) are deleted as new ones are written. 0 keeps all.
+    prune_completed() and compact() also delete blobs that no remaining
+    checkpoint refers to, from blob_store (the default store if None).
+    """
+
+    def __init__(self, conn, keep_last=0, metrics=None, **kwargs):
+        super().__init__(conn, **kwargs)
+        self.keep_last = keep_last
+        self.metrics = metrics or checkpoint_metrics
+        self.blob_store = None
+        # (thread_id, checkpoint_id) -> nodes that ran from that checkpoint. Writes
+        # and the checkpoint they produce both carry the parent checkpoint id,
+        # which keeps attribution right when puts are deferred.
+        self._pending_nodes = {}
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        # task_path looks like "~__pregel_pull, research"; the node name is the last part
+        node = task_path.split(", ")[-1] if task_path else "unknown"
+        key = (config["configurable"]["thread_id"], config["configurable"].get("checkpoint_id"))
+        if len(self._pending_nodes) > 10000:
+            # Writes from interrupted steps never get a checkpoint; don't let them pile up
+            self._pending_nodes.clear()
+        nodes = self._pending_nodes.setdefault(key, [])
+        if node not in nodes:
+            nodes.append(node)
+        return super().put_writes(config, writes, task_id, task_path)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        started = time.perf_counter()
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        elapsed = time.perf_counter() - started
+
+        with self.cursor() as cur:
+            row = cur.execute(
+                "SELECT length(checkpoint) + length(metadata) FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint["id"]),
+            ).fetchone()
+            if self.keep_last:
+                self._trim(cur, thread_id, checkpoint_ns)
+
+        parent_id = config["configurable"].get("checkpoint_id")
+        node = ",".join(self._pending_nodes.pop((thread_id, parent_id), [])) or metadata.get("source", "unknown")
+        size = row[0] if row and row[0] else 0
+        self.metrics.record(node, elapsed, size)
+        # Thread ids are run ids, which are also the trace ids of node spans
+        record("checkpoint", node, elapsed, trace_id=thread_id)
+        observe_payload("checkpoint", node, "request", size)
+        return saved
+
+    def _trim(self, cur, thread_id, checkpoint_ns):
+        # Checkpoint ids are time-ordered (uuid6), so the newest sort last
+        keep = "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT ?"
+        args = (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last)
+        cur.execute(f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ({keep})", args)
+        cur.execute(f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ({keep})", args)
+
+    def thread_ids(self):
+        with self.cursor(transaction=False) as cur:
+            return [r[0] for r in cur.execute("SELECT DISTINCT thread_id FROM checkpoints").fetchall()]
+
+    def prune_completed(self, max_age_hours, is_complete):
+        """Delete threads that are complete and whose last checkpoint is older than max_age_hours.
+
+        is_complete(thread_id) decides completion, typically by checking that
+        the compiled graph has no pending nodes for the thread.
+        """
+        cutoff = time.time() - max_age_hours * 3600
+        removed = []
+        for thread_id in self.thread_ids():
+            latest = self.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}})
+            if latest is None:
+                continue
+            ts = datetime.fromisoformat(latest.checkpoint["ts"])
+            if ts.tzinfo is None:
+                ts = ts.replace(tzinfo=timezone.utc)
+            if ts.timestamp() < cutoff and is_complete(thread_id):
+                self.delete_thread(thread_id)
+                removed.append(thread_id)
+        self.collect_blobs()
+        return removed
+
+    def compact(self):
+        """Fold the WAL into the main file and VACUUM. Returns (bytes before, bytes after)."""
+        before = self.size_bytes()
+        self.collect_blobs()
+        with self.lock:
+            self.conn.commit()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.conn.execute("VACUUM")
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return before, self.size_bytes()
+
+    def referenced_blobs(self):
+        """Blob digests mentioned by any stored checkpoint or pending write."""
+        found = set()
+        with self.cursor(transaction=False) as cur:
+            # Serialized state keeps digests as plain strings, so the raw bytes can be scanned
+            for (data,) in cur.execute("SELECT checkpoint FROM checkpoints"):
+                found |= find_digests(data)
+            for (data,) in cur.execute("SELECT value FROM writes"):
+                found |= find_digests(data or b"")
+        return found
+
+    def collect_blobs(self):
+        """Delete unreferenced blobs. Returns how many were removed."""
+        return (self.blob_store or get_blobs()).collect(self.referenced_blobs())
+
+    def size_bytes(self):
+        with self.cursor(transaction=False) as cur:
+            pages = cur.execute("PRAGMA page_count").fetchone()[0]
+            page_size = cur.execute("PRAGMA page_size").fetchone()[0]
+        return pages * page_size
+
+    def stats(self):
+        with self.cursor(transaction=False) as cur:
+            threads, checkpoints, checkpoint_bytes = cur.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*), COALESCE(SUM(length(checkpoint) + length(metadata)), 0) FROM checkpoints"
+            ).fetchone()
+            writes = cur.execute("SELECT COUNT(*) FROM writes").fetchone()[0]
+        return {
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "checkpoint_bytes": checkpoint_bytes,
+            "writes": writes,
+            "file_bytes": self.size_bytes(),
+        }
+
+class AsyncCheckpointStore(CheckpointStore):
+    """CheckpointStore for graphs driven with astream.
+
+    Each async method runs its sync counterpart on the blocking pool (see
+    utils.aio): one thread hop per operation. aiosqlite would take a hop per
+    cursor call, all through one worker thread that every run queues behind.
+    """
+
+    async def aget_tuple(self, config):
+        return await offload(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for item in await offload(lambda: list(self.list(config, filter=filter, before=before, limit=limit))):
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await offload(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await offload(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return await offload(self.delete_thread, thread_id)
+
+def open_checkpointer(path=None, keep_last=None, metrics=None, store=None):
+    path = path or config.CHECKPOINT_DB
+    keep_last = config.CHECKPOINT_KEEP_LAST if keep_last is None else keep_last
+    parent = os.path.dirname(path)
+    if parent and not os.path.exists(parent):
+        os.makedirs(parent, exist_ok=True)
+
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=config.CHECKPOINT_BUSY_TIMEOUT)
+    # WAL lets API readers poll while a run is writing; NORMAL sync is safe under WAL
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(config.CHECKPOINT_BUSY_TIMEOUT * 1000)}")
+    return (store or CheckpointStore)(conn, keep_last=keep_last, metrics=metrics, serde=serializer())
+
+async def open_async_checkpointer(path=None, keep_last=None, metrics=None):
+    """The async store on the same database. Close it with `store.conn.close()`."""
+    return await offload(open_checkpointer, path, keep_last, metrics, AsyncCheckpointStore)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "stats"
+    store = open_checkpointer()
+
+    if command == "stats":
+        for k, v in store.stats().items():
+            print(f"{k}: {v}")
+    elif command == "prune":
+        hours = float(argv[1]) if len(argv) > 1 else config.CHECKPOINT_COMPLETED_TTL_HOURS
+        if hours <= 0:
+            print("Pass an age in hours or set CHECKPOINT_COMPLETED_TTL_HOURS")
+            return 1
+        from hybrid_ai_assistant.orchestrator.graph import get_graph
+        removed = store.prune_completed(
+            hours,
+            lambda t: not get_graph().get_state({"configurable": {"thread_id": t}}).next,
+        )
+        print(f"Removed {len(removed)} completed threads older than {hours}h")
+    elif command == "compact":
+        before, after = store.compact()
+        print(f"Compacted {config.CHECKPOINT_DB}: {before} -> {after} bytes")
+    elif command == "gc":
+        print(f"Removed {store.collect_blobs()} unreferenced blobs from {config.BLOB_PATH}")
+    else:
+        print("Usage: python -m hybrid_ai_assistant.orchestrator.checkpoints [stats|prune [hours]|compact|gc]")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
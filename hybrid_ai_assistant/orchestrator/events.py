@@ -0,0 +1,33 @@
+from hybrid_ai_assistant.state.state import new_entries
+
+def node_events(stream, logs=None):
+    """Turn compiled_graph.stream() output into per-node events.
+
+    Each event is {"type": "node", "node": name, "logs": [new lines]}, carrying
+    only the log lines the node added. logs is the log list the run started
+    from (the initial state, or the checkpoint being resumed).
+    """
+    known = list(logs or [])
+    for event in stream:
+        events, known = _split(event, known)
+        yield from events
+
+async def anode_events(stream, logs=None):
+    """node_events for compiled_graph.astream()."""
+    known = list(logs or [])
+    async for event in stream:
+        events, known = _split(event, known)
+        for e in events:
+            yield e
+
+def _split(event, known):
+    events = []
+    for node, update in event.items():
+        # Skip LangGraph bookkeeping such as "__interrupt__"
+        if node.startswith("__"):
+            continue
+        new_logs = []
+        if isinstance(update, dict) and "logs" in update:
+            new_logs, known = new_entries(known, update["logs"])
+        events.append({"type": "node", "node": node, "logs": new_logs})
+    return events, known
@@ -1,21 +1,48 @@
-from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.sqlite import SqliteSaver
-from hybrid_ai_assistant.state.state import ProjectState
-from hybrid_ai_assistant.nodes.clarification import clarify_request
-from hybrid_ai_assistant.nodes.research import perform_research
-from hybrid_ai_assistant.nodes.option_generator import generate_options
-from hybrid_ai_assistant.nodes.human_selection import request_selection  # UPDATED: Renamed import
-from hybrid_ai_assistant.nodes.execution import execute_plan
-import sqlite3
-
-def build_graph():
+import asyncio
+import threading
+
+_graph = None
+_graph_lock = threading.Lock()
+_async_graph = None  # A compiled graph, or the task opening one
+
+def build_graph(checkpointer=None, asynchronous=False):
+    """Compile the workflow.
+
+    With asynchronous, the nodes are the async variants (ainvoke, async
+    search) and the graph must be driven with astream/ainvoke and given an
+    AsyncCheckpointStore, see open_async_graph.
+    """
+    # Imported here rather than at module level: LangGraph and the nodes' clients take most of a second
+    # to import, and the CLI, the API and tests should only pay that once a graph is actually needed
+    from langgraph.graph import StateGraph, END
+    from hybrid_ai_assistant.state.state import ProjectState
+    from hybrid_ai_assistant.state.blobs import ref_len
+    from hybrid_ai_assistant.nodes.routing import route_request
+    from hybrid_ai_assistant.nodes.clarification import aclarify_request, clarify_request
+    from hybrid_ai_assistant.nodes.research import aperform_research, perform_research
+    from hybrid_ai_assistant.nodes.option_generator import agenerate_options, generate_options
+    from hybrid_ai_assistant.nodes.human_selection import arequest_selection, request_selection  # UPDATED: Renamed import
+    from hybrid_ai_assistant.nodes.execution import aexecute_plan, execute_plan
+    from hybrid_ai_assistant.config.config import config
+    from hybrid_ai_assistant.orchestrator.checkpoints import open_checkpointer
+    from hybrid_ai_assistant.utils.instrumentation import traced_node
+
+    if asynchronous:
+        if checkpointer is None:
+            raise ValueError("An async graph needs an async checkpointer; see open_async_graph")
+        # Routing is local and fast, so it stays synchronous; LangGraph runs it in an executor
+        clarify_request, perform_research, generate_options = aclarify_request, aperform_research, agenerate_options
+        request_selection, execute_plan = arequest_selection, aexecute_plan
+
     graph = StateGraph(ProjectState)
 
-    graph.add_node("clarification", clarify_request)
-    graph.add_node("research", perform_research)
-    graph.add_node("option_generator", generate_options)
-    graph.add_node("human_selection", request_selection)  # UPDATED: Uses new function
-    graph.add_node("execution", execute_plan)
+    # Every node runs in a span (durations, errors, trace ids on its log lines); see utils.instrumentation
+    graph.add_node("routing", traced_node("routing", route_request))
+    graph.add_node("clarification", traced_node("clarification", clarify_request))
+    graph.add_node("research", traced_node("research", perform_research))
+    graph.add_node("option_generator", traced_node("option_generator", generate_options))
+    graph.add_node("human_selection", traced_node("human_selection", request_selection))  # UPDATED: Uses new function
+    graph.add_node("execution", traced_node("execution", execute_plan))
 
     # UPDATED: Conditional edges for clarification
     def route_clarification(state):
@@ -33,20 +60,83 @@ def build_graph():
         route_clarification,
         {
             "research": "research",
-            "end": END  # If you implemented a halt logic
+            END: END  # If you implemented a halt logic
+        }
+    )
+
+    # Every route goes through clarification and research unless ROUTE_LOCAL_SKIP_RESEARCH lets
+    # execute-style objectives ("local") go straight to options
+    def route_after_routing(state):
+        if config.ROUTE_LOCAL_SKIP_RESEARCH and state.get("route") == "local":
+            return "option_generator"
+        return "clarification"
+
+    graph.add_conditional_edges(
+        "routing",
+        route_after_routing,
+        {
+            "clarification": "clarification",
+            "option_generator": "option_generator",
         }
     )
     
     # Needs entry point
-    graph.set_entry_point("clarification")
+    graph.set_entry_point("routing")
 
-    graph.add_conditional_edges("research", lambda s: "option_generator" if len(s["research_memory"]) > 0 else "research")  # Loop for reflection
+    graph.add_conditional_edges("research", lambda s: "option_generator" if ref_len(s["research_memory"]) > 0 else "research")  # Loop for reflection
     graph.add_edge("option_generator", "human_selection")
     graph.add_edge("human_selection", "execution")
     graph.add_edge("execution", END)
 
-    checkpointer = SqliteSaver.from_conn_string("checkpoints.db")
+    # Path, WAL/busy-timeout tuning and per-thread retention come from config
+    checkpointer = checkpointer or open_checkpointer()
     # UPDATED: Interrupt before human_selection
     return graph.compile(checkpointer=checkpointer, interrupt_before=["human_selection"])
 
-compiled_graph = build_graph()
+def get_graph():
+    """The process-wide compiled graph; built, and its checkpoint store opened, on first use."""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = build_graph()
+    return _graph
+
+def set_graph(graph):
+    """Swap the compiled graph (e.g. for tests); None rebuilds from config on next use."""
+    global _graph
+    _graph = graph
+
+async def open_async_graph(path=None):
+    """An async graph with its own AsyncCheckpointStore; close it with `graph.checkpointer.conn.close()`."""
+    from hybrid_ai_assistant.orchestrator.checkpoints import open_async_checkpointer
+    return build_graph(checkpointer=await open_async_checkpointer(path), asynchronous=True)
+
+async def aget_graph():
+    """The process-wide async graph, opened on first use.
+
+    It belongs to the event loop that first asked for it, which for the API
+    is the async job runner's loop (see api.jobs).
+    """
+    global _async_graph
+    if _async_graph is None:
+        # No await between the check and the assignment, so concurrent first callers share one task
+        _async_graph = asyncio.ensure_future(open_async_graph())
+    if isinstance(_async_graph, asyncio.Future):
+        try:
+            return await asyncio.shield(_async_graph)
+        except Exception:
+            _async_graph = None  # Try again on the next call
+            raise
+    return _async_graph
+
+def set_async_graph(graph):
+    """Swap the async graph (e.g. for tests); None reopens it from config on next use."""
+    global _async_graph
+    _async_graph = graph
+
+def __getattr__(name):
+    # `from ...graph import compiled_graph` keeps working, but builds the graph at that import
+    if name == "compiled_graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
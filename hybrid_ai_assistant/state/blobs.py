@@ -0,0 +1,248 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from hybrid_ai_assistant.config.config import config
+
+# State fields that may hold a blob reference instead of the value itself:
+#   {"__blob__": "<sha256>", "size": <bytes>, "len": <items, for lists>}
+# The checkpoint only ever sees the reference; load() fetches the value when a
+# node or the API actually reads it.
+REF_KEY = "__blob__"
+# Digests as they appear in references and [blob:<sha256>] log suffixes
+_DIGEST = re.compile(rb"[0-9a-f]{64}")
+
+class FileBlobStore:
+    """Blobs as files named by their hash, sharded by the first two hex digits."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def put(self, digest, data: bytes):
+        path = self._path(digest)
+        if os.path.exists(path):
+            # Refresh the age so a collection doesn't take a blob a new run just reused
+            os.utime(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so readers never see a partial blob
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, digest) -> bytes:
+        with open(self._path(digest), "rb") as f:
+            return f.read()
+
+    def digests(self, older_than):
+        """Digests last written before the older_than timestamp."""
+        if not os.path.isdir(self.root):
+            return
+        for shard in os.listdir(self.root):
+            folder = os.path.join(self.root, shard)
+            if len(shard) != 2 or not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if name.endswith(".tmp"):
+                    continue
+                try:
+                    if os.path.getmtime(os.path.join(folder, name)) < older_than:
+                        yield shard + name
+                except FileNotFoundError:
+                    pass
+
+    def delete(self, digests):
+        for digest in digests:
+            try:
+                os.remove(self._path(digest))
+            except FileNotFoundError:
+                pass
+
+class SqliteBlobStore:
+    """Blobs in a single SQLite table keyed by hash."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            parent = os.path.dirname(self.path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=config.CHECKPOINT_BUSY_TIMEOUT)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, data BLOB, created REAL)")
+            columns = [r[1] for r in self._conn.execute("PRAGMA table_info(blobs)")]
+            if "created" not in columns:
+                # Stores from before collection existed; their rows count as old
+                self._conn.execute("ALTER TABLE blobs ADD COLUMN created REAL")
+            self._conn.commit()
+        return self._conn
+
+    def put(self, digest, data: bytes):
+        with self._lock:
+            conn = self._connect()
+            # Refresh the age so a collection doesn't take a blob a new run just reused
+            conn.execute(
+                "INSERT INTO blobs (digest, data, created) VALUES (?, ?, ?) "
+                "ON CONFLICT(digest) DO UPDATE SET created = excluded.created",
+                (digest, data, time.time()),
+            )
+            conn.commit()
+
+    def get(self, digest) -> bytes:
+        with self._lock:
+            row = self._connect().execute("SELECT data FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            raise KeyError(digest)
+        return row[0]
+
+    def digests(self, older_than):
+        """Digests last written before the older_than timestamp."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT digest FROM blobs WHERE COALESCE(created, 0) < ?", (older_than,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def delete(self, digests):
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("DELETE FROM blobs WHERE digest = ?", [(d,) for d in digests])
+            conn.commit()
+
+def serializer():
+    """The checkpointer's serde, with the state models allowed through msgpack.
+
+    Blobs use it too, so pydantic models like ProjectOption round-trip.
+    """
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    try:
+        return JsonPlusSerializer(allowed_msgpack_modules=[("hybrid_ai_assistant.state.state", "ProjectOption")])
+    except TypeError:
+        return JsonPlusSerializer()
+
+class Blobs:
+    """Content-addressed storage for bulky state values.
+
+    Values whose encoding is at most inline_limit bytes are returned unchanged
+    by store(), so small fields stay inline. Recently read blobs are kept in a
+    small in-memory LRU of raw bytes. collect() deletes blobs nothing refers
+    to once they are older than min_age seconds.
+    """
+
+    def __init__(self, backend, inline_limit=None, cache_size=64, min_age=None):
+        self.backend = backend
+        self.inline_limit = config.BLOB_INLINE_LIMIT if inline_limit is None else inline_limit
+        self.min_age = config.BLOB_GC_MIN_AGE if min_age is None else min_age
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._serde = serializer()
+
+    def store(self, value):
+        if is_ref(value):
+            return value
+        type_tag, payload = self._serde.dumps_typed(value)
+        data = type_tag.encode() + b"\0" + payload
+        if len(data) <= self.inline_limit:
+            return value
+        return self._put(value, data)
+
+    def _put(self, value, data):
+        digest = hashlib.sha256(data).hexdigest()
+        self.backend.put(digest, data)
+        ref = {REF_KEY: digest, "size": len(data)}
+        if isinstance(value, list):
+            ref["len"] = len(value)
+        return ref
+
+    def load(self, value):
+        if not is_ref(value):
+            return value
+        type_tag, payload = self.raw(value[REF_KEY]).split(b"\0", 1)
+        return self._serde.loads_typed((type_tag.decode(), payload))
+
+    def raw(self, digest) -> bytes:
+        with self._lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return self._cache[digest]
+        data = self.backend.get(digest)
+        with self._lock:
+            self._cache[digest] = data
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return data
+
+    def log_text(self, text: str, limit=None) -> str:
+        """Shorten a long log line, keeping the full text in the store.
+
+        The line keeps its first limit characters and ends with [blob:<sha256>]
+        so the API can serve the rest on demand.
+        """
+        limit = limit or config.BLOB_LOG_INLINE_CHARS
+        if len(text) <= limit:
+            return text
+        type_tag, payload = self._serde.dumps_typed(text)
+        ref = self._put(text, type_tag.encode() + b"\0" + payload)
+        return f"{text[:limit]}... [blob:{ref[REF_KEY]}]"
+
+    def collect(self, referenced) -> int:
+        """Delete blobs whose digest is not in referenced. Returns how many.
+
+        Blobs younger than min_age are kept: a step stores its blobs before
+        the checkpoint that refers to them is written.
+        """
+        unreferenced = [d for d in self.backend.digests(time.time() - self.min_age) if d not in referenced]
+        self.backend.delete(unreferenced)
+        with self._lock:
+            for digest in unreferenced:
+                self._cache.pop(digest, None)
+        return len(unreferenced)
+
+def is_ref(value) -> bool:
+    return isinstance(value, dict) and REF_KEY in value
+
+def find_digests(data: bytes) -> set:
+    """Digests mentioned in serialized state, as refs or in log lines."""
+    return {m.decode() for m in _DIGEST.findall(data)}
+
+def ref_len(value) -> int:
+    """len() of a field that may be a blob reference, without loading it."""
+    if is_ref(value):
+        return value.get("len", 1)
+    return len(value or [])
+
+_default = None
+_default_lock = threading.Lock()
+
+def get_blobs() -> Blobs:
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                if config.BLOB_BACKEND == "sqlite":
+                    backend = SqliteBlobStore(config.BLOB_PATH)
+                else:
+                    backend = FileBlobStore(config.BLOB_PATH)
+                _default = Blobs(backend)
+    return _default
+
+def store(value):
+    return get_blobs().store(value)
+
+def load(value):
+    return get_blobs().load(value)
+
+def log_text(text: str) -> str:
+    return get_blobs().log_text(text)
@@ -1,7 +1,24 @@
 from typing import TypedDict, List, Annotated, Optional
-import operator
 from pydantic import BaseModel, Field
 
+def append_new(existing: list, update: list) -> list:
+    """Reducer for append-only lists such as logs and completed_steps.
+
+    Nodes return the whole state they were given, so an update normally
+    repeats the current list with new entries on the end. Only that tail is
+    appended; an update that doesn't start with the current list is appended
+    whole.
+    """
+    new, _ = new_entries(existing, update)
+    return existing + new
+
+def new_entries(known: list, update: list):
+    """Split an append-only list update into (new entries, resulting list)."""
+    update = update or []
+    if update[:len(known)] == known:
+        return update[len(known):], list(update)
+    return list(update), known + update
+
 class ProjectOption(BaseModel):
     tech_stack: str = Field(description="Main technologies")
     pros: List[str]
@@ -11,13 +28,15 @@ class ProjectOption(BaseModel):
 
 class ProjectState(TypedDict):
     objective: str
+    route: Optional[str]  # "cloud" (research and plan) or "local" (straight to options), see utils.routing
     clarification_status: bool
-    research_memory: List[dict]  # {query: str, results: List[str]}
-    plan_options: List[ProjectOption]
+    research_memory: List[dict]  # {query: str, results: List[str]}; may be a blob ref, see state.blobs
+    plan_options: List[ProjectOption]  # May be a blob ref, see state.blobs
     selected_plan: Optional[ProjectOption]
     execution_steps: List[str]
-    completed_steps: Annotated[List[str], operator.add]
-    file_system_state: dict  # Tree-like dict of dir structure
-    logs: Annotated[List[str], operator.add]
+    step_dependencies: Optional[List[List[int]]]  # Indices of earlier steps each step waits for
+    completed_steps: Annotated[List[str], append_new]
+    file_system_state: dict  # Workspace manifest: {path: {"sha", "size"}}
+    logs: Annotated[List[str], append_new]
     container_id: Optional[str]  # ADDED: For per-session Docker isolation
     run_id: Optional[str]  # ADDED: For filesystem isolation
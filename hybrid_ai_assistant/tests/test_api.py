@@ -0,0 +1,63 @@
+import tempfile
+import threading
+import unittest
+from hybrid_ai_assistant.api.events import EventLog
+from hybrid_ai_assistant.api.jobs import JobManager
+from hybrid_ai_assistant.bench.run import offline, parse_args
+
+def blocking_run(release):
+    def run(graph_input, thread_id, cancel_event=None, on_event=None):
+        release.wait(5)
+        return "done"
+    return run
+
+class TestAcceptedRuns(unittest.TestCase):
+    """Runs /start accepted that have no checkpoint yet."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._offline = offline(self._tmp.name, parse_args(["--llm-latency", "0", "--search-latency", "0", "--exec-latency", "0"]))
+        self._offline.__enter__()
+        # Imported here so the app's job pool picks up the offline config
+        from hybrid_ai_assistant.api import app as api
+        self.api = api
+        self.saved = api.jobs, api.events, api.STREAM_HEARTBEAT
+        api.events = EventLog()
+        api.jobs = JobManager(max_workers=1, max_queue=10, kind="thread", events=api.events)
+        # Holds the only worker, so runs started after it stay queued
+        self.release = threading.Event()
+        api.jobs.submit("busy", {}, fn=blocking_run(self.release))
+        self.client = api.app.test_client()
+        self.run_id = self.client.post("/start", json={"objective": "Build a CLI"}).get_json()["run_id"]
+
+    def tearDown(self):
+        self.release.set()
+        self.api.jobs.shutdown()
+        self.api.jobs, self.api.events, self.api.STREAM_HEARTBEAT = self.saved
+        self._offline.__exit__(None, None, None)
+        self._tmp.cleanup()
+
+    def test_queued_run_is_found(self):
+        body = self.client.get(f"/poll/{self.run_id}?since=0").get_json()
+        self.assertEqual((body["status"], body["events"]), ("queued", []))
+        self.assertEqual(self.client.get(f"/poll/{self.run_id}").get_json(), {"status": "queued"})
+
+        self.api.STREAM_HEARTBEAT = 0.05  # The test client reads the first chunk: a keep-alive while queued
+        response = self.client.get(f"/stream/{self.run_id}")
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_run_cancelled_while_queued(self):
+        self.assertEqual(self.client.post(f"/cancel/{self.run_id}").status_code, 200)
+        self.assertEqual(
+            self.client.get(f"/poll/{self.run_id}").get_json(),
+            {"status": "cancelled", "error": None, "logs": []},
+        )
+        self.assertEqual(self.client.get(f"/poll/{self.run_id}?since=0").get_json()["status"], "cancelled")
+
+    def test_unknown_run_is_not_found(self):
+        self.assertEqual(self.client.get("/poll/nope?since=0").get_json(), {"status": "not_found"})
+        self.assertEqual(self.client.get("/stream/nope").status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
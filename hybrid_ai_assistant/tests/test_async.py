@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from hybrid_ai_assistant.api.jobs import JobManager
+from hybrid_ai_assistant.bench.fakes import FakeSearch, Latency
+from hybrid_ai_assistant.bench.run import OBJECTIVES, offline, parse_args
+from hybrid_ai_assistant.orchestrator.batch import arun_objective, run_batch, simplest_option
+from hybrid_ai_assistant.orchestrator.graph import aget_graph, open_async_graph
+from hybrid_ai_assistant.tools.search import asearch_many
+from hybrid_ai_assistant.utils.gateway import Gateway, coalesced
+
+class EventLog:
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def publish(self, run_id, event):
+        with self._lock:
+            self.events.append((run_id, event))
+
+class TestGateway(unittest.TestCase):
+    def test_identical_in_flight_calls_share_one_result(self):
+        calls = []
+
+        async def provider():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        async def main():
+            gateway = Gateway(limits={})
+            keys = ["same"] * 5 + ["other"]
+            return await asyncio.gather(*(gateway.acall("afake", "m", provider, key=k) for k in keys))
+
+        before = coalesced.value(provider="afake")
+        self.assertEqual(asyncio.run(main()), ["ok"] * 6)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(coalesced.value(provider="afake"), before + 4)
+
+    def test_failures_reach_every_waiting_caller(self):
+        async def provider():
+            await asyncio.sleep(0.05)
+            raise ValueError("boom")
+
+        async def main():
+            gateway = Gateway(limits={})
+            return await asyncio.gather(*(gateway.acall("afake", "m", provider, key="k") for _ in range(3)),
+                                        return_exceptions=True)
+
+        self.assertTrue(all(isinstance(r, ValueError) for r in asyncio.run(main())))
+
+class TestSearchMany(unittest.TestCase):
+    def test_results_in_query_order_with_errors_and_deadlines(self):
+        search = FakeSearch(results=1)
+
+        async def backend(query):
+            if query == "slow":
+                await asyncio.sleep(5)
+            if query == "broken":
+                raise RuntimeError("backend down")
+            return await search.asearch(query)
+
+        started = time.perf_counter()
+        results = asyncio.run(asearch_many(["a", "slow", "broken", "b"], search=backend, query_timeout=0.2))
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertEqual([r["query"] for r in results], ["a", "slow", "broken", "b"])
+        self.assertEqual(results[0]["results"][0]["content"], "Result 0 for a")
+        self.assertEqual(results[1]["error"], "Timed out after 0.2s")
+        self.assertEqual(results[2]["error"], "backend down")
+
+        results = asyncio.run(asearch_many(["slow", "a"], search=backend, query_timeout=5, batch_timeout=0.2))
+        self.assertIn("batch deadline", results[0]["error"])
+        self.assertIn("results", results[1])
+
+class OfflineCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        self._offline = offline(self.tmp, parse_args(["--llm-latency", "0.01", "--search-latency", "0", "--exec-latency", "0"]))
+        self._offline.__enter__()
+
+    def tearDown(self):
+        self._offline.__exit__(None, None, None)
+        self._tmp.cleanup()
+
+class TestAsyncGraph(OfflineCase):
+    def test_objectives_run_to_completion_concurrently(self):
+        async def main():
+            graph = await open_async_graph(os.path.join(self.tmp, "async.db"))
+            try:
+                return await asyncio.gather(*(arun_objective(graph, o, f"async-{i}", simplest_option)
+                                              for i, o in enumerate(OBJECTIVES * 2)))
+            finally:
+                graph.checkpointer.conn.close()
+
+        for values, choice in asyncio.run(main()):
+            self.assertEqual(choice, 0)
+            self.assertEqual(values["selected_plan"].complexity, "Low")
+            self.assertTrue(values["completed_steps"])
+            self.assertTrue(any("Executed" in str(line) for line in values["logs"]))
+
+    def test_batch_async(self):
+        out = os.path.join(self.tmp, "results.jsonl")
+        items = [{"objective": o} for o in OBJECTIVES * 2]
+        results = run_batch(items, out, concurrency=4, policy="simplest", include_state=False, asynchronous=True)
+        self.assertEqual([r["status"] for r in results], ["completed"] * 4)
+        with open(out) as f:
+            self.assertEqual(sorted(json.loads(line)["type"] for line in f), ["result"] * 4 + ["started"] * 4)
+
+class TestAsyncJobs(OfflineCase):
+    def setUp(self):
+        super().setUp()
+        self.events = EventLog()
+        self.jobs = JobManager(kind="async", events=self.events)
+
+    def tearDown(self):
+        async def close_graph():
+            (await aget_graph()).checkpointer.conn.close()
+
+        self.jobs.submit("close", None, fn=lambda *args, **kwargs: close_graph()).future.result(timeout=5)
+        self.jobs.shutdown()
+        super().tearDown()
+
+    def test_runs_pause_at_selection_and_publish_node_events(self):
+        self.assertTrue(self.jobs.live_events)
+        submitted = []
+        for i, objective in enumerate(OBJECTIVES):
+            initial = {"objective": objective, "logs": [], "completed_steps": [], "file_system_state": {},
+                       "research_memory": [], "plan_options": [], "execution_steps": [], "run_id": f"job-{i}"}
+            submitted.append(self.jobs.submit(f"job-{i}", initial))
+        self.assertEqual([job.future.result(timeout=10) for job in submitted], ["interrupted"] * len(OBJECTIVES))
+        self.assertEqual({job.status for job in submitted}, {"interrupted"})
+
+        time.sleep(0.05)  # Status events are published from the futures' callbacks
+        for i in range(len(OBJECTIVES)):
+            events = [e for run_id, e in self.events.events if run_id == f"job-{i}"]
+            self.assertIn("option_generator", {e.get("node") for e in events})
+            self.assertEqual(events[-1], {"type": "status", "status": "interrupted"})
+
+if __name__ == '__main__':
+    unittest.main()
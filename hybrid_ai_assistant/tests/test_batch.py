@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import unittest
+from hybrid_ai_assistant.bench.fakes import scripted_options
+from hybrid_ai_assistant.bench.run import OBJECTIVES, offline, parse_args
+from hybrid_ai_assistant.orchestrator.batch import first_option, load_policy, read_objectives, run_batch, simplest_option
+from hybrid_ai_assistant.orchestrator.checkpoints import open_checkpointer
+from hybrid_ai_assistant.orchestrator.graph import build_graph
+
+def pick_last(options, values):
+    return len(options) - 1
+
+def read_records(path):
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                pass
+    return records
+
+class TestPolicies(unittest.TestCase):
+    def test_builtin_and_custom_policies(self):
+        options = scripted_options()[::-1]  # Medium, Medium, Low
+        self.assertEqual(first_option(options, {}), 0)
+        self.assertEqual(simplest_option(options, {}), 2)
+        self.assertIs(load_policy("simplest"), simplest_option)
+        self.assertIs(load_policy(f"{__name__}:pick_last"), pick_last)
+        with self.assertRaises(ValueError):
+            load_policy("cheapest")
+
+    def test_objectives_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "objectives.jsonl")
+            with open(path, "w") as f:
+                f.write('{"objective": "Build a CLI"}\n\n"Fix the parser"\n{"objective": "Ship it", "thread_id": "t-1"}\n')
+            items = read_objectives(path)
+        self.assertEqual([i["objective"] for i in items], ["Build a CLI", "Fix the parser", "Ship it"])
+        self.assertEqual(items[2]["thread_id"], "t-1")
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        self.out = os.path.join(self.tmp, "results.jsonl")
+        self._offline = offline(self.tmp, parse_args(["--llm-latency", "0", "--search-latency", "0", "--exec-latency", "0"]))
+        self._offline.__enter__()
+        self.checkpointer = open_checkpointer(os.path.join(self.tmp, "batch-checkpoints.db"))
+        self.graph = build_graph(checkpointer=self.checkpointer)
+
+    def tearDown(self):
+        self.checkpointer.conn.close()
+        self._offline.__exit__(None, None, None)
+        self._tmp.cleanup()
+
+    def test_runs_stream_started_and_result_records(self):
+        items = [{"objective": o} for o in OBJECTIVES * 2]
+        results = run_batch(items, self.out, concurrency=3, policy="simplest", graph=self.graph)
+
+        self.assertEqual([r["status"] for r in results], ["completed"] * 4)
+        records = read_records(self.out)
+        self.assertEqual(sorted(r["index"] for r in records if r["type"] == "started"), [0, 1, 2, 3])
+        for r in (r for r in records if r["type"] == "result"):
+            self.assertEqual(r["selected"], 0)  # The scripted options list the Low one first
+            self.assertEqual(r["state"]["selected_plan"]["complexity"], "Low")
+            self.assertGreater(r["completed_steps"], 0)
+            self.assertIn("execution", {t["name"] for t in r["timings"]})
+
+    def test_resume_continues_interrupted_runs_by_thread_id(self):
+        # A batch killed after run 0 paused at the selection interrupt and run 1 completed
+        paused = "thread-paused"
+        initial = {"objective": OBJECTIVES[1], "logs": [], "completed_steps": [], "file_system_state": {},
+                   "research_memory": [], "plan_options": [], "execution_steps": [], "run_id": paused}
+        for _ in self.graph.stream(initial, config={"configurable": {"thread_id": paused}}):
+            pass
+        with open(self.out, "w") as f:
+            f.write(json.dumps({"type": "started", "index": 0, "thread_id": paused}) + "\n")
+            f.write(json.dumps({"type": "result", "index": 1, "thread_id": "thread-done", "status": "completed"}) + "\n")
+            f.write('{"type": "started", "ind')  # Cut short
+
+        items = [{"objective": o} for o in OBJECTIVES + OBJECTIVES[:1]]
+        results = run_batch(items, self.out, policy=pick_last, resume=True, graph=self.graph, include_state=False)
+
+        by_index = {r["index"]: r for r in results}
+        self.assertEqual(sorted(by_index), [0, 2])
+        self.assertEqual(by_index[0]["thread_id"], paused)
+        self.assertEqual((by_index[0]["status"], by_index[0]["selected"]), ("completed", 2))
+        self.assertNotIn("state", by_index[0])
+        started = [r for r in read_records(self.out)[2:] if r["type"] == "started"]
+        self.assertTrue(any(r["index"] == 0 and r["resumed"] for r in started))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from hybrid_ai_assistant.bench.run import percentiles
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class TestBench(unittest.TestCase):
+    def test_percentiles(self):
+        stats = percentiles([float(v) for v in range(1, 101)])
+        self.assertEqual((stats["p50"], stats["p90"], stats["p99"], stats["max"]), (50.0, 90.0, 99.0, 100.0))
+        self.assertEqual(percentiles([]), {"count": 0})
+
+    def test_offline_run_reports_json(self):
+        # A separate process: the API's graph and job pool are set up once per process
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "report.json")
+            args = ["--runs", "4", "--concurrency", "2", "--api-runs", "2", "--llm-latency", "0",
+                    "--search-latency", "0", "--exec-latency", "0", "--out", out]
+            proc = subprocess.run([sys.executable, "-m", "hybrid_ai_assistant.bench.run", *args],
+                                  cwd=ROOT, capture_output=True, text=True, timeout=120)
+            self.assertEqual(proc.returncode, 0, proc.stderr)
+            with open(out) as f:
+                report = json.load(f)
+
+        self.assertEqual(report["graph"]["failed"], 0)
+        # The default objectives take both routes, and both routes are researched
+        self.assertEqual(report["graph"]["nodes"]["routing"]["count"], 4)
+        self.assertEqual(report["graph"]["nodes"]["research"]["count"], 4)
+        self.assertEqual(report["graph"]["nodes"]["execution"]["count"], 4)
+        self.assertGreater(report["graph"]["checkpoints"]["writes"], 0)
+        self.assertEqual(report["api"]["failed"], 0)
+        self.assertGreater(report["api"]["runs_per_second"], 0)
+        self.assertGreater(report["memory"]["max_rss_mb_after_graph"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from hybrid_ai_assistant.state.blobs import Blobs, FileBlobStore, SqliteBlobStore, is_ref, ref_len, REF_KEY
+from hybrid_ai_assistant.state.state import ProjectOption
+
+def big_research():
+    return [{"query": f"q{i}", "results": [{"content": "x" * 500}]} for i in range(5)]
+
+class BlobStoreCases:
+    def make_backend(self, root):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.blobs = Blobs(self.make_backend(self.tmp.name), inline_limit=256)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_large_values_become_refs(self):
+        research = big_research()
+        ref = self.blobs.store(research)
+        self.assertTrue(is_ref(ref))
+        self.assertEqual(ref_len(ref), 5)
+        self.assertLess(len(str(ref)), 200)
+        self.assertEqual(self.blobs.load(ref), research)
+
+    def test_small_values_stay_inline(self):
+        self.assertEqual(self.blobs.store(["a"]), ["a"])
+        self.assertEqual(self.blobs.load(["a"]), ["a"])
+
+    def test_content_addressed(self):
+        self.assertEqual(self.blobs.store(big_research()), self.blobs.store(big_research()))
+
+    def test_pydantic_round_trip(self):
+        options = [
+            ProjectOption(tech_stack=f"Stack {i}", pros=["p" * 100], cons=["c" * 100], why_fits="w", complexity="Low")
+            for i in range(3)
+        ]
+        loaded = self.blobs.load(self.blobs.store(options))
+        self.assertIsInstance(loaded[0], ProjectOption)
+        self.assertEqual(loaded, options)
+
+    def test_log_text(self):
+        self.assertEqual(self.blobs.log_text("short", limit=10), "short")
+        line = self.blobs.log_text("y" * 50, limit=10)
+        self.assertTrue(line.startswith("y" * 10 + "..."))
+        digest = line.rsplit("blob:", 1)[1].rstrip("]")
+        self.assertEqual(self.blobs.load({REF_KEY: digest}), "y" * 50)
+
+    def test_collect(self):
+        keep, drop = self.blobs.store(big_research()), self.blobs.store(big_research()[:3])
+        self.blobs.raw(drop[REF_KEY])
+        # Fresh blobs may belong to a step whose checkpoint isn't written yet
+        self.assertEqual(self.blobs.collect({keep[REF_KEY]}), 0)
+        self.blobs.min_age = 0
+        self.assertEqual(self.blobs.collect({keep[REF_KEY]}), 1)
+        self.assertEqual(self.blobs.load(keep), big_research())
+        with self.assertRaises((KeyError, OSError)):
+            self.blobs.raw(drop[REF_KEY])
+
+class TestFileBlobStore(BlobStoreCases, unittest.TestCase):
+    def make_backend(self, root):
+        return FileBlobStore(os.path.join(root, "blobs"))
+
+class TestSqliteBlobStore(BlobStoreCases, unittest.TestCase):
+    def make_backend(self, root):
+        return SqliteBlobStore(os.path.join(root, "blobs.db"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from typing import TypedDict, Annotated, List
+from langgraph.graph import StateGraph, END
+from hybrid_ai_assistant.orchestrator.checkpoints import open_checkpointer, CheckpointMetrics
+from hybrid_ai_assistant.state.blobs import Blobs, FileBlobStore, REF_KEY
+from hybrid_ai_assistant.state.state import append_new, ProjectOption
+from hybrid_ai_assistant.utils.exec_session import ExecResult
+
+class ToyState(TypedDict):
+    logs: Annotated[List[str], append_new]
+
+def step(name):
+    def node(state):
+        state["logs"].append(name * 1000)
+        return state
+    return node
+
+def toy_graph(checkpointer):
+    graph = StateGraph(ToyState)
+    for name in "abcd":
+        graph.add_node(name, step(name))
+    graph.set_entry_point("a")
+    graph.add_edge("a", "b")
+    graph.add_edge("b", "c")
+    graph.add_edge("c", "d")
+    graph.add_edge("d", END)
+    return graph.compile(checkpointer=checkpointer)
+
+class TestCheckpointStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "nested", "checkpoints.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_thread(self, store, thread_id, logs=()):
+        graph = toy_graph(store)
+        run_config = {"configurable": {"thread_id": thread_id}}
+        graph.invoke({"logs": list(logs)}, config=run_config)
+        return graph, run_config
+
+    def test_keep_last_per_thread(self):
+        store = open_checkpointer(self.path, keep_last=2)
+        store.metrics = CheckpointMetrics()
+        graph, run_config = self.run_thread(store, "t1")
+        self.assertEqual(store.stats()["checkpoints"], 2)
+        # Latest state is intact after trimming
+        self.assertEqual(len(graph.get_state(run_config).values["logs"]), 4)
+        self.assertEqual(store.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_metrics_per_node(self):
+        store = open_checkpointer(self.path, keep_last=0)
+        store.metrics = CheckpointMetrics()
+        self.run_thread(store, "t1")
+        summary = store.metrics.summary()
+        self.assertEqual(summary["d"]["writes"], 1)
+        self.assertGreater(summary["d"]["max_bytes"], summary["a"]["max_bytes"])
+
+    def test_prune_and_compact(self):
+        store = open_checkpointer(self.path, keep_last=0)
+        store.metrics = CheckpointMetrics()
+        self.run_thread(store, "done")
+        self.run_thread(store, "keep")
+        removed = store.prune_completed(-1, lambda t: t == "done")
+        self.assertEqual(removed, ["done"])
+        self.assertEqual(store.thread_ids(), ["keep"])
+        before, after = store.compact()
+        self.assertLessEqual(after, before)
+
+    def test_selected_plan_is_an_allowed_type(self):
+        # An explicit allowlist blocks every other unregistered type, as strict mode will
+        store = open_checkpointer(self.path, keep_last=0)
+        option = ProjectOption(tech_stack="Flask", pros=["p"], cons=["c"], why_fits="w", complexity="Low")
+        self.assertIsInstance(store.serde.loads_typed(store.serde.dumps_typed(option)), ProjectOption)
+        other = ExecResult(exit_code=0)
+        self.assertNotIsInstance(store.serde.loads_typed(store.serde.dumps_typed(other)), ExecResult)
+
+    def test_prune_collects_unreferenced_blobs(self):
+        store = open_checkpointer(self.path, keep_last=0)
+        store.metrics = CheckpointMetrics()
+        store.blob_store = blobs = Blobs(FileBlobStore(os.path.join(self.tmp.name, "blobs")), min_age=0)
+        kept = blobs.log_text("k" * 100, limit=10)
+        dropped = blobs.log_text("d" * 100, limit=10)
+        orphan = blobs.store(["o" * 5000])
+        self.run_thread(store, "done", [dropped])
+        self.run_thread(store, "keep", [kept])
+
+        store.prune_completed(-1, lambda t: t == "done")
+        self.assertEqual(blobs.load({REF_KEY: kept.rsplit("blob:", 1)[1].rstrip("]")}), "k" * 100)
+        for digest in (dropped.rsplit("blob:", 1)[1].rstrip("]"), orphan[REF_KEY]):
+            with self.assertRaises(FileNotFoundError):
+                blobs.raw(digest)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import json
+import tempfile
+import unittest
+from langchain_core.messages import AIMessageChunk
+from hybrid_ai_assistant.utils.codegen import CodeStreamParser, GenerationStats, GenerationMetrics
+from hybrid_ai_assistant.utils.disk_cache import DiskCache
+from hybrid_ai_assistant.utils.llm_cache import stream_text
+from unittest.mock import patch
+from hybrid_ai_assistant.config.config import config
+
+def feed_all(text, size=5):
+    parser = CodeStreamParser()
+    completed = []
+    for i in range(0, len(text), size):
+        completed += parser.feed(text[i:i + size])
+    parser.finish()
+    return parser, completed
+
+class TestCodeStreamParser(unittest.TestCase):
+    def test_single_file_in_fence(self):
+        text = '```json\n{"filename": "a.py", "content": "print(\\"hi\\")\\n", "note": [1, true, null]}\n```'
+        parser, completed = feed_all(text)
+        self.assertIsNone(parser.error)
+        self.assertEqual(parser.files, {"a.py": 'print("hi")\n'})
+        self.assertEqual(len(completed), 1)
+
+    def test_files_are_released_as_each_entry_closes(self):
+        first = '{"files": [{"filename": "a.py", "content": "x = 1"}, '
+        parser = CodeStreamParser()
+        self.assertEqual(parser.feed(first), [{"filename": "a.py", "content": "x = 1"}])
+        self.assertFalse(parser.done)
+        self.assertEqual(parser.feed('{"filename": "b.py", "content": "y"}]} and some chatter'),
+                         [{"filename": "b.py", "content": "y"}])
+        self.assertTrue(parser.done)
+        self.assertEqual(list(parser.files), ["a.py", "b.py"])
+
+    def test_fails_as_soon_as_output_cannot_be_valid(self):
+        cases = {
+            'Sure! Here is the code: {"filename"': "does not start",
+            '{"filename": 3': "must be a string",
+            '{"files": {"a.py": "x"}}': "must be a list",
+            '{"filename": "a.py" "content"': "Expected ','",
+            '{"filename": "a.py", "n": tru }': "Invalid literal",
+        }
+        for text, message in cases.items():
+            parser = CodeStreamParser()
+            parser.feed(text)
+            self.assertIn(message, parser.error or "", text)
+
+    def test_truncated_response(self):
+        parser, _ = feed_all('{"filename": "a.py", "content": "x')
+        self.assertIn("ended before", parser.error)
+
+class FakeStreamingLLM:
+    model = "fake"
+
+    def __init__(self, text):
+        self.text = text
+        self.yielded = 0
+
+    def stream(self, prompt):
+        for ch in self.text:
+            self.yielded += 1
+            yield AIMessageChunk(content=ch)
+
+class TestStreamText(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(f"{self.tmp.name}/llm.db")
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_early_abort_stops_the_stream(self):
+        llm = FakeStreamingLLM("I cannot help with that. " * 40)
+        parser = CodeStreamParser()
+        stream = stream_text(llm, "prompt", node="execution", cache=self.cache)
+        for chunk in stream:
+            parser.feed(chunk)
+            if parser.error:
+                break
+        stream.close()
+        self.assertEqual(llm.yielded, 1)
+
+    def test_complete_or_kept_streams_are_cached(self):
+        reply = json.dumps({"filename": "a.py", "content": "x"})
+        llm = FakeStreamingLLM(reply + " trailing explanation")
+        parser = CodeStreamParser()
+        with patch.object(config, "LLM_CACHE_NODES", {"execution"}):
+            stream = stream_text(llm, "prompt", node="execution", cache=self.cache, keep=lambda _: parser.done)
+            for chunk in stream:
+                parser.feed(chunk)
+                if parser.done:
+                    break
+            stream.close()
+            self.assertEqual(llm.yielded, len(reply))
+            # Replayed from the cache as one chunk without calling the model
+            self.assertEqual(list(stream_text(llm, "prompt", node="execution", cache=self.cache)), [reply])
+            self.assertEqual(llm.yielded, len(reply))
+
+class TestGenerationMetrics(unittest.TestCase):
+    def test_summary(self):
+        metrics = GenerationMetrics()
+        stats = GenerationStats()
+        for _ in range(10):
+            stats.chunk("tok")
+        stats.finish()
+        metrics.record(stats)
+        metrics.record(GenerationStats(), aborted=True)
+        summary = metrics.summary()
+        self.assertEqual((summary["generations"], summary["aborted"], summary["chunks"]), (2, 1, 10))
+        self.assertIsNotNone(stats.ttft)
+        self.assertIn("10 chunks", stats.describe())
+
+if __name__ == '__main__':
+    unittest.main()
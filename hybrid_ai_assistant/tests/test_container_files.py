@@ -0,0 +1,89 @@
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+from hybrid_ai_assistant.utils.container_files import put_files, get_files, resolve_path
+
+class FakeContainer:
+    """Emulates put_archive/get_archive against a host directory standing in for "/"."""
+
+    def __init__(self, root):
+        self.root = root
+        self.uploads = 0
+        self.downloads = 0
+
+    def put_archive(self, path, data):
+        self.uploads += 1
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            tar.extractall(os.path.join(self.root, path.lstrip("/")), filter="data")
+        return True
+
+    def get_archive(self, path):
+        self.downloads += 1
+        host_path = os.path.join(self.root, path.lstrip("/"))
+        if not os.path.exists(host_path):
+            raise FileNotFoundError(path)
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            tar.add(host_path, arcname=os.path.basename(path))
+        return iter([buf.getvalue()]), {}
+
+class TestContainerFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.container = FakeContainer(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_bulk_write_in_one_upload(self):
+        files = {
+            "main.py": "print('it''s \"quoted\"')\n",
+            "pkg/util.py": "x = 1\n",
+            "data.bin": bytes(range(256)),
+        }
+        results = put_files(self.container, files)
+        self.assertEqual(results, {path: "ok" for path in files})
+        self.assertEqual(self.container.uploads, 1)
+
+        read = get_files(self.container, list(files))
+        self.assertEqual(read["main.py"].decode(), files["main.py"])
+        self.assertEqual(read["pkg/util.py"], b"x = 1\n")
+        self.assertEqual(read["data.bin"], files["data.bin"])
+
+    def test_files_in_one_directory_are_read_in_one_download(self):
+        files = {f"pkg/m{i}.py": f"x = {i}\n" for i in range(3)}
+        put_files(self.container, files)
+        read = get_files(self.container, list(files) + ["pkg/missing.py"])
+        self.assertEqual(self.container.downloads, 1)
+        self.assertEqual(read["pkg/m2.py"], b"x = 2\n")
+        self.assertTrue(read["pkg/missing.py"].startswith("Error"))
+
+    def test_large_or_top_level_reads_go_file_by_file(self):
+        put_files(self.container, {"a.py": "a", "b.py": "b", "pkg/big.bin": b"0" * 4096, "pkg/c.py": "c", "pkg/d.py": "d"})
+        # Files directly in the workspace would mean fetching all of it
+        self.assertEqual(get_files(self.container, ["a.py", "b.py"]), {"a.py": b"a", "b.py": b"b"})
+        self.assertEqual(self.container.downloads, 2)
+        # A directory archive over the cap is dropped in favour of per-file reads
+        read = get_files(self.container, ["pkg/c.py", "pkg/d.py"], max_bytes=1024)
+        self.assertEqual(read, {"pkg/c.py": b"c", "pkg/d.py": b"d"})
+        self.assertEqual(self.container.downloads, 5)
+
+    def test_per_file_errors(self):
+        results = put_files(self.container, {"ok.txt": "fine", "pkg/a.txt": "a", "../etc/passwd": "nope"})
+        self.assertEqual(results["ok.txt"], "ok")
+        self.assertTrue(results["../etc/passwd"].startswith("Error"))
+        read = get_files(self.container, ["ok.txt", "missing.txt", "pkg", "../etc/passwd"])
+        self.assertEqual(read["ok.txt"], b"fine")
+        for path in ("missing.txt", "pkg", "../etc/passwd"):
+            self.assertTrue(read[path].startswith("Error"), path)
+
+    def test_resolve_path(self):
+        self.assertEqual(resolve_path("a/../b.py"), "/workspace/b.py")
+        self.assertEqual(resolve_path("/workspace/c.py"), "/workspace/c.py")
+        with self.assertRaises(ValueError):
+            resolve_path("/etc/passwd")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import socket
+import tempfile
+import unittest
+import uuid
+from hybrid_ai_assistant.utils.container_pool import OWNER_LABEL, POOL_LABEL, ContainerPool
+
+class FakeContainer:
+    def __init__(self, volumes, labels=None):
+        self.id = uuid.uuid4().hex
+        self.status = "running"
+        self.volumes = volumes
+        self.labels = labels or {}
+        self.removed = False
+
+    def reload(self):
+        pass
+
+    def start(self):
+        self.status = "running"
+
+    def remove(self, force=False):
+        self.removed = True
+        self.status = "removed"
+
+class FakeContainers:
+    def __init__(self):
+        self.created = []
+
+    def run(self, image, **kwargs):
+        container = FakeContainer(kwargs.get("volumes"), kwargs.get("labels"))
+        self.created.append(container)
+        return container
+
+    def list(self, all=False, filters=None):
+        key, _, value = filters["label"].partition("=")
+        return [c for c in self.created if not c.removed and c.labels.get(key) == value]
+
+class FakeDockerClient:
+    def __init__(self):
+        self.containers = FakeContainers()
+
+class TestContainerPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = FakeDockerClient()
+        self.pool = ContainerPool(self.client, size=2, project_dir=self.tmp.name, idle_timeout=60)
+
+    def tearDown(self):
+        self.pool.shutdown()
+        self.tmp.cleanup()
+
+    def test_warm_lease_binds_run_workspace(self):
+        self.pool.maintain()
+        self.assertEqual(self.pool.stats()["size"], 2)
+        warm = self.pool._warm[-1]
+        with open(os.path.join(warm.slot_dir, "marker"), "w") as f:
+            f.write("x")
+
+        container_id = self.pool.lease("run-1")
+        self.assertEqual(container_id, warm.container.id)
+        # The slot directory the container has mounted is now the run's workspace
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "run-1", "marker")))
+        self.assertEqual(self.pool.lease("run-1"), container_id)
+
+        stats = self.pool.stats()
+        self.assertEqual((stats["warm_hits"], stats["cold_starts"], stats["in_use"]), (1, 0, 1))
+
+    def test_cold_start_when_empty(self):
+        self.pool.lease("run-1")
+        self.assertEqual(self.pool.stats()["cold_starts"], 1)
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp.name, "run-1")))
+
+    def test_unhealthy_warm_container_skipped(self):
+        self.pool.maintain()
+        bad = self.pool._warm[-1]
+        bad.container.status = "exited"
+        container_id = self.pool.lease("run-1")
+        self.assertNotEqual(container_id, bad.container.id)
+        self.assertTrue(bad.container.removed)
+        self.assertEqual(self.pool.stats()["unhealthy"], 1)
+
+    def test_release_removes_container_keeps_workspace(self):
+        self.pool.maintain()
+        self.pool.lease("run-1")
+        leased = self.pool._leased["run-1"]
+        self.assertTrue(self.pool.release("run-1"))
+        self.assertTrue(leased.container.removed)
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp.name, "run-1")))
+        self.assertFalse(self.pool.release("run-1"))
+
+    def test_idle_leases_are_reaped(self):
+        self.pool.lease("run-1")
+        self.pool._leased["run-1"].last_used -= 120
+        self.pool.maintain()
+        stats = self.pool.stats()
+        self.assertEqual((stats["in_use"], stats["reaped"], stats["size"]), (0, 1, 2))
+
+    def test_orphans_of_exited_processes_are_removed(self):
+        host = socket.gethostname()
+        self.pool.maintain()
+        dead = self.client.containers.run("img", labels={POOL_LABEL: "1", OWNER_LABEL: f"{host}:999999999"})
+        unlabelled = self.client.containers.run("img", labels={POOL_LABEL: "1"})
+        elsewhere = self.client.containers.run("img", labels={POOL_LABEL: "1", OWNER_LABEL: "other-host:1"})
+        unrelated = self.client.containers.run("img")
+
+        self.assertEqual(self.pool.remove_orphans(), 2)
+        self.assertTrue(dead.removed and unlabelled.removed)
+        self.assertFalse(elsewhere.removed or unrelated.removed)
+        self.assertFalse(any(p.container.removed for p in self.pool._warm))  # Ours: this process is alive
+        self.assertEqual(self.pool.stats()["orphans"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
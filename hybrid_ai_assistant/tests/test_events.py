@@ -0,0 +1,49 @@
+import threading
+import unittest
+from hybrid_ai_assistant.api.events import EventLog
+from hybrid_ai_assistant.orchestrator.events import node_events
+from hybrid_ai_assistant.state.state import append_new
+
+class TestNodeEvents(unittest.TestCase):
+    def test_only_new_log_lines(self):
+        stream = [
+            {"clarification": {"logs": ["start", "Clarification needed."]}},
+            {"research": {"logs": ["start", "Clarification needed.", "reflection"]}},
+            {"__interrupt__": ()},
+        ]
+        events = list(node_events(stream, ["start"]))
+        self.assertEqual([e["node"] for e in events], ["clarification", "research"])
+        self.assertEqual(events[0]["logs"], ["Clarification needed."])
+        self.assertEqual(events[1]["logs"], ["reflection"])
+
+    def test_append_new_reducer(self):
+        self.assertEqual(append_new(["a"], ["a", "b"]), ["a", "b"])
+        self.assertEqual(append_new(["a"], ["b"]), ["a", "b"])
+        self.assertEqual(append_new(["a", "b"], ["a", "b"]), ["a", "b"])
+
+class TestEventLog(unittest.TestCase):
+    def test_cursor_reads(self):
+        log = EventLog()
+        log.publish("run", {"type": "node", "node": "a", "logs": ["x"]})
+        log.publish("run", {"type": "node", "node": "b", "logs": ["y", "z"]})
+        self.assertEqual([e["node"] for e in log.read("run", since=1)], ["b"])
+        self.assertEqual(log.cursor("run"), 2)
+        self.assertEqual(log.log_count("run"), 3)
+        self.assertEqual(log.read("other"), [])
+
+    def test_bounded_per_run(self):
+        log = EventLog(max_events=2)
+        for i in range(5):
+            log.publish("run", {"type": "node", "node": str(i)})
+        self.assertEqual([e["seq"] for e in log.read("run")], [4, 5])
+
+    def test_wait_wakes_on_publish(self):
+        log = EventLog()
+        timer = threading.Timer(0.05, log.publish, args=("run", {"type": "status", "status": "done"}))
+        timer.start()
+        events = log.wait("run", since=0, timeout=2)
+        self.assertEqual(events[0]["status"], "done")
+        self.assertEqual(log.wait("run", since=1, timeout=0.01), [])
+
+if __name__ == '__main__':
+    unittest.main()
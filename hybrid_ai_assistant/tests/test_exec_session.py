@@ -0,0 +1,95 @@
+import os
+import struct
+import subprocess
+import tempfile
+import threading
+import unittest
+from socket import socketpair
+from hybrid_ai_assistant.utils.exec_session import ExecSession
+
+class FakeExecAPI:
+    """Attaches exec sessions to a local `sh`, framing its output like the Docker daemon."""
+
+    def __init__(self, workdir):
+        self.workdir = workdir
+        self.created = 0
+
+    def exec_create(self, container, cmd, stdin=False, stdout=True, stderr=True, workdir=None):
+        self.created += 1
+        return cmd
+
+    def exec_start(self, exec_id, socket=False):
+        ours, theirs = socketpair()
+        proc = subprocess.Popen(exec_id, cwd=self.workdir, stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        lock = threading.Lock()
+
+        def pump_in():
+            while True:
+                data = theirs.recv(4096)
+                if not data:
+                    proc.kill()
+                    return
+                proc.stdin.write(data)
+                proc.stdin.flush()
+
+        def pump_out(pipe, stream):
+            for chunk in iter(lambda: os.read(pipe.fileno(), 4096), b""):
+                with lock:
+                    try:
+                        theirs.sendall(struct.pack(">BxxxL", stream, len(chunk)) + chunk)
+                    except OSError:
+                        return
+
+        threading.Thread(target=pump_in, daemon=True).start()
+        threading.Thread(target=pump_out, args=(proc.stdout, 1), daemon=True).start()
+        threading.Thread(target=pump_out, args=(proc.stderr, 2), daemon=True).start()
+        return ours
+
+class FakeClient:
+    def __init__(self, workdir):
+        self.api = FakeExecAPI(workdir)
+
+class TestExecSession(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = FakeClient(self.tmp.name)
+        self.session = ExecSession(self.client, "c1")
+
+    def tearDown(self):
+        self.session.close()
+        self.tmp.cleanup()
+
+    def test_exit_codes_and_streams(self):
+        ok = self.session.run("echo hello; echo oops >&2")
+        self.assertEqual((ok.exit_code, ok.stdout, ok.stderr), (0, "hello\n", "oops\n"))
+        self.assertTrue(ok.ok)
+
+        failed = self.session.run("""echo "it's \\"quoted\\""; exit 3""")
+        self.assertEqual(failed.exit_code, 3)
+        self.assertEqual(failed.stdout, "it's \"quoted\"\n")
+        self.assertFalse(failed.ok)
+        # Both commands went over the same session
+        self.assertEqual(self.client.api.created, 1)
+
+    def test_streams_output_while_running(self):
+        seen = []
+        result = self.session.run("printf a; sleep 0.2; printf b >&2", on_output=lambda s, t: seen.append((s, t)))
+        self.assertEqual(result.output, "ab")
+        self.assertIn(("stdout", "a"), seen)
+        self.assertIn(("stderr", "b"), seen)
+
+    def test_timeout_kills_command_and_session_survives(self):
+        result = self.session.run("sleep 5", timeout=1)
+        self.assertTrue(result.timed_out)
+        self.assertFalse(result.ok)
+        self.assertEqual(self.session.run("echo again").stdout, "again\n")
+
+    def test_output_cap(self):
+        result = self.session.run("head -c 10000 /dev/zero | tr '\\0' x", max_output=100)
+        self.assertTrue(result.truncated)
+        self.assertEqual(result.stdout, "x" * 100)
+        self.assertEqual(result.exit_code, 0)
+
+if __name__ == '__main__':
+    unittest.main()
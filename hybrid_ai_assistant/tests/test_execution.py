@@ -1,11 +1,30 @@
 import unittest
+from hybrid_ai_assistant.bench.fakes import FakeChatModel, FakeSandbox
 from hybrid_ai_assistant.nodes.execution import execute_plan
+from hybrid_ai_assistant.utils import llm_registry
+from hybrid_ai_assistant.utils.sandbox import set_sandbox
 
 class TestExecution(unittest.TestCase):
+    def setUp(self):
+        self.sandbox = FakeSandbox()
+        set_sandbox(self.sandbox)
+        llm_registry.set_factory(lambda provider, model, host: FakeChatModel(model))
+
+    def tearDown(self):
+        set_sandbox(None)
+        llm_registry.set_factory(None)
+
     def test_execution_node(self):
-        state = {"selected_option": {}}
+        state = {"objective": "Test", "execution_steps": ["Create main file", "Add helpers"],
+                 "step_dependencies": [[], [0]], "logs": [], "run_id": "run-1"}
         result = execute_plan(state)
-        self.assertIn("execution_results", result)
+        self.assertEqual(result["completed_steps"], ["Create main file", "Add helpers"])
+        executed = [line for line in result["logs"] if line.startswith("Executed")]
+        self.assertEqual(executed, ["Executed Create main file: [exit 0] ok\n", "Executed Add helpers: [exit 0] ok\n"])
+        self.assertEqual(self.sandbox.commands, 2)
+        # The sandbox is handed back once the plan is done
+        self.assertIsNone(result["container_id"])
+        self.assertEqual(self.sandbox.files, {})
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,195 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from hybrid_ai_assistant.bench.fakes import FakeChatModel, Latency
+from hybrid_ai_assistant.tools import search
+from hybrid_ai_assistant.utils import llm_registry
+from hybrid_ai_assistant.utils.gateway import (
+    Gateway, RateLimited, TokenBucket, coalesced, parse_limits, queue_wait, set_gateway,
+)
+from hybrid_ai_assistant.utils.instrumentation import retries
+from hybrid_ai_assistant.utils.llm_cache import invoke_text, stream_text
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class TooManyRequests(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": retry_after} if retry_after else {})
+
+class FakeProvider:
+    """A local provider that fails the first `failures` calls with `error` and blocks on `gate` if given."""
+
+    def __init__(self, failures=0, error=TooManyRequests, gate=None):
+        self.failures = failures
+        self.error = error
+        self.gate = gate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, value="ok"):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+        if self.gate is not None:
+            self.gate.wait(5)
+        if calls <= self.failures:
+            raise self.error()
+        return value
+
+class TestLimits(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_limits("openai=5/s@10, openai:gpt-4o=60/m ,,tavily=0.5/s"), {
+            "openai": (5.0, 10.0), "openai:gpt-4o": (1.0, 1.0), "tavily": (0.5, 1.0),
+        })
+        with self.assertRaises(ValueError):
+            parse_limits("openai=fast")
+
+    def test_bucket_spends_the_burst_then_queues_in_order(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2.0, burst=2.0, clock=clock)
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0.0, 0.0, 0.5, 1.0])
+        clock.now = 2.0  # Refilled past the reservations, but never beyond the burst
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.5])
+
+    def test_wait_covers_the_slowest_bucket(self):
+        clock = FakeClock()
+        gateway = Gateway(limits={"p": (10.0, 10.0), "p:m": (1.0, 1.0)}, clock=clock, sleep=clock.sleep)
+        before = queue_wait.value(provider="p", model="m")
+        waits = [gateway.wait_turn("p", "m") for _ in range(3)]
+        self.assertEqual(waits, [0.0, 1.0, 1.0])
+        self.assertEqual(gateway.wait_turn("p", "other"), 0.0)  # Only the provider bucket applies
+        self.assertEqual(gateway.wait_turn("unlisted", "m"), 0.0)
+        self.assertEqual(queue_wait.value(provider="p", model="m")[0], before[0] + 3)
+
+class TestRetries(unittest.TestCase):
+    def gateway(self, **kwargs):
+        self.clock = FakeClock()
+        return Gateway(limits={}, backoff=1.0, backoff_max=8.0, clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_429s_and_timeouts_are_retried_with_jittered_backoff(self):
+        gateway = self.gateway(max_retries=4)
+        before = retries.value(kind="gateway", name="fake")
+        provider = FakeProvider(failures=3)
+        self.assertEqual(gateway.call("fake", "m", provider), "ok")
+        self.assertEqual(provider.calls, 4)
+        self.assertEqual(retries.value(kind="gateway", name="fake"), before + 3)
+        for attempt, delay in enumerate(self.clock.sleeps):
+            self.assertLessEqual(delay, 2 ** attempt)
+
+        timeouts = FakeProvider(failures=1, error=TimeoutError)
+        self.assertEqual(gateway.call("fake", "m", timeouts), "ok")
+
+    def test_retry_after_is_a_floor(self):
+        gateway = self.gateway(max_retries=1)
+        gateway.call("fake", "m", FakeProvider(failures=1, error=lambda: TooManyRequests(retry_after="3")))
+        self.assertEqual(self.clock.sleeps, [3.0])
+
+    def test_gives_up_after_max_retries_and_on_other_errors(self):
+        gateway = self.gateway(max_retries=2)
+        provider = FakeProvider(failures=5)
+        with self.assertRaises(TooManyRequests):
+            gateway.call("fake", "m", provider)
+        self.assertEqual(provider.calls, 3)
+
+        provider = FakeProvider(failures=1, error=ValueError)
+        with self.assertRaises(ValueError):
+            gateway.call("fake", "m", provider)
+        self.assertEqual(provider.calls, 1)
+
+class TestCoalescing(unittest.TestCase):
+    def run_concurrently(self, gateway, provider, keys):
+        results = [None] * len(keys)
+
+        def call(i):
+            try:
+                results[i] = gateway.call("fake", "m", provider, key=keys[i])
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(len(keys))]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)  # Let every caller reach the gateway while the first call is held
+        provider.gate.set()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_identical_in_flight_calls_share_one_result(self):
+        provider = FakeProvider(gate=threading.Event())
+        before = coalesced.value(provider="fake")
+        results = self.run_concurrently(Gateway(limits={}), provider, ["same"] * 5 + ["other"])
+        self.assertEqual(results, ["ok"] * 6)
+        self.assertEqual(provider.calls, 2)
+        self.assertEqual(coalesced.value(provider="fake"), before + 4)
+
+        # Once it's finished the next call goes to the provider again
+        Gateway(limits={}).call("fake", "m", provider, key="same")
+        self.assertEqual(provider.calls, 3)
+
+    def test_failures_reach_every_waiting_caller(self):
+        provider = FakeProvider(failures=1, error=ValueError, gate=threading.Event())
+        results = self.run_concurrently(Gateway(limits={}), provider, ["same"] * 3)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(provider.calls, 1)
+
+class TestProviders(unittest.TestCase):
+    def setUp(self):
+        self.llm = FakeChatModel(latency=Latency(0.2))
+        llm_registry.set_factory(lambda provider, model, host=None: self.llm)
+        set_gateway(Gateway(limits={}, backoff=0.0))
+
+    def tearDown(self):
+        llm_registry.set_factory(None)
+        set_gateway(None)
+
+    def test_concurrent_identical_prompts_make_one_llm_call(self):
+        llm = llm_registry.get_llm("openai", "fake")
+        self.assertEqual(llm_registry.provider_of(llm), "openai")
+        answers = []
+        threads = [threading.Thread(target=lambda: answers.append(invoke_text(llm, "Classify task: x", node="gateway-test")))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(answers, ["Research"] * 4)
+        self.assertEqual(self.llm.calls["invoke"], 1)
+
+    def test_stream_is_retried_until_the_first_chunk(self):
+        llm = llm_registry.get_llm("ollama", "fake")
+        stream = llm.stream
+        failures = [TimeoutError()]
+
+        def flaky(prompt):
+            if failures:
+                raise failures.pop()
+            yield from stream(prompt)
+
+        llm.stream = flaky
+        self.assertEqual("".join(stream_text(llm, "Classify task: x", node="gateway-test")), "Research")
+
+    def test_tavily_rate_limit_string_raises(self):
+        saved = search._tavily
+        search._tavily = SimpleNamespace(invoke=lambda args: "HTTPError('429 Client Error: Too Many Requests')")
+        try:
+            with self.assertRaises(RateLimited):
+                search.tavily_search("query")
+        finally:
+            search._tavily = saved
+
+if __name__ == '__main__':
+    unittest.main()
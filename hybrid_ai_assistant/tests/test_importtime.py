@@ -0,0 +1,14 @@
+import unittest
+from hybrid_ai_assistant.bench.importtime import measure
+
+class TestImportTime(unittest.TestCase):
+    def test_entry_points_defer_heavy_imports(self):
+        # Budgets are checked by `python -m hybrid_ai_assistant.bench.importtime`; timings are too noisy for a unit test
+        for module in ("hybrid_ai_assistant.main", "hybrid_ai_assistant.api.app", "hybrid_ai_assistant.orchestrator.graph"):
+            with self.subTest(module=module):
+                total, _, deferred = measure(module)
+                self.assertIsNotNone(total)
+                self.assertEqual(deferred, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import contextvars
+import os
+import tempfile
+import threading
+import unittest
+from hybrid_ai_assistant.bench.run import drive, offline, parse_args
+from hybrid_ai_assistant.orchestrator.checkpoints import open_checkpointer
+from hybrid_ai_assistant.orchestrator.graph import build_graph
+from hybrid_ai_assistant.utils.instrumentation import (
+    Registry, current_span, format_summary, run_timings, span, span_errors, traced_node,
+)
+
+class TestRegistry(unittest.TestCase):
+    def test_prometheus_text_format(self):
+        registry = Registry()
+        calls = registry.counter("demo_calls_total", "Calls.", ("name",))
+        latency = registry.histogram("demo_seconds", "Latency.", ("name",), buckets=(0.1, 1.0))
+        calls.inc(name='say "hi"')
+        latency.observe(0.05, name="a")
+        latency.observe(0.5, name="a")
+        latency.observe(5, name="a")
+
+        lines = registry.render().splitlines()
+        self.assertIn("# TYPE demo_calls_total counter", lines)
+        self.assertIn('demo_calls_total{name="say \\"hi\\""} 1', lines)
+        self.assertIn('demo_seconds_bucket{name="a",le="0.1"} 1', lines)
+        self.assertIn('demo_seconds_bucket{name="a",le="1.0"} 2', lines)
+        self.assertIn('demo_seconds_bucket{name="a",le="+Inf"} 3', lines)
+        self.assertIn('demo_seconds_count{name="a"} 3', lines)
+        self.assertEqual(latency.value(name="a"), (3, 5.55))
+
+class TestSpans(unittest.TestCase):
+    def test_children_join_the_trace_across_threads(self):
+        seen = []
+        with span("node", "demo", trace_id="trace-1") as parent:
+            def child():
+                with span("search", "demo") as s:
+                    seen.append((s.trace_id, s.parent_id))
+            worker = threading.Thread(target=contextvars.copy_context().run, args=(child,))
+            worker.start()
+            worker.join()
+        self.assertEqual(seen, [("trace-1", parent.span_id)])
+        self.assertIsNone(current_span())
+        kinds = {(r["kind"], r["name"]): r["calls"] for r in run_timings.summary("trace-1")}
+        self.assertEqual(kinds, {("node", "demo"): 1, ("search", "demo"): 1})
+
+    def test_errors_are_counted_and_reraised(self):
+        before = span_errors.value(kind="llm", name="failing")
+        with self.assertRaises(ValueError):
+            with span("llm", "failing", trace_id="trace-2"):
+                raise ValueError("boom")
+        self.assertEqual(span_errors.value(kind="llm", name="failing"), before + 1)
+        self.assertEqual(run_timings.summary("trace-2")[0]["errors"], 1)
+
+    def test_traced_node_tags_new_log_lines_in_place(self):
+        def node(state):
+            state["logs"].append("did something")
+            return state
+
+        logs = ["earlier line"]
+        traced_node("demo", node)({"run_id": "run-9", "logs": logs})
+        self.assertEqual(logs[0], "earlier line")
+        self.assertRegex(logs[1], r"^\[trace:run-9 span:[0-9a-f]{16}\] did something$")
+
+class TestGraphInstrumentation(unittest.TestCase):
+    def test_run_records_every_kind_of_call(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            args = parse_args(["--llm-latency", "0", "--search-latency", "0", "--exec-latency", "0"])
+            with offline(tmp, args):
+                checkpointer = open_checkpointer(os.path.join(tmp, "checkpoints.db"))
+                graph = build_graph(checkpointer=checkpointer)
+                _, final = drive(graph, "Research and compare architecture options for a chat platform")
+                checkpointer.conn.close()
+
+        run_id = final["run_id"]
+        kinds = {r["kind"] for r in run_timings.summary(run_id)}
+        self.assertEqual(kinds, {"node", "llm", "search", "sandbox", "checkpoint"})
+        self.assertTrue(all(line.startswith(f"[trace:{run_id} span:") for line in final["logs"]))
+        self.assertIn("execution", format_summary(run_id))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import threading
+import time
+import unittest
+from hybrid_ai_assistant.api.jobs import JobManager, QueueFull, JobConflict
+
+def blocking_run(release):
+    # Stands in for run_graph: one "node" per wait, checking for cancellation in between
+    def run(graph_input, thread_id, cancel_event=None, on_event=None):
+        while not release.wait(0.01):
+            if cancel_event is not None and cancel_event.is_set():
+                return "cancelled"
+        return "done"
+    return run
+
+class TestJobManager(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.jobs = JobManager(max_workers=1, max_queue=1, kind="thread")
+        self.run = blocking_run(self.release)
+
+    def tearDown(self):
+        self.release.set()
+        self.jobs.shutdown()
+
+    def wait_running(self, job):
+        deadline = time.monotonic() + 1
+        while job.status != "running" and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def test_queue_depth_limit(self):
+        self.wait_running(self.jobs.submit("a", {}, fn=self.run))
+        self.jobs.submit("b", {}, fn=self.run)
+        with self.assertRaises(QueueFull):
+            self.jobs.submit("c", {}, fn=self.run)
+        self.assertEqual(self.jobs.status("b"), "queued")
+
+    def test_duplicate_active_run_rejected(self):
+        self.jobs.submit("a", {}, fn=self.run)
+        with self.assertRaises(JobConflict):
+            self.jobs.submit("a", None, fn=self.run)
+
+    def test_cancel_queued_and_running(self):
+        running = self.jobs.submit("a", {}, fn=self.run)
+        self.wait_running(running)
+        queued = self.jobs.submit("b", {}, fn=self.run)
+        self.assertTrue(self.jobs.cancel("b"))
+        self.assertEqual(queued.status, "cancelled")
+        self.assertTrue(self.jobs.cancel("a"))
+        self.assertEqual(running.future.result(timeout=1), "cancelled")
+        self.assertEqual(running.status, "cancelled")
+
+    def test_completed_and_failed(self):
+        def boom(graph_input, thread_id, cancel_event=None, on_event=None):
+            raise RuntimeError("node failed")
+        self.release.set()
+        done = self.jobs.submit("a", {}, fn=self.run)
+        done.future.result(timeout=1)
+        failed = self.jobs.submit("b", {}, fn=boom)
+        failed.future.exception(timeout=1)
+        self.assertEqual(done.status, "done")
+        self.assertEqual(failed.status, "failed")
+        self.assertIn("node failed", failed.error)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from pydantic import BaseModel
+from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils.disk_cache import DiskCache
+from hybrid_ai_assistant.utils.llm_cache import invoke_text, invoke_structured
+
+class Answer(BaseModel):
+    value: str
+
+class FakeLLM:
+    model = "fake-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return SimpleNamespace(content=f"answer {self.calls}")
+
+    def with_structured_output(self, schema):
+        outer = self
+
+        class Structured:
+            def invoke(self, prompt):
+                outer.calls += 1
+                return schema(value=f"answer {outer.calls}")
+        return Structured()
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(os.path.join(self.tmp.name, "llm.db"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_disabled_by_default(self):
+        llm = FakeLLM()
+        with patch.object(config, "LLM_CACHE_NODES", set()):
+            invoke_text(llm, "prompt", node="research", cache=self.cache)
+            invoke_text(llm, "prompt", node="research", cache=self.cache)
+        self.assertEqual(llm.calls, 2)
+
+    def test_text_memoized_per_node(self):
+        llm = FakeLLM()
+        with patch.object(config, "LLM_CACHE_NODES", {"research"}):
+            first = invoke_text(llm, "prompt", node="research", cache=self.cache)
+            second = invoke_text(llm, "prompt", node="research", cache=self.cache)
+            invoke_text(llm, "prompt", node="clarification", cache=self.cache)
+        self.assertEqual(first, second)
+        self.assertEqual(llm.calls, 2)
+
+    def test_salt_separates_entries(self):
+        llm = FakeLLM()
+        with patch.object(config, "LLM_CACHE_NODES", {"*"}):
+            a = invoke_text(llm, "prompt", node="execution", salt=0, cache=self.cache)
+            b = invoke_text(llm, "prompt", node="execution", salt=1, cache=self.cache)
+        self.assertNotEqual(a, b)
+
+    def test_structured_round_trip(self):
+        llm = FakeLLM()
+        with patch.object(config, "LLM_CACHE_NODES", {"option_generator"}):
+            first = invoke_structured(llm, "prompt", Answer, node="option_generator", cache=self.cache)
+            second = invoke_structured(llm, "prompt", Answer, node="option_generator", cache=self.cache)
+        self.assertIsInstance(second, Answer)
+        self.assertEqual(first, second)
+        self.assertEqual(llm.calls, 1)
+
+if __name__ == '__main__':
+    unittest.main()
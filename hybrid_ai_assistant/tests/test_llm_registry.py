@@ -0,0 +1,38 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils import llm_registry
+
+class TestLLMRegistry(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+        def factory(provider, model, host):
+            self.created.append((provider, model, host))
+            return object()
+        llm_registry.set_factory(factory)
+
+    def tearDown(self):
+        llm_registry.set_factory(None)
+
+    def test_clients_are_reused(self):
+        self.assertIs(llm_registry.cloud_llm(), llm_registry.cloud_llm())
+        self.assertIsNot(llm_registry.coder_llm(), llm_registry.router_llm())
+        self.assertEqual(len(self.created), 3)
+
+    def test_concurrent_first_use_creates_one_client(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            clients = list(pool.map(lambda _: llm_registry.cloud_llm(), range(32)))
+        self.assertEqual(len({id(c) for c in clients}), 1)
+        self.assertEqual(len(self.created), 1)
+
+    def test_real_openai_client_is_pooled(self):
+        llm_registry.set_factory(None)
+        with patch.object(config, "OPENAI_API_KEY", "test-key"):
+            llm = llm_registry.get_llm("openai", "gpt-4o")
+        self.assertIsNotNone(llm.http_client)
+        self.assertIs(llm, llm_registry.get_llm("openai", "gpt-4o"))
+
+if __name__ == '__main__':
+    unittest.main()
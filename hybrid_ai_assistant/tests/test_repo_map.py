@@ -0,0 +1,80 @@
+import os
+import tempfile
+import time
+import unittest
+from hybrid_ai_assistant.utils import repo_map
+from hybrid_ai_assistant.utils.repo_map import RepoMapIndex, generate_repo_map, estimate_tokens
+
+SOURCE = '''
+import dataclasses
+
+@dataclasses.dataclass
+class Point(Base, metaclass=Meta):
+    x: int = 0
+
+    @property
+    def norm(self) -> float:
+        return 0.0
+
+    async def move(self, dx, dy=1, *, scale: float = 1.0, **kw):
+        pass
+
+def helper(a, /, b, *args, c=None):
+    pass
+'''
+
+class TestRepoMap(unittest.TestCase):
+    def test_full_signatures(self):
+        text = generate_repo_map({"geo.py": SOURCE, "README.md": "# hi"})
+        self.assertIn("geo.py:\n  @dataclasses.dataclass\n  class Point(Base, metaclass=Meta)\n", text)
+        self.assertIn("    @property\n    def norm(self) -> float\n", text)
+        self.assertIn("    async def move(self, dx, dy=1, *, scale: float=1.0, **kw)\n", text)
+        self.assertIn("  def helper(a, /, b, *args, c=None)\n", text)
+        self.assertIn("README.md\n", text)
+        self.assertIn("bad.py:\n  (parse error)", generate_repo_map({"bad.py": "def ("}))
+
+    def test_only_changed_content_is_parsed(self):
+        index = RepoMapIndex()
+        files = {f"m{i}.py": f"def f{i}(x):\n    pass\n# {time.time()}" for i in range(20)}
+        before = repo_map.parse_stats["parsed"]
+        self.assertEqual(index.update(files), 20)
+        self.assertEqual(repo_map.parse_stats["parsed"] - before, 20)
+
+        files["m3.py"] += "\ndef g(y=2): pass\n"
+        self.assertEqual(index.update(files), 1)
+        self.assertEqual(repo_map.parse_stats["parsed"] - before, 21)
+        self.assertIn("def g(y=2)", index.render())
+
+    def test_budget_ranks_imported_and_focused_files_first(self):
+        files = {f"pkg/mod{i}.py": "".join(f"def fn{i}_{j}(a, b=1):\n    pass\n" for j in range(10)) for i in range(30)}
+        files["core.py"] = "def shared(): pass\n"
+        files["app.py"] = "import core\n"
+        files["other.py"] = "from core import shared\n"
+        index = RepoMapIndex()
+        index.update(files)
+
+        text = index.render(budget_tokens=200, focus="Fix pkg/mod17.py")
+        self.assertLessEqual(estimate_tokens(text), 200)
+        paths = [line.rstrip(":") for line in text.splitlines() if not line.startswith(" ")]
+        self.assertEqual(paths[:2], ["pkg/mod17.py", "core.py"])
+        self.assertTrue(text.rstrip().endswith("more files)"))
+
+    def test_refresh_from_directory(self):
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, "main.py"), "w") as f:
+                f.write("def main(): pass\n")
+            os.makedirs(os.path.join(root, "__pycache__"))
+            index = RepoMapIndex(root)
+            self.assertEqual(index.refresh(), 1)
+            self.assertEqual(index.refresh(), 0)  # Unchanged files aren't even re-read
+
+            os.makedirs(os.path.join(root, "lib"))
+            with open(os.path.join(root, "lib", "util.py"), "w") as f:
+                f.write("class Util: pass\n")
+            os.remove(os.path.join(root, "main.py"))
+            self.assertEqual(index.refresh(), 2)
+            self.assertEqual(list(index.manifest()), ["lib/util.py"])
+            self.assertEqual(index.manifest()["lib/util.py"]["size"], 17)
+
+if __name__ == '__main__':
+    unittest.main()
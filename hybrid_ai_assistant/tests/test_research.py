@@ -1,11 +1,31 @@
 import unittest
+from unittest.mock import patch
+from hybrid_ai_assistant.bench.fakes import FakeChatModel, FakeSearch
+from hybrid_ai_assistant.config.config import config
 from hybrid_ai_assistant.nodes.research import perform_research
+from hybrid_ai_assistant.state import blobs
+from hybrid_ai_assistant.tools import search
+from hybrid_ai_assistant.utils import llm_registry
 
 class TestResearch(unittest.TestCase):
+    def setUp(self):
+        self.search = FakeSearch()
+        llm_registry.set_factory(lambda provider, model, host: FakeChatModel(model))
+        search.set_backend(self.search)
+
+    def tearDown(self):
+        llm_registry.set_factory(None)
+        search.set_backend(None)
+
     def test_research_execution(self):
-        state = {"query": "Test"}
-        result = perform_research(state)
-        self.assertIn("research_notes", result)
+        state = {"objective": "Test", "logs": []}
+        with patch.object(config, "SEARCH_CACHE_ENABLED", False):
+            result = perform_research(state)
+        memory = blobs.load(result["research_memory"])
+        self.assertEqual(self.search.calls, 3)
+        self.assertEqual([m["query"] for m in memory], ["python web frameworks", "sqlite vs postgres", "deploying small apps"])
+        self.assertTrue(all(len(m["results"]) == 3 for m in memory))
+        self.assertEqual(len(result["logs"]), 1)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from hybrid_ai_assistant.state import blobs
+from hybrid_ai_assistant.state.blobs import Blobs, FileBlobStore
+from hybrid_ai_assistant.utils import research_index
+from hybrid_ai_assistant.utils.research_index import BM25, ResearchIndex, chunk_results, dedupe, index_for
+
+SNIPPET = ("Flask is a lightweight WSGI web framework for Python. It is designed to make getting started quick "
+           "and easy, with the ability to scale up to complex applications.")
+
+def results(*groups):
+    return [{"query": q, "results": [{"url": f"https://example.com/{q}/{i}", "content": c} for i, c in enumerate(contents)]}
+            for q, contents in groups]
+
+class TestResearchIndex(unittest.TestCase):
+    def setUp(self):
+        # Blobs go to a temporary store rather than the default under CACHE_DIR
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_blobs = blobs._default
+        blobs._default = Blobs(FileBlobStore(os.path.join(self.tmp.name, "blobs")))
+
+    def tearDown(self):
+        blobs._default = self.saved_blobs
+        self.tmp.cleanup()
+
+    def test_chunks_skip_failed_queries(self):
+        chunks = chunk_results(results(("q", ["one two three four five"])) + [{"query": "bad", "error": "Timed out"}], max_words=2)
+        self.assertEqual([c["text"] for c in chunks], ["one two", "three four", "five"])
+        self.assertEqual(chunks[0]["url"], "https://example.com/q/0")
+
+    def test_error_strings_are_not_chunked(self):
+        failed = [{"query": "q", "results": "HTTPError(401 Unauthorized)"}]
+        self.assertEqual(chunk_results(failed), [])
+        self.assertEqual(ResearchIndex(failed).render("anything"), "")
+
+    def test_near_duplicates_are_removed(self):
+        chunks = [{"text": SNIPPET}, {"text": SNIPPET.replace("quick", "quick,")}, {"text": "SQLite is an embedded database."}]
+        self.assertEqual([c["text"] for c in dedupe(chunks, threshold=0.8)], [SNIPPET, "SQLite is an embedded database."])
+
+    def test_bm25_ranks_matching_documents_first(self):
+        bm25 = BM25(["postgres replication and failover", "flask routing and templates", "flask and postgres deployment"])
+        scores = bm25.scores("flask templates")
+        self.assertEqual(int(scores.argmax()), 1)
+        self.assertEqual(float(bm25.scores("unrelated words").sum()), 0.0)
+
+    def test_top_chunks_fit_the_budget(self):
+        index = ResearchIndex(results(
+            ("web", [SNIPPET, "Django ships an ORM, admin and authentication for Python web apps."]),
+            ("db", [SNIPPET, "SQLite is a small embedded database; Postgres suits concurrent writers."]),
+        ))
+        self.assertEqual(index.stats["duplicates"], 1)
+        top = index.top("which database for concurrent writers", budget_tokens=30)
+        self.assertEqual(len(top), 1)
+        self.assertIn("Postgres", top[0]["text"])
+        self.assertTrue(index.render("python web framework").startswith("[1] "))
+        self.assertEqual(index.top("anything", budget_tokens=0), [])
+
+    def test_index_is_built_once_per_research_memory(self):
+        ref = blobs.store(results(("web", [SNIPPET] * 40)))
+        built = []
+        original = research_index.ResearchIndex
+
+        class Counting(original):
+            def __init__(self, *args, **kwargs):
+                built.append(1)
+                super().__init__(*args, **kwargs)
+
+        research_index.ResearchIndex = Counting
+        try:
+            first, second = index_for(ref), index_for(ref)
+        finally:
+            research_index.ResearchIndex = original
+        self.assertIs(first, second)
+        self.assertEqual(len(built), 1)
+        self.assertEqual(index_for([]).render("anything"), "")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+import unittest
+from hybrid_ai_assistant.bench.run import drive, offline, parse_args
+from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.orchestrator.checkpoints import open_checkpointer
+from hybrid_ai_assistant.orchestrator.graph import build_graph
+from hybrid_ai_assistant.utils.disk_cache import DiskCache
+from hybrid_ai_assistant.utils.routing import Router, RouterModel, train_from_log
+
+class TestRouter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.tmp.name, "routing.jsonl")
+        self.cache = DiskCache(os.path.join(self.tmp.name, "routing.db"))
+        self.llm_calls = []
+
+        def llm_route(objective):
+            self.llm_calls.append(objective)
+            return "cloud"
+        self.router = Router(model=RouterModel.from_keywords(), cache=self.cache, log_path=self.log_path,
+                             threshold=0.8, llm_route=llm_route)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def decisions(self):
+        with open(self.log_path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_confident_objectives_skip_the_llm(self):
+        self.assertEqual(self.router.route("Fix the bug in my parse function"), "local")
+        self.assertEqual(self.router.route("Research and compare architecture options for a chat platform"), "cloud")
+        self.assertEqual(self.llm_calls, [])
+        self.assertEqual([d["source"] for d in self.decisions()], ["model", "model"])
+
+    def test_uncertain_objectives_fall_back_and_are_memoized(self):
+        self.assertEqual(self.router.route("Make a website for my bakery"), "cloud")
+        self.assertEqual(self.router.route("make a  website for my BAKERY"), "cloud")
+        self.assertEqual(len(self.llm_calls), 1)
+        self.assertEqual(self.router.stats["cached"], 1)
+        self.assertEqual(self.decisions()[0]["source"], "llm")
+
+    def test_llm_failures_fall_back_to_the_model(self):
+        def unreachable(objective):
+            raise ConnectionError("Ollama is down")
+        self.router.llm_route = unreachable
+        self.assertEqual(self.router.route("Make a website for my bakery"), "cloud")
+        self.assertEqual(self.decisions()[0]["source"], "model")
+        # Not memoized, so the LLM is asked again once it is back
+        self.router.llm_route = lambda objective: "local"
+        self.assertEqual(self.router.route("Make a website for my bakery"), "local")
+
+    def test_unused_routes_skip_the_llm(self):
+        self.assertEqual(self.router.route("Make a website for my bakery", use_llm=False), "cloud")
+        self.assertEqual(self.llm_calls, [])
+
+    def test_retraining_from_the_log(self):
+        for _ in range(3):
+            self.router.route(f"Make a website for my bakery {_}")
+        model_path = os.path.join(self.tmp.name, "model.npz")
+        self.assertEqual(train_from_log(self.log_path, model_path), 3)
+
+        model = RouterModel.load(model_path)
+        self.assertGreater(model.predict("Make a website for my bakery"), 0.8)
+        # Hand-written keyword signal survives retraining
+        self.assertLess(model.predict("Fix the bug in my parse function"), 0.2)
+        self.assertLess(os.path.getsize(model_path), 64 * 1024)
+
+class TestRoutedGraph(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._offline = offline(self._tmp.name, parse_args(["--llm-latency", "0", "--search-latency", "0", "--exec-latency", "0"]))
+        self._offline.__enter__()
+        self.checkpointer = open_checkpointer(os.path.join(self._tmp.name, "routing-checkpoints.db"))
+        self.saved = config.ROUTE_LOCAL_SKIP_RESEARCH
+
+    def tearDown(self):
+        config.ROUTE_LOCAL_SKIP_RESEARCH = self.saved
+        self.checkpointer.conn.close()
+        self._offline.__exit__(None, None, None)
+        self._tmp.cleanup()
+
+    def nodes(self, objective):
+        timings, values = drive(build_graph(checkpointer=self.checkpointer), objective)
+        return [name for name, _ in timings], values
+
+    def test_local_objectives_are_still_researched_by_default(self):
+        nodes, values = self.nodes("Fix the bug in my parse function")
+        self.assertEqual(values["route"], "local")
+        self.assertIn("research", nodes)
+        self.assertTrue(values["research_memory"])
+
+    def test_skipping_research_is_opt_in(self):
+        config.ROUTE_LOCAL_SKIP_RESEARCH = True
+        nodes, _ = self.nodes("Fix the bug in my parse function")
+        self.assertNotIn("research", nodes)
+        self.assertIn("execution", nodes)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,251 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from langchain_core.messages import AIMessage, AIMessageChunk
+from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.nodes.execution import execute_plan
+from hybrid_ai_assistant.utils.codegen import speculation_metrics
+from hybrid_ai_assistant.utils import llm_registry
+from hybrid_ai_assistant.utils.instrumentation import payload_bytes
+from hybrid_ai_assistant.utils.sandbox import LocalSandbox, MeasuredSandbox, set_sandbox
+
+class TestLocalSandbox(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sandbox = LocalSandbox(project_dir=self.tmp.name)
+        self.sid = self.sandbox.acquire(run_id="run-1")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_write_and_run(self):
+        written = self.sandbox.write_files(self.sid, {"pkg/main.py": "import sys\nprint('hi'); sys.exit(4)\n"})
+        self.assertEqual(written, {"pkg/main.py": "ok"})
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "run-1", "pkg", "main.py")))
+
+        result = self.sandbox.run(self.sid, "python pkg/main.py")
+        self.assertEqual((result.exit_code, result.stdout), (4, "hi\n"))
+        self.assertEqual(self.sandbox.read_files(self.sid, ["pkg/main.py"])["pkg/main.py"][:6], b"import")
+
+    def test_read_payload_counts_file_bytes(self):
+        measured = MeasuredSandbox(self.sandbox)
+        measured.write_files(self.sid, {"a.txt": "x" * 100})
+        _, before = payload_bytes.value(kind="sandbox", name="read_files", direction="response")
+        measured.read_files(self.sid, ["a.txt", "missing.txt"])
+        _, after = payload_bytes.value(kind="sandbox", name="read_files", direction="response")
+        self.assertEqual(after - before, 100)
+
+    def test_paths_stay_in_workspace(self):
+        self.assertTrue(self.sandbox.write_files(self.sid, {"../escape.py": "x"})["../escape.py"].startswith("Error"))
+        with self.assertRaises(ValueError):
+            self.sandbox.workspace("../other")
+
+    def test_environment_is_scrubbed(self):
+        os.environ["SANDBOX_TEST_SECRET"] = "leak"
+        try:
+            result = self.sandbox.run(self.sid, "echo ${SANDBOX_TEST_SECRET:-clean}; pwd")
+        finally:
+            del os.environ["SANDBOX_TEST_SECRET"]
+        self.assertEqual(result.stdout.split(), ["clean", os.path.realpath(os.path.join(self.tmp.name, "run-1"))])
+
+    def test_timeout_kills_process_group(self):
+        seen = []
+        result = self.sandbox.run(self.sid, "echo started; sleep 30 & sleep 30", timeout=0.5, on_output=lambda s, t: seen.append(t))
+        self.assertTrue(result.timed_out)
+        self.assertIsNone(result.exit_code)
+        self.assertLess(result.duration, 5)
+        self.assertEqual(seen, ["started\n"])
+
+    def test_limits(self):
+        sandbox = LocalSandbox(project_dir=self.tmp.name, file_size_mb=1)
+        result = sandbox.run(self.sid, "head -c 2000000 /dev/zero > big.bin")
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertLessEqual(os.path.getsize(os.path.join(self.tmp.name, "run-1", "big.bin")), 1024 * 1024)
+
+        sandbox = LocalSandbox(project_dir=self.tmp.name, cpu_seconds=7, memory_mb=512, file_size_mb=1)
+        self.assertEqual(sandbox.run(self.sid, "ulimit -t; ulimit -v; ulimit -f").stdout.split(), ["7", "524288", "2048"])
+
+class FakeCoder:
+    model = "fake-coder"
+
+    def __init__(self, responses, delay=0):
+        self.responses = responses if isinstance(responses, dict) else list(responses)
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def invoke(self, prompt):
+        time.sleep(self.delay)
+        with self.lock:
+            if isinstance(self.responses, dict):
+                step = next(s for s in self.responses if f"Current Step: {s}" in prompt)
+                return AIMessage(content=self.responses[step])
+            return AIMessage(content=self.responses.pop(0))
+
+    def stream(self, prompt):
+        content = self.invoke(prompt).content
+        for i in range(0, len(content), 8):
+            yield AIMessageChunk(content=content[i:i + 8])
+
+class PacedCoder:
+    """Streams each step's reply after a start delay, one chunk per pace seconds."""
+
+    model = "fake-coder"
+
+    def __init__(self, responses):
+        self.responses = responses  # step -> (start, pace, content)
+
+    def stream(self, prompt):
+        start, pace, content = next(r for s, r in self.responses.items() if f"Current Step: {s}" in prompt)
+        time.sleep(start)
+        for i in range(0, len(content), 8):
+            time.sleep(pace)
+            yield AIMessageChunk(content=content[i:i + 8])
+
+class TestExecutePlanLocal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        set_sandbox(LocalSandbox(project_dir=self.tmp.name))
+
+    def tearDown(self):
+        set_sandbox(None)
+        llm_registry.set_factory(None)
+        self.tmp.cleanup()
+
+    def test_retries_until_exit_zero(self):
+        responses = [
+            json.dumps({"filename": "main.py", "content": "raise SystemExit(1)"}),
+            json.dumps({"filename": "main.py", "content": "print('fixed')"}),
+        ]
+        coder = FakeCoder(responses)
+        llm_registry.set_factory(lambda provider, model, host: coder)
+        state = execute_plan({"objective": "demo", "execution_steps": ["write main"], "logs": [], "run_id": "run-1"})
+
+        self.assertEqual(coder.responses, [])
+        self.assertEqual(state["completed_steps"], ["write main"])
+        self.assertIn("[exit 0] fixed", state["logs"][-1])
+        self.assertEqual(list(state["file_system_state"]), ["main.py"])
+
+    def test_independent_steps_run_in_parallel(self):
+        responses = {
+            f"step {i}": json.dumps({"filename": f"s{i}.py", "content": f"print({i})"}) for i in range(4)
+        }
+        coder = FakeCoder(responses, delay=0.3)
+        llm_registry.set_factory(lambda provider, model, host: coder)
+        state = {
+            "objective": "demo", "execution_steps": list(responses), "logs": [], "run_id": "run-1",
+            "step_dependencies": [[], [], [], [0, 1, 2]],
+        }
+        began = time.monotonic()
+        state = execute_plan(state)
+
+        self.assertLess(time.monotonic() - began, 1.0)  # Two waves instead of four sequential calls
+        self.assertEqual(state["completed_steps"], list(responses))
+        # Logs are merged in step order regardless of which step finished first
+        executed = [line.split(":")[0] for line in state["logs"] if line.startswith("Executed")]
+        self.assertEqual(executed, [f"Executed step {i}" for i in range(4)])
+
+    def test_parallel_steps_run_the_file_they_wrote(self):
+        # Step 0 writes main.py first but is still streaming notes.txt when step 1 overwrites main.py
+        coder = PacedCoder({
+            "step 0": (0, 0.01, json.dumps({"files": [
+                {"filename": "main.py", "content": "print(0)"}, {"filename": "notes.txt", "content": "n" * 400},
+            ]})),
+            "step 1": (0.15, 0, json.dumps({"filename": "main.py", "content": "print(1)"})),
+        })
+        llm_registry.set_factory(lambda provider, model, host: coder)
+        state = execute_plan({
+            "objective": "demo", "execution_steps": ["step 0", "step 1"], "logs": [], "run_id": "run-1",
+            "step_dependencies": [[], []],
+        })
+
+        executed = [line for line in state["logs"] if line.startswith("Executed")]
+        self.assertIn("[exit 0] 0", executed[0])
+        self.assertIn("[exit 0] 1", executed[1])
+
+    def test_malformed_generation_is_abandoned(self):
+        responses = [
+            "Sorry, as an AI model I will explain first. " * 20,
+            json.dumps({"filename": "main.py", "content": "print('ok')"}),
+        ]
+        coder = FakeCoder(responses)
+        llm_registry.set_factory(lambda provider, model, host: coder)
+        state = execute_plan({"objective": "demo", "execution_steps": ["write main"], "logs": [], "run_id": "run-1"})
+
+        self.assertTrue(any("does not start with a JSON object" in line for line in state["logs"]))
+        self.assertIn("[exit 0] ok", state["logs"][-1])
+
+class SamplingCoder:
+    """Answers according to the temperature it was bound with."""
+
+    model = "fake-coder"
+
+    def __init__(self, by_temperature, temperature=None):
+        self.by_temperature = by_temperature
+        self.temperature = temperature
+
+    def bind(self, temperature=None, seed=None):
+        return SamplingCoder(self.by_temperature, temperature)
+
+    def stream(self, prompt):
+        delay, content = self.by_temperature[self.temperature]
+        for i in range(0, len(content), 8):
+            time.sleep(delay)
+            yield AIMessageChunk(content=content[i:i + 8])
+
+class TestSpeculativeExecution(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        set_sandbox(LocalSandbox(project_dir=self.tmp.name))
+        patcher = patch.multiple(config, SPECULATIVE_CANDIDATES=3, SPECULATIVE_MAX_PARALLEL=3,
+                                 SPECULATIVE_TEMPERATURES=[0.1, 0.5, 0.9])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        set_sandbox(None)
+        llm_registry.set_factory(None)
+        self.tmp.cleanup()
+
+    def test_first_passing_candidate_is_promoted(self):
+        coder = SamplingCoder({
+            0.1: (0, json.dumps({"filename": "main.py", "content": "raise SystemExit(2)"})),
+            0.5: (0, json.dumps({"filename": "main.py", "content": "open('made.txt', 'w'); print('pass')"})),
+            0.9: (0.2, json.dumps({"filename": "main.py", "content": "print('slow')"})),
+        })
+        llm_registry.set_factory(lambda provider, model, host: coder)
+        before = speculation_metrics.summary()
+        state = execute_plan({"objective": "demo", "execution_steps": ["write main"], "logs": [], "run_id": "run-1"})
+
+        run_dir = os.path.join(self.tmp.name, "run-1")
+        with open(os.path.join(run_dir, "main.py")) as f:
+            self.assertIn("pass", f.read())
+        # Only the promoted files reach the workspace; side effects of candidate runs stay in scratch copies
+        self.assertEqual([f for f in os.listdir(run_dir) if not f.startswith(".")], ["main.py"])
+        self.assertIn("candidate 1 of 3 passed", state["logs"][-1])
+        after = speculation_metrics.summary()
+        self.assertEqual(after["paid_off"] - before["paid_off"], 1)
+        self.assertEqual(after["wins_by_candidate"].get(1, 0) - before["wins_by_candidate"].get(1, 0), 1)
+
+    def test_candidates_run_their_own_copy_of_absolute_paths(self):
+        coder = SamplingCoder({
+            t: (0, json.dumps({"filename": "/workspace/main.py", "content": f"print({t})"})) for t in (0.1, 0.5, 0.9)
+        })
+        llm_registry.set_factory(lambda provider, model, host: coder)
+        # The real workspace copy fails; only a candidate running its scratch copy passes
+        run_dir = os.path.join(self.tmp.name, "run-1")
+        os.makedirs(run_dir)
+        with open(os.path.join(run_dir, "main.py"), "w") as f:
+            f.write("raise SystemExit(3)")
+        state = execute_plan({"objective": "demo", "execution_steps": ["write main"], "logs": [], "run_id": "run-1"})
+
+        self.assertIn("[exit 0]", state["logs"][0])
+        self.assertIn("passed and was promoted", state["logs"][-1])
+        with open(os.path.join(run_dir, "main.py")) as f:
+            self.assertTrue(f.read().startswith("print("))
+
+if __name__ == '__main__':
+    unittest.main()
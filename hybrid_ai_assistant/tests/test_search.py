@@ -0,0 +1,100 @@
+import os
+import tempfile
+import time
+import unittest
+from hybrid_ai_assistant.tools.search import search_many, cached_search
+from hybrid_ai_assistant.utils.disk_cache import DiskCache
+
+def stub_search(q):
+    if q == "slow":
+        time.sleep(1)
+    if q == "boom":
+        raise RuntimeError("search failed")
+    return [f"result for {q}"]
+
+class TestSearchMany(unittest.TestCase):
+    def test_preserves_order(self):
+        queries = ["a", "b", "c", "d"]
+        results = search_many(queries, search=stub_search, max_concurrency=2, query_timeout=5, batch_timeout=5)
+        self.assertEqual([r["query"] for r in results], queries)
+        self.assertEqual(results[2]["results"], ["result for c"])
+
+    def test_errors_are_reported_per_query(self):
+        results = search_many(["a", "boom"], search=stub_search, query_timeout=5, batch_timeout=5)
+        self.assertIn("results", results[0])
+        self.assertIn("search failed", results[1]["error"])
+
+    def test_error_strings_are_reported_as_errors(self):
+        results = search_many(["a", "q"], search=lambda q: "HTTPError('401 Unauthorized')" if q == "q" else [q],
+                              query_timeout=5, batch_timeout=5)
+        self.assertEqual(results[0], {"query": "a", "results": ["a"]})
+        self.assertEqual(results[1], {"query": "q", "error": "HTTPError('401 Unauthorized')"})
+
+    def test_query_deadline_returns_partial_results(self):
+        start = time.monotonic()
+        results = search_many(["slow", "a"], search=stub_search, query_timeout=0.2, batch_timeout=5)
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertIn("Timed out", results[0]["error"])
+        self.assertEqual(results[1]["results"], ["result for a"])
+
+    def test_batch_deadline_cancels_outstanding(self):
+        results = search_many(["slow", "slow", "a"], search=stub_search, max_concurrency=1,
+                              query_timeout=5, batch_timeout=0.2)
+        self.assertIn("error", results[0])
+        self.assertIn("Cancelled", results[2]["error"])
+
+class TestSearchCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "search.db")
+        self.calls = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def backend(self, q):
+        self.calls.append(q)
+        return [{"content": f"result for {q}"}]
+
+    def test_normalised_queries_hit_cache(self):
+        cache = DiskCache(self.path)
+        first = cached_search("Best Python  web framework", search=self.backend, cache=cache)
+        second = cached_search("best python web framework ", search=self.backend, cache=cache)
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(cache.stats["hits"], 1)
+        self.assertEqual(cache.stats["misses"], 1)
+
+    def test_survives_restart(self):
+        cache = DiskCache(self.path)
+        cached_search("flask rest api", search=self.backend, cache=cache)
+        cache.close()
+        cached_search("flask rest api", search=self.backend, cache=DiskCache(self.path))
+        self.assertEqual(len(self.calls), 1)
+
+    def test_ttl_expiry(self):
+        cache = DiskCache(self.path, ttl=0.05)
+        cached_search("q", search=self.backend, cache=cache)
+        time.sleep(0.1)
+        cached_search("q", search=self.backend, cache=cache)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(cache.stats["expired"], 1)
+
+    def test_lru_byte_budget(self):
+        cache = DiskCache(self.path, max_bytes=100)
+        cache.set("a", "x" * 40)
+        cache.set("b", "y" * 40)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", "z" * 40)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(cache.stats["evictions"], 1)
+        self.assertLessEqual(cache.size_bytes(), 100)
+
+    def test_errors_not_cached(self):
+        cache = DiskCache(self.path)
+        cached_search("q", search=lambda q: "HTTPError('429')", cache=cache)
+        self.assertIsNone(cache.get("q"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import threading
+import time
+import unittest
+from hybrid_ai_assistant.utils.step_graph import normalize, parse_steps, run_dag, sequential
+
+class TestStepGraph(unittest.TestCase):
+    def test_parse_annotated_steps(self):
+        text = """
+        Create main module [after: none]
+        2. Create requirements.txt [after: none]
+        - Write tests [after: 1]
+        Wire up the CLI [After: 1, 3]
+        """
+        steps, deps = parse_steps(text)
+        self.assertEqual(steps, ["Create main module", "Create requirements.txt", "Write tests", "Wire up the CLI"])
+        self.assertEqual(deps, [[], [], [0], [0, 2]])
+
+    def test_unannotated_steps_stay_sequential(self):
+        steps, deps = parse_steps("a\nb\nc [after: 3]\n")
+        self.assertEqual(steps, ["a", "b", "c"])
+        # Forward and self references are dropped, which keeps the graph acyclic
+        self.assertEqual(deps, [[], [0], []])
+        self.assertEqual(normalize(None, 3), sequential(3))
+        self.assertEqual(normalize([[], [5, 0], [2, 1]], 3), [[], [0], [1]])
+
+    def test_independent_steps_run_concurrently(self):
+        started = []
+        lock = threading.Lock()
+
+        def step(i):
+            with lock:
+                started.append(i)
+            time.sleep(0.2)
+            return f"step {i}"
+
+        began = time.monotonic()
+        # 0 and 1 are independent, 2 needs both, 3 needs 0
+        results = run_dag(4, [[], [], [0, 1], [0]], step, max_workers=4)
+        elapsed = time.monotonic() - began
+
+        self.assertEqual(results, ["step 0", "step 1", "step 2", "step 3"])
+        self.assertLess(elapsed, 0.6)  # Two waves rather than four sequential steps
+        self.assertEqual(sorted(started[:2]), [0, 1])
+
+    def test_worker_limit(self):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def step(i):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+        run_dag(6, [[]] * 6, step, max_workers=2)
+        self.assertEqual(peak[0], 2)
+
+if __name__ == '__main__':
+    unittest.main()
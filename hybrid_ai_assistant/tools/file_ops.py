@@ -1,17 +1,18 @@
 from langchain.tools import tool
-from hybrid_ai_assistant.utils.docker_utils import exec_in_container
+from hybrid_ai_assistant.utils.sandbox import get_sandbox
 
 @tool
 def list_dir(path: str, container_id: str):
     """List contents of a directory in the specific container."""
     if not container_id: return "Error: No container ID"
-    return exec_in_container(container_id, "ls " + path)
+    return get_sandbox().run(container_id, "ls " + path).output
 
 @tool
 def read_file(path: str, container_id: str):
     """Read a file in the specific container."""
     if not container_id: return "Error: No container ID"
-    return exec_in_container(container_id, "cat " + path)
+    content = get_sandbox().read_files(container_id, [path])[path]
+    return content if isinstance(content, str) else content.decode(errors="replace")
 
 @tool
 def write_file(path: str, content: str, container_id: str):
@@ -20,10 +21,16 @@ def write_file(path: str, content: str, container_id: str):
     # Gate for overwrite
     # if file_exists(path, container_id):
     #     pass
-    return exec_in_container(container_id, f"echo '{content}' > {path}")
+    return get_sandbox().write_files(container_id, {path: content})[path]
+
+@tool
+def write_files(files: dict, container_id: str):
+    """Write several files ({path: content}) to the specific container in one upload."""
+    if not container_id: return "Error: No container ID"
+    return get_sandbox().write_files(container_id, files)
 
 @tool
 def mkdir(path: str, container_id: str):
     """Create a directory in the specific container."""
     if not container_id: return "Error: No container ID"
-    return exec_in_container(container_id, "mkdir -p " + path)
+    return get_sandbox().run(container_id, "mkdir -p " + path).output
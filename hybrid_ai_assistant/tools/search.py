@@ -1,4 +1,229 @@
-from langchain_community.tools.tavily_search import TavilySearchResults
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils.disk_cache import DiskCache
+from hybrid_ai_assistant.utils.aio import offload
+from hybrid_ai_assistant.utils.gateway import RateLimited, get_gateway
+from hybrid_ai_assistant.utils.instrumentation import span
 
-tavily_tool = TavilySearchResults(api_key=config.TAVILY_API_KEY, max_results=5)
+_tavily = None
+_tavily_lock = threading.Lock()
+
+# Shared by every run in the process and persisted across restarts
+search_cache = DiskCache(
+    os.path.join(config.CACHE_DIR, "search.db"),
+    ttl=config.SEARCH_CACHE_TTL,
+    max_bytes=config.SEARCH_CACHE_MAX_BYTES,
+)
+
+def normalize_query(query: str) -> str:
+    # Case and whitespace differences shouldn't cost another API call
+    return " ".join(query.lower().split())
+
+# Replaces Tavily when set, e.g. with the offline fake in bench.fakes
+_backend = None
+
+def get_tavily():
+    """The Tavily tool, built on first use: langchain_community is slow to import and the tool insists on an API key."""
+    global _tavily
+    if _tavily is None:
+        with _tavily_lock:
+            if _tavily is None:
+                from langchain_community.tools.tavily_search import TavilySearchResults
+                _tavily = TavilySearchResults(api_key=config.TAVILY_API_KEY, max_results=5)
+    return _tavily
+
+def _raise_if_rate_limited(results):
+    # The tool returns errors as a string; raise on a 429 so the gateway backs off and retries
+    if isinstance(results, str) and ("429" in results or "too many requests" in results.lower()):
+        raise RateLimited(results)
+    return results
+
+def tavily_search(query: str):
+    return _raise_if_rate_limited(get_tavily().invoke({"query": query}))
+
+async def _acall_backend(search, query):
+    if search is tavily_search:
+        return _raise_if_rate_limited(await get_tavily().ainvoke({"query": query}))
+    if hasattr(search, "asearch"):
+        return await search.asearch(query)
+    # Plain functions have no async form; run them off the event loop
+    return await offload(search, query)
+
+def set_backend(search):
+    """Swap the search function used on a cache miss; pass None to restore Tavily."""
+    global _backend
+    _backend = search
+
+def _observe(s, results):
+    if isinstance(results, list):
+        s.payload("response", len(json.dumps(results, default=str)))
+    else:
+        s.fail()  # The Tavily tool reports errors as a string
+    return results
+
+def _span_name(search):
+    return getattr(search, "__name__", type(search).__name__)
+
+def _measured(search, query):
+    # Rate limited, retried and shared with identical in-flight queries by the gateway; each attempt is a span
+    def call():
+        with span("search", _span_name(search)) as s:
+            s.payload("request", len(query))
+            return _observe(s, search(query))
+
+    return get_gateway().call("tavily", None, call, key=(id(search), normalize_query(query)))
+
+async def _ameasured(search, query):
+    async def call():
+        with span("search", _span_name(search)) as s:
+            s.payload("request", len(query))
+            return _observe(s, await _acall_backend(search, query))
+
+    return await get_gateway().acall("tavily", None, call, key=(id(search), normalize_query(query)))
+
+def cached_search(query: str, search=None, cache=None):
+    """Search through the on-disk cache, falling back to the backend on a miss.
+
+    Failed searches are never cached: the backend either raises or, in the
+    case of the Tavily tool, returns an error string instead of a result list.
+    """
+    search = search or _backend or tavily_search
+    cache = cache or search_cache
+    if not config.SEARCH_CACHE_ENABLED:
+        return _measured(search, query)
+
+    key = normalize_query(query)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    results = _measured(search, query)
+    if isinstance(results, list):
+        cache.set(key, results)
+    return results
+
+async def acached_search(query: str, search=None, cache=None):
+    """cached_search for async callers; the Tavily tool is awaited, other backends and the cache run on the blocking pool."""
+    search = search or _backend or tavily_search
+    cache = cache or search_cache
+    if not config.SEARCH_CACHE_ENABLED:
+        return await _ameasured(search, query)
+
+    key = normalize_query(query)
+    hit = await offload(cache.get, key)
+    if hit is not None:
+        return hit
+    results = await _ameasured(search, query)
+    if isinstance(results, list):
+        await offload(cache.set, key, results)
+    return results
+
+def _entry(query, results):
+    # The Tavily tool reports errors (bad key, quota, ...) as a string rather than raising
+    if not isinstance(results, list):
+        return {"query": query, "error": str(results)}
+    return {"query": query, "results": results}
+
+def search_many(queries, search=None, max_concurrency=None, query_timeout=None, batch_timeout=None):
+    """Run several search queries concurrently.
+
+    Returns one entry per query, in the original order: either
+    {"query", "results"} or {"query", "error"}. Queries that exceed their own
+    deadline, or are still outstanding when the batch deadline passes, are
+    abandoned and reported as errors so callers can work with partial results.
+    """
+    search = search or cached_search
+    max_concurrency = max_concurrency or config.RESEARCH_MAX_CONCURRENCY
+    query_timeout = query_timeout or config.RESEARCH_QUERY_TIMEOUT
+    batch_timeout = batch_timeout or config.RESEARCH_BATCH_TIMEOUT
+
+    results = [None] * len(queries)
+    if not queries:
+        return results
+
+    started = {}  # index -> monotonic start time, set by the worker thread
+
+    def run(i, q):
+        started[i] = time.monotonic()
+        return search(q)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(queries))))
+    # Each query runs in a copy of the caller's context so its span joins the run's trace
+    futures = {executor.submit(contextvars.copy_context().run, run, i, q): i for i, q in enumerate(queries)}
+    pending = set(futures)
+    batch_deadline = time.monotonic() + batch_timeout
+
+    try:
+        while pending:
+            now = time.monotonic()
+
+            # Drop queries that have been running longer than their own deadline
+            for fut in list(pending):
+                i = futures[fut]
+                if i in started and now - started[i] >= query_timeout and not fut.done():
+                    pending.discard(fut)
+                    fut.cancel()
+                    results[i] = {"query": queries[i], "error": f"Timed out after {query_timeout}s"}
+
+            if not pending or now >= batch_deadline:
+                break
+
+            next_deadline = min(
+                [started[futures[f]] + query_timeout for f in pending if futures[f] in started] + [batch_deadline]
+            )
+            done, pending = wait(pending, timeout=max(0, next_deadline - now), return_when=FIRST_COMPLETED)
+            for fut in done:
+                i = futures[fut]
+                try:
+                    results[i] = _entry(queries[i], fut.result())
+                except Exception as e:
+                    results[i] = {"query": queries[i], "error": str(e)}
+    finally:
+        # Don't block on stragglers; queued queries are cancelled outright
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    for i, r in enumerate(results):
+        if r is None:
+            results[i] = {"query": queries[i], "error": f"Cancelled at batch deadline ({batch_timeout}s)"}
+    return results
+
+async def asearch_many(queries, search=None, max_concurrency=None, query_timeout=None, batch_timeout=None):
+    """search_many on the event loop: same concurrency bound, deadlines and result shape, no threads.
+
+    search is a coroutine function, acached_search by default.
+    """
+    search = search or acached_search
+    max_concurrency = max_concurrency or config.RESEARCH_MAX_CONCURRENCY
+    query_timeout = query_timeout or config.RESEARCH_QUERY_TIMEOUT
+    batch_timeout = batch_timeout or config.RESEARCH_BATCH_TIMEOUT
+    if not queries:
+        return []
+
+    slots = asyncio.Semaphore(max_concurrency)
+
+    async def run(q):
+        async with slots:
+            # The query's own deadline starts once it's running, as in search_many
+            return await asyncio.wait_for(search(q), query_timeout)
+
+    tasks = [asyncio.ensure_future(run(q)) for q in queries]
+    _, pending = await asyncio.wait(tasks, timeout=batch_timeout)
+    for task in pending:
+        task.cancel()
+
+    results = []
+    for q, task in zip(queries, tasks):
+        if task in pending:
+            results.append({"query": q, "error": f"Cancelled at batch deadline ({batch_timeout}s)"})
+        elif isinstance(task.exception(), asyncio.TimeoutError):
+            results.append({"query": q, "error": f"Timed out after {query_timeout}s"})
+        elif task.exception() is not None:
+            results.append({"query": q, "error": str(task.exception())})
+        else:
+            results.append(_entry(q, task.result()))
+    return results
@@ -0,0 +1,40 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from hybrid_ai_assistant.config.config import config
+
+# Created on first use, and shared by every event loop in the process
+_pool = None
+_pool_lock = threading.Lock()
+
+def blocking_pool() -> ThreadPoolExecutor:
+    """Threads for the async graph's blocking work: SQLite caches, blob files, index builds."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=config.ASYNC_BLOCKING_THREADS, thread_name_prefix="blocking")
+    return _pool
+
+async def offload(fn, *args):
+    """Await fn(*args) on the blocking pool, in a copy of the caller's context so its spans join the run's trace."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_pool(), contextvars.copy_context().run, fn, *args)
+
+def new_event_loop():
+    """An event loop whose default executor has ASYNC_BLOCKING_THREADS threads.
+
+    The default would be min(32, cpus + 4) threads, shared by LangGraph's
+    synchronous nodes and asyncio.to_thread, which throttles hundreds of runs
+    on a small machine. It's the loop's own, since closing a loop shuts its
+    default executor down.
+    """
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=config.ASYNC_BLOCKING_THREADS, thread_name_prefix="loop"))
+    return loop
+
+def run(coro):
+    """asyncio.run on a loop from new_event_loop."""
+    with asyncio.Runner(loop_factory=new_event_loop) as runner:
+        return runner.run(coro)
@@ -0,0 +1,295 @@
+import json
+import re
+import threading
+import time
+
+_FENCES = ("```json", "```")
+_SCALAR = re.compile(r"[-+0-9.eEtruefalsn]")
+
+class CodeStreamParser:
+    """Incremental parser for the coder's reply.
+
+    The reply must be {"filename": ..., "content": ...} or
+    {"files": [{"filename": ..., "content": ...}, ...]}, optionally inside a
+    ```json fence. feed() takes text as it streams and returns file entries
+    as soon as each one is complete. error is set the moment the text can
+    no longer become such an object, so the caller can stop generating.
+    done is set once the top-level object closes.
+    """
+
+    def __init__(self):
+        self.error = None
+        self.done = False
+        self.entries = []
+        self._lead = ""  # Text before the opening brace (whitespace or a fence)
+        self._body = []  # Characters of the JSON object
+        self._started = False
+        # One frame per open container: [kind, state, start index, key]
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._scalar = ""
+        self._has_files = False
+
+    def feed(self, text: str):
+        completed = []
+        for ch in text:
+            if self.error or self.done:
+                break
+            self._step(ch, completed)
+        return completed
+
+    def finish(self):
+        """Call when the stream ends; flags a reply that stopped before the object closed."""
+        if not self.done and not self.error:
+            self.error = "Response ended before the JSON object was complete"
+        return self.error
+
+    @property
+    def files(self):
+        return {e["filename"]: e["content"] for e in self.entries}
+
+    def _fail(self, message):
+        self.error = f"{message} (at character {len(self._lead) + len(self._body)})"
+
+    def _step(self, ch, completed):
+        if not self._started:
+            if ch == "{":
+                if self._lead.strip().lower() not in ("",) + _FENCES:
+                    return self._fail("Response does not start with a JSON object")
+                self._started = True
+                self._body.append(ch)
+                self._open("object")
+                return
+            self._lead += ch
+            lead = self._lead.strip().lower()
+            if lead and not any(f.startswith(lead) for f in _FENCES):
+                self._fail("Response does not start with a JSON object")
+            return
+
+        self._body.append(ch)
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == "\"":
+                self._in_string = False
+                self._end_string()
+            return
+
+        if self._scalar:
+            if _SCALAR.match(ch):
+                self._scalar += ch
+                return
+            if not self._end_scalar():
+                return
+        if ch.isspace():
+            return
+
+        frame = self._stack[-1]
+        kind, state = frame[0], frame[1]
+        if kind == "object" and state in ("key_or_end", "key"):
+            if ch == "\"":
+                self._start_string()
+            elif ch == "}" and state == "key_or_end":
+                self._close(completed)
+            else:
+                self._fail("Expected a key")
+        elif kind == "object" and state == "colon":
+            if ch != ":":
+                return self._fail("Expected ':'")
+            frame[1] = "value"
+        elif state in ("value", "value_or_end"):
+            if ch == "]" and state == "value_or_end":
+                return self._close(completed)
+            self._start_value(ch)
+        elif state == "comma_or_end":
+            closer = "}" if kind == "object" else "]"
+            if ch == ",":
+                frame[1] = "key" if kind == "object" else "value"
+            elif ch == closer:
+                self._close(completed)
+            else:
+                self._fail(f"Expected ',' or '{closer}'")
+
+    def _path(self):
+        # Where a value starting now sits: "top", "files", "entry", or None for anywhere else
+        depth = len(self._stack)
+        if depth == 1:
+            return "top"
+        if depth == 2 and self._stack[0][3] == "files":
+            return "files"
+        if depth == 3 and self._stack[0][3] == "files":
+            return "entry"
+        return None
+
+    def _start_value(self, ch):
+        path, key = self._path(), self._stack[-1][3]
+        # Shape checks on the values that matter; anything else is accepted and ignored
+        if path == "top" and key == "files" and ch != "[":
+            return self._fail("\"files\" must be a list")
+        if path == "files" and ch != "{":
+            return self._fail("Each entry in \"files\" must be an object")
+        if path in ("top", "entry") and key in ("filename", "content") and ch != "\"":
+            return self._fail(f"\"{key}\" must be a string")
+        if ch == "{":
+            self._open("object")
+        elif ch == "[":
+            self._open("array")
+        elif ch == "\"":
+            self._start_string()
+        elif _SCALAR.match(ch):
+            self._scalar = ch
+        else:
+            self._fail("Expected a value")
+
+    def _open(self, kind):
+        if self._stack:
+            self._stack[-1][1] = "comma_or_end"
+        self._stack.append([kind, "key_or_end" if kind == "object" else "value_or_end", len(self._body) - 1, None])
+
+    def _close(self, completed):
+        frame = self._stack.pop()
+        # A finished entry is the top-level object itself, or one object inside "files"
+        if not self._stack:
+            self.done = True
+            if not self._has_files:
+                self._entry("".join(self._body), completed)
+            return
+        if self._path() == "files" and frame[0] == "object":
+            self._entry("".join(self._body[frame[2]:]), completed)
+
+    def _entry(self, raw, completed):
+        try:
+            data = json.loads(raw)
+        except ValueError as e:
+            return self._fail(f"Invalid JSON: {e}")
+        if data.get("filename") and data.get("content"):
+            self.entries.append(data)
+            completed.append(data)
+
+    def _start_string(self):
+        self._in_string = True
+        self._string_start = len(self._body) - 1
+
+    def _end_string(self):
+        frame = self._stack[-1]
+        if frame[0] == "object" and frame[1] in ("key_or_end", "key"):
+            key = json.loads("".join(self._body[self._string_start:]))
+            frame[3] = key
+            frame[1] = "colon"
+            if len(self._stack) == 1 and key == "files":
+                self._has_files = True
+        else:
+            frame[1] = "comma_or_end"
+
+    def _end_scalar(self):
+        scalar, self._scalar = self._scalar, ""
+        try:
+            json.loads(scalar)
+        except ValueError:
+            self._fail(f"Invalid literal {scalar!r}")
+            return False
+        self._stack[-1][1] = "comma_or_end"
+        return True
+
+class GenerationStats:
+    """Timing of one streamed generation."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_token = None
+        self.finished = None
+        self.chunks = 0
+        self.chars = 0
+
+    def chunk(self, text):
+        if self.first_token is None:
+            self.first_token = time.monotonic()
+        self.chunks += 1
+        self.chars += len(text)
+
+    def finish(self):
+        self.finished = time.monotonic()
+
+    @property
+    def ttft(self):
+        return None if self.first_token is None else self.first_token - self.started
+
+    @property
+    def tokens_per_second(self):
+        # Streamed chunks are one token each for Ollama and OpenAI, which is close enough here
+        if self.first_token is None or self.finished is None or self.finished <= self.first_token:
+            return None
+        return self.chunks / (self.finished - self.first_token)
+
+    def describe(self):
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "n/a"
+        rate = f"{self.tokens_per_second:.1f} tok/s" if self.tokens_per_second else "n/a"
+        return f"ttft {ttft}, {rate}, {self.chunks} chunks"
+
+class GenerationMetrics:
+    """Streamed code generation totals: latency, throughput and early aborts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals = {"generations": 0, "aborted": 0, "ttft_seconds": 0.0, "max_ttft_seconds": 0.0,
+                       "generation_seconds": 0.0, "chunks": 0}
+
+    def record(self, stats: GenerationStats, aborted=False):
+        with self._lock:
+            t = self.totals
+            t["generations"] += 1
+            t["aborted"] += aborted
+            t["chunks"] += stats.chunks
+            if stats.ttft is not None:
+                t["ttft_seconds"] += stats.ttft
+                t["max_ttft_seconds"] = max(t["max_ttft_seconds"], stats.ttft)
+            if stats.finished is not None:
+                t["generation_seconds"] += stats.finished - stats.started
+
+    def summary(self):
+        with self._lock:
+            t = dict(self.totals)
+        t["avg_ttft_seconds"] = t["ttft_seconds"] / t["generations"] if t["generations"] else 0.0
+        t["tokens_per_second"] = t["chunks"] / t["generation_seconds"] if t["generation_seconds"] else 0.0
+        return t
+
+generation_metrics = GenerationMetrics()
+
+class SpeculationMetrics:
+    """How often speculative generation pays off.
+
+    A round pays off when a candidate other than the first one wins: without
+    speculation the step would have waited for another attempt or for a
+    slower generation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals = {"rounds": 0, "candidates": 0, "wins": 0, "paid_off": 0, "no_winner": 0, "cancelled": 0}
+        self.wins_by_candidate = {}
+
+    def record(self, candidates, winner, cancelled=0):
+        with self._lock:
+            t = self.totals
+            t["rounds"] += 1
+            t["candidates"] += candidates
+            t["cancelled"] += cancelled
+            if winner is None:
+                t["no_winner"] += 1
+                return
+            t["wins"] += 1
+            t["paid_off"] += winner > 0
+            self.wins_by_candidate[winner] = self.wins_by_candidate.get(winner, 0) + 1
+
+    def summary(self):
+        with self._lock:
+            t = dict(self.totals)
+            t["wins_by_candidate"] = dict(self.wins_by_candidate)
+        t["payoff_rate"] = t["paid_off"] / t["rounds"] if t["rounds"] else 0.0
+        return t
+
+speculation_metrics = SpeculationMetrics()
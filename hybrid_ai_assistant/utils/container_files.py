@@ -0,0 +1,132 @@
+import io
+import posixpath
+import tarfile
+import time
+from hybrid_ai_assistant.config.config import config
+
+WORKSPACE = "/workspace"
+
+def resolve_path(path: str, base: str = WORKSPACE) -> str:
+    """Absolute in-container path for path, which must stay inside base."""
+    full = posixpath.normpath(posixpath.join(base, path))
+    if full != base and not full.startswith(base + "/"):
+        raise ValueError(f"Path escapes {base}: {path}")
+    return full
+
+def pack_files(files: dict, base: str = WORKSPACE):
+    """Build one tar archive holding every file, to be extracted at "/".
+
+    files maps path -> str or bytes; str content is encoded as UTF-8. Returns
+    (archive bytes, per-file results) where rejected paths carry an error and
+    are left out of the archive.
+    """
+    results = {}
+    buf = io.BytesIO()
+    now = time.time()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for path, content in files.items():
+            try:
+                full = resolve_path(path, base)
+            except ValueError as e:
+                results[path] = f"Error: {e}"
+                continue
+            data = content.encode() if isinstance(content, str) else content
+            info = tarfile.TarInfo(name=full.lstrip("/"))
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = now
+            tar.addfile(info, io.BytesIO(data))
+            results[path] = None  # Filled in once the upload succeeds
+    return buf.getvalue(), results
+
+def put_files(container, files: dict, base: str = WORKSPACE) -> dict:
+    """Write many files into a container with a single archive upload.
+
+    Content is preserved byte for byte and missing parent directories are
+    created. Returns {path: "ok" or "Error: ..."}.
+    """
+    archive, results = pack_files(files, base)
+    pending = [p for p, r in results.items() if r is None]
+    if pending:
+        try:
+            ok = container.put_archive("/", archive)
+            outcome = "ok" if ok else "Error: archive upload rejected"
+        except Exception as e:
+            outcome = f"Error: {e}"
+        for path in pending:
+            results[path] = outcome
+    return results
+
+def get_file(container, path: str, base: str = WORKSPACE) -> bytes:
+    """Read one file back from a container as raw bytes."""
+    stream, _ = container.get_archive(resolve_path(path, base))
+    with tarfile.open(fileobj=io.BytesIO(b"".join(stream)), mode="r") as tar:
+        # The archive's first entry is the path itself; for a directory, its contents follow
+        member = next(iter(tar.getmembers()), None)
+        if member is None or not member.isfile():
+            raise IsADirectoryError(path)
+        return tar.extractfile(member).read()
+
+def get_files(container, paths, base: str = WORKSPACE, max_bytes=None) -> dict:
+    """Read several files; each maps to its bytes or to an "Error: ..." string.
+
+    Files that share a directory below base come back in one archive of
+    that directory, unless it is larger than max_bytes (default
+    config.CONTAINER_ARCHIVE_MAX_BYTES). Everything else, including files
+    directly in base, is fetched one file at a time, so a read never pulls
+    down the whole workspace.
+    """
+    max_bytes = config.CONTAINER_ARCHIVE_MAX_BYTES if max_bytes is None else max_bytes
+    results, by_dir = {}, {}
+    for path in paths:
+        try:
+            full = resolve_path(path, base)
+        except ValueError as e:
+            results[path] = f"Error: {e}"
+            continue
+        by_dir.setdefault(posixpath.dirname(full), {})[path] = full
+
+    for parent, wanted in by_dir.items():
+        if len(wanted) > 1 and parent != base:
+            batch = _read_directory(container, parent, wanted, max_bytes)
+            if batch is not None:
+                results.update(batch)
+                continue
+        for path in wanted:
+            try:
+                results[path] = get_file(container, path, base)
+            except Exception as e:
+                results[path] = f"Error: {e}"
+    return results
+
+def _read_directory(container, parent, wanted, max_bytes):
+    """Pick the wanted files out of one archive of parent.
+
+    Returns None when the archive can't be fetched or grows past max_bytes,
+    leaving the caller to read the files one by one.
+    """
+    buf = io.BytesIO()
+    try:
+        stream, _ = container.get_archive(parent)
+        for chunk in stream:
+            buf.write(chunk)
+            if buf.tell() > max_bytes:
+                getattr(stream, "close", lambda: None)()
+                return None
+    except Exception:
+        return None
+    buf.seek(0)
+    results = {}
+    # Members are named relative to the directory holding parent
+    prefix = posixpath.basename(parent)
+    with tarfile.open(fileobj=buf, mode="r") as tar:
+        members = {posixpath.normpath(m.name): m for m in tar.getmembers()}
+        for path, full in wanted.items():
+            member = members.get(posixpath.join(prefix, posixpath.basename(full)))
+            if member is None:
+                results[path] = f"Error: No such file in container: {full}"
+            elif not member.isfile():
+                results[path] = f"Error: Not a regular file: {full}"
+            else:
+                results[path] = tar.extractfile(member).read()
+    return results
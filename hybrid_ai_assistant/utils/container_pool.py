@@ -0,0 +1,253 @@
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from hybrid_ai_assistant.config.config import config
+
+POOL_LABEL = "hybrid_ai_assistant.pool"
+OWNER_LABEL = "hybrid_ai_assistant.pool.owner"  # "<hostname>:<pid>" of the process that started it
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _alive(owner):
+    # Only owners on this host can be checked; containers of other hosts' processes are left alone
+    host, _, pid = (owner or "").rpartition(":")
+    if not pid.isdigit():
+        return False
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, owned by another user
+    return True
+
+class PooledContainer:
+    def __init__(self, container, slot_dir):
+        self.container = container
+        self.slot_dir = slot_dir  # Host directory bound at /workspace
+        self.created_at = time.time()
+        self.run_id = None
+        self.last_used = self.created_at
+
+class ContainerPool:
+    """Keeps pre-started containers warm and leases one per run.
+
+    Each warm container has its own empty slot directory under
+    <project_dir>/.pool bound at /workspace. Leasing renames that directory to
+    <project_dir>/<run_id>. The bind mount follows the directory, so the run's
+    workspace is attached without restarting the container. Containers are
+    never reused across runs: a released container is removed and the pool
+    refills with a fresh one.
+    """
+
+    def __init__(self, client, size=None, image=None, project_dir=None, idle_timeout=None, maintain_interval=None):
+        self.client = client
+        self.size = config.CONTAINER_POOL_SIZE if size is None else size
+        self.image = image or config.DOCKER_IMAGE
+        self.project_dir = project_dir or config.PROJECT_DIR
+        self.idle_timeout = config.CONTAINER_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self.maintain_interval = maintain_interval or config.CONTAINER_POOL_INTERVAL
+        self._warm = []
+        self._leased = {}  # run_id -> PooledContainer
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.counters = {"leases": 0, "warm_hits": 0, "cold_starts": 0, "released": 0, "reaped": 0, "unhealthy": 0,
+                         "orphans": 0}
+        self.wait_seconds = 0.0
+
+    # Container lifecycle
+
+    def _create(self, workspace_dir):
+        os.makedirs(workspace_dir, exist_ok=True)
+        container = self.client.containers.run(
+            self.image,
+            detach=True,
+            tty=True,  # Keep it alive
+            volumes={workspace_dir: {'bind': '/workspace', 'mode': 'rw'}},
+            working_dir='/workspace',
+            labels={POOL_LABEL: "1", OWNER_LABEL: _owner()},
+        )
+        return container
+
+    def _new_warm(self):
+        slot_dir = os.path.join(self.project_dir, ".pool", uuid.uuid4().hex)
+        return PooledContainer(self._create(slot_dir), slot_dir)
+
+    def _destroy(self, pooled):
+        try:
+            pooled.container.remove(force=True)
+        except Exception as e:
+            print(f"Warning: Could not remove container {pooled.container.id}: {e}")
+        if pooled.run_id is None:
+            shutil.rmtree(pooled.slot_dir, ignore_errors=True)
+
+    def _healthy(self, pooled):
+        try:
+            pooled.container.reload()
+            return pooled.container.status == 'running'
+        except Exception:
+            return False
+
+    # Leasing
+
+    def lease(self, run_id):
+        """Return the id of a running container whose /workspace is the run's workspace."""
+        started = time.perf_counter()
+        with self._lock:
+            pooled = self._leased.get(run_id)
+        if pooled is not None:
+            if self._healthy(pooled) or self._restart(pooled):
+                pooled.last_used = time.time()
+                return pooled.container.id
+            self.release(run_id)
+
+        run_dir = os.path.join(self.project_dir, run_id)
+        pooled = None
+        # A run that already has files (e.g. resumed after a restart) can't adopt a slot directory
+        if not os.path.exists(run_dir):
+            while True:
+                with self._lock:
+                    candidate = self._warm.pop() if self._warm else None
+                if candidate is None:
+                    break
+                if self._healthy(candidate):
+                    os.rename(candidate.slot_dir, run_dir)
+                    pooled = candidate
+                    break
+                self.counters["unhealthy"] += 1
+                self._destroy(candidate)
+
+        warm_hit = pooled is not None
+        if pooled is None:
+            pooled = PooledContainer(self._create(run_dir), run_dir)
+
+        pooled.run_id = run_id
+        pooled.slot_dir = run_dir
+        pooled.last_used = time.time()
+        with self._lock:
+            self._leased[run_id] = pooled
+            self.counters["leases"] += 1
+            self.counters["warm_hits" if warm_hit else "cold_starts"] += 1
+            self.wait_seconds += time.perf_counter() - started
+        return pooled.container.id
+
+    def _restart(self, pooled):
+        try:
+            pooled.container.start()
+            return self._healthy(pooled)
+        except Exception:
+            return False
+
+    def touch(self, container_id):
+        with self._lock:
+            for pooled in self._leased.values():
+                if pooled.container.id == container_id:
+                    pooled.last_used = time.time()
+                    return
+
+    def release(self, run_id):
+        """End a run's lease; its container is removed, its workspace kept."""
+        with self._lock:
+            pooled = self._leased.pop(run_id, None)
+        if pooled is None:
+            return False
+        self._destroy(pooled)
+        self.counters["released"] += 1
+        return True
+
+    # Maintenance
+
+    def maintain(self):
+        """Reap idle leases, drop unhealthy warm containers and refill the pool."""
+        now = time.time()
+        with self._lock:
+            idle = [r for r, p in self._leased.items() if self.idle_timeout and now - p.last_used > self.idle_timeout]
+            warm = list(self._warm)
+        for run_id in idle:
+            if self.release(run_id):
+                self.counters["reaped"] += 1
+        for pooled in warm:
+            if not self._healthy(pooled):
+                with self._lock:
+                    if pooled in self._warm:
+                        self._warm.remove(pooled)
+                self.counters["unhealthy"] += 1
+                self._destroy(pooled)
+        while True:
+            with self._lock:
+                missing = self.size - len(self._warm)
+            if missing <= 0:
+                break
+            try:
+                pooled = self._new_warm()
+            except Exception as e:
+                print(f"Warning: Could not start warm container: {e}")
+                break
+            if self._stop.is_set():
+                self._destroy(pooled)  # Shut down while it was starting
+                break
+            with self._lock:
+                self._warm.append(pooled)
+
+    def remove_orphans(self):
+        """Remove pool containers left running by processes that have exited; returns how many."""
+        removed = 0
+        for container in self.client.containers.list(all=True, filters={"label": f"{POOL_LABEL}=1"}):
+            if _alive((container.labels or {}).get(OWNER_LABEL)):
+                continue
+            try:
+                container.remove(force=True)
+                removed += 1
+            except Exception as e:
+                print(f"Warning: Could not remove orphaned container {container.id}: {e}")
+        self.counters["orphans"] += removed
+        return removed
+
+    def start(self):
+        """Remove orphans from earlier processes, then fill the pool and keep maintaining it from a background thread."""
+        if self._thread is not None:
+            return
+        try:
+            self.remove_orphans()
+        except Exception as e:
+            print(f"Warning: Could not list orphaned pool containers: {e}")
+        self._thread = threading.Thread(target=self._loop, name="container-pool", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.maintain()
+            except Exception as e:
+                print(f"Warning: Container pool maintenance failed: {e}")
+            self._stop.wait(self.maintain_interval)
+
+    def shutdown(self):
+        """Stop maintenance and remove every warm and leased container; leased workspaces are kept."""
+        self._stop.set()
+        with self._lock:
+            warm, self._warm = self._warm, []
+            run_ids = list(self._leased)
+        for pooled in warm:
+            self._destroy(pooled)
+        for run_id in run_ids:
+            self.release(run_id)
+
+    def stats(self):
+        with self._lock:
+            leases = self.counters["leases"]
+            return {
+                "size": len(self._warm),
+                "target_size": self.size,
+                "in_use": len(self._leased),
+                "wait_seconds_total": self.wait_seconds,
+                "wait_seconds_avg": self.wait_seconds / leases if leases else 0.0,
+                **self.counters,
+            }
@@ -1,20 +1,66 @@
+import atexit
 import docker
 import os
+import threading
 from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils.container_pool import ContainerPool
+from hybrid_ai_assistant.utils import container_files
+from hybrid_ai_assistant.utils.exec_session import ExecResult, ExecSession, run_once
 
-client = docker.from_env()
+# Created on first use: docker.from_env() contacts the daemon, which may not be running
+_client = None
+_client_lock = threading.Lock()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_sessions = {}  # (container_id, thread id) -> ExecSession
+_sessions_lock = threading.Lock()
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = docker.from_env()
+    return _client
+
+def get_pool():
+    """The process-wide warm container pool, or None when pooling is disabled."""
+    global _pool
+    if _pool is None and config.CONTAINER_POOL_SIZE > 0:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ContainerPool(get_client())
+                # Otherwise every CLI run would leave CONTAINER_POOL_SIZE warm containers behind
+                atexit.register(_pool.shutdown)
+    return _pool
+
+def warm_pool():
+    # Start filling the pool in the background so the first execution step finds a warm container
+    pool = get_pool()
+    if pool is not None:
+        pool.start()
 
 def get_or_create_container(existing_id=None, run_id=None):
     # UPDATED: Check and reuse existing container if provided
     if existing_id:
         try:
-            container = client.containers.get(existing_id)
+            container = get_client().containers.get(existing_id)
             if container.status != 'running':
                 container.start()
             return container.id
         except docker.errors.NotFound:
             pass  # Create new one below
 
+    pool = get_pool()
+    if pool is not None and run_id:
+        try:
+            return pool.lease(run_id)
+        except Exception as e:
+            print(f"Error leasing container: {e}")
+            return None
+
     # Create new container
     # Ensure project dir exists
     # Use run_id to create an isolated workspace if provided, else root
@@ -30,7 +76,7 @@ def get_or_create_container(existing_id=None, run_id=None):
             print(f"Warning: Could not create project dir {workspace_host_path}: {e}")
 
     try:
-        container = client.containers.run(
+        container = get_client().containers.run(
             config.DOCKER_IMAGE, 
             detach=True, 
             tty=True, # Keep it alive
@@ -42,16 +88,88 @@ def get_or_create_container(existing_id=None, run_id=None):
         print(f"Error starting container: {e}")
         return None
 
-def exec_in_container(container_id: str, cmd: str):
+def release_container(run_id=None, container_id=None):
+    # Containers are removed when a run ends; the workspace on the host is kept
+    if container_id:
+        close_session(container_id)
+    pool = get_pool()
+    if pool is not None and run_id and pool.release(run_id):
+        return
+    if container_id:
+        try:
+            get_client().containers.get(container_id).remove(force=True)
+        except Exception as e:
+            print(f"Warning: Could not remove container {container_id}: {e}")
+
+def _running_container(container_id: str):
+    if _pool is not None:
+        _pool.touch(container_id)
+    container = get_client().containers.get(container_id)
+    # Verify container is running
+    if container.status != 'running':
+        container.start()
+    return container
+
+def write_files(container_id: str, files: dict) -> dict:
+    """Write {path: content} under /workspace in one archive upload; returns per-file results."""
     if not container_id:
-        return "Error: No container ID provided."
+        return {path: "Error: No container ID provided." for path in files}
     try:
-        container = client.containers.get(container_id)
-        # Verify container is running
-        if container.status != 'running':
-            container.start()
-            
-        result = container.exec_run(f"sh -c '{cmd}'")
-        return result.output.decode()
+        return container_files.put_files(_running_container(container_id), files)
     except Exception as e:
-        return str(e)
+        return {path: f"Error: {e}" for path in files}
+
+def read_files(container_id: str, paths) -> dict:
+    """Read files under /workspace as bytes; failures map to an error string."""
+    if not container_id:
+        return {path: "Error: No container ID provided." for path in paths}
+    try:
+        return container_files.get_files(_running_container(container_id), paths)
+    except Exception as e:
+        return {path: f"Error: {e}" for path in paths}
+
+def _session(container_id: str) -> ExecSession:
+    # One session per calling thread, so steps running in parallel don't queue behind each other
+    key = (container_id, threading.get_ident())
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = ExecSession(get_client(), container_id)
+        return session
+
+def close_session(container_id: str):
+    with _sessions_lock:
+        keys = [key for key in _sessions if key[0] == container_id]
+        sessions = [_sessions.pop(key) for key in keys]
+    for session in sessions:
+        session.close()
+
+def run_in_container(container_id: str, cmd: str, timeout=None, on_output=None) -> ExecResult:
+    """Run cmd in the container and return its exit code and output.
+
+    Uses the container's persistent shell session, so output reaches
+    on_output(stream, text) while the command runs. Falls back to a single
+    exec_run if the session can't be opened.
+    """
+    if not container_id:
+        return ExecResult(exit_code=None, stderr="Error: No container ID provided.")
+    try:
+        container = _running_container(container_id)
+        if config.EXEC_PERSISTENT:
+            try:
+                return _session(container_id).run(cmd, timeout=timeout, on_output=on_output)
+            except Exception as e:
+                print(f"Warning: Exec session failed, falling back to exec_run: {e}")
+                close_session(container_id)
+        result = run_once(container, cmd, timeout=timeout)
+        if on_output is not None:
+            for stream, text in (("stdout", result.stdout), ("stderr", result.stderr)):
+                if text:
+                    on_output(stream, text)
+        return result
+    except Exception as e:
+        return ExecResult(exit_code=None, stderr=str(e))
+
+def exec_in_container(container_id: str, cmd: str):
+    # Combined output as text; use run_in_container for the exit code
+    return run_in_container(container_id, cmd).output
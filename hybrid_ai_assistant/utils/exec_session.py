@@ -0,0 +1,197 @@
+import base64
+import codecs
+import math
+import socket
+import struct
+import threading
+import time
+import uuid
+from typing import Optional
+from pydantic import BaseModel
+from hybrid_ai_assistant.config.config import config
+
+STDOUT, STDERR = 1, 2
+
+class ExecResult(BaseModel):
+    exit_code: Optional[int]  # None if the command never reported back
+    stdout: str = ""
+    stderr: str = ""
+    timed_out: bool = False
+    truncated: bool = False
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0 and not self.timed_out
+
+    @property
+    def output(self) -> str:
+        return self.stdout + self.stderr
+
+class _StreamState:
+    """Collects one output stream of one command, watching for the end marker."""
+
+    def __init__(self, marker: bytes, max_output: int, name: str, on_output):
+        self.marker = marker
+        self.max_output = max_output
+        self.name = name
+        self.on_output = on_output
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.pending = b""
+        self.chunks = []
+        self.size = 0
+        self.truncated = False
+        self.done = False
+        self.trailer = b""  # Bytes after the marker (the exit code on stdout)
+
+    def feed(self, data: bytes):
+        if self.done:
+            self.trailer += data
+            return
+        self.pending += data
+        idx = self.pending.find(self.marker)
+        if idx >= 0:
+            self._emit(self.pending[:idx], final=True)
+            self.trailer = self.pending[idx + len(self.marker):]
+            self.pending = b""
+            self.done = True
+            return
+        # Hold back enough bytes that a marker split across reads is never emitted
+        keep = len(self.marker) - 1
+        if len(self.pending) > keep:
+            self._emit(self.pending[:-keep] if keep else self.pending)
+            self.pending = self.pending[-keep:] if keep else b""
+
+    def _emit(self, data: bytes, final=False):
+        if self.size + len(data) > self.max_output:
+            data = data[: max(0, self.max_output - self.size)]
+            self.truncated = True
+        self.size += len(data)
+        text = self.decoder.decode(data, final=final)
+        if text:
+            self.chunks.append(text)
+            if self.on_output is not None:
+                self.on_output(self.name, text)
+
+    @property
+    def text(self):
+        return "".join(self.chunks)
+
+class ExecSession:
+    """One long-lived `sh` per container, fed commands over a single attached socket.
+
+    Commands run one at a time. Each is wrapped in coreutils `timeout` inside
+    the container and followed by an end marker carrying its exit status, so
+    output streams back incrementally and the session stays reusable. If the
+    marker doesn't arrive within the timeout plus a grace period the session is
+    dropped and reopened on the next command.
+    """
+
+    GRACE = 5  # Seconds past the in-container timeout before giving up on the session
+
+    def __init__(self, client, container_id, workdir="/workspace"):
+        self.client = client
+        self.container_id = container_id
+        self.workdir = workdir
+        self._sock = None
+        self._raw = None
+        self._buf = b""
+        self._lock = threading.Lock()
+
+    def _open(self):
+        exec_id = self.client.api.exec_create(
+            self.container_id, ["sh"], stdin=True, stdout=True, stderr=True, workdir=self.workdir
+        )
+        self._sock = self.client.api.exec_start(exec_id, socket=True)
+        self._raw = getattr(self._sock, "_sock", self._sock)
+        self._buf = b""
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except Exception:
+                pass
+        self._sock = self._raw = None
+
+    def _read_frame(self, deadline):
+        # Docker multiplexes non-tty exec output: 8-byte header (stream, 0, 0, 0, size) then payload
+        while True:
+            if len(self._buf) >= 8:
+                stream, size = struct.unpack(">BxxxL", self._buf[:8])
+                if len(self._buf) >= 8 + size:
+                    payload = self._buf[8:8 + size]
+                    self._buf = self._buf[8 + size:]
+                    return stream, payload
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("exec session did not respond in time")
+            self._raw.settimeout(remaining)
+            try:
+                data = self._raw.recv(65536)
+            except socket.timeout:
+                raise TimeoutError("exec session did not respond in time")
+            if not data:
+                raise ConnectionError("exec session closed")
+            self._buf += data
+
+    def run(self, cmd: str, timeout=None, max_output=None, on_output=None) -> ExecResult:
+        """Run cmd with sh in the container. on_output(stream, text) receives output as it arrives."""
+        timeout = timeout or config.EXEC_TIMEOUT
+        max_output = max_output or config.EXEC_MAX_OUTPUT
+        marker = f"__EXEC_DONE_{uuid.uuid4().hex}__"
+        encoded = base64.b64encode(cmd.encode()).decode()
+        # The command travels base64-encoded so quotes in it can't break the wrapper
+        script = (
+            f'timeout -s KILL {math.ceil(timeout)} sh -c "$(echo {encoded} | base64 -d)" </dev/null; '
+            f'__rc=$?; printf "%s%s\\n" "{marker}" "$__rc"; printf "%s" "{marker}" >&2\n'
+        )
+
+        with self._lock:
+            if self._raw is None:
+                self._open()
+            out = _StreamState(marker.encode(), max_output, "stdout", on_output)
+            err = _StreamState(marker.encode(), max_output, "stderr", on_output)
+            started = time.monotonic()
+            deadline = started + timeout + self.GRACE
+            try:
+                self._raw.sendall(script.encode())
+                while not (out.done and err.done and b"\n" in out.trailer):
+                    stream, payload = self._read_frame(deadline)
+                    (err if stream == STDERR else out).feed(payload)
+            except (TimeoutError, ConnectionError, OSError):
+                self.close()
+                return ExecResult(
+                    exit_code=None, stdout=out.text, stderr=err.text, timed_out=True,
+                    truncated=out.truncated or err.truncated, duration=time.monotonic() - started,
+                )
+
+        duration = time.monotonic() - started
+        exit_code = int(out.trailer.split(b"\n", 1)[0] or -1)
+        return ExecResult(
+            exit_code=exit_code,
+            stdout=out.text,
+            stderr=err.text,
+            # timeout -s KILL exits with 137 once the limit is hit
+            timed_out=exit_code == 137 and duration >= timeout,
+            truncated=out.truncated or err.truncated,
+            duration=duration,
+        )
+
+def run_once(container, cmd: str, timeout=None, max_output=None) -> ExecResult:
+    """Fallback without a session: one exec_run, still with an exit code, timeout and cap."""
+    timeout = timeout or config.EXEC_TIMEOUT
+    max_output = max_output or config.EXEC_MAX_OUTPUT
+    started = time.monotonic()
+    result = container.exec_run(["timeout", "-s", "KILL", str(math.ceil(timeout)), "sh", "-c", cmd], demux=True)
+    duration = time.monotonic() - started
+    stdout, stderr = result.output if result.output else (None, None)
+    stdout, stderr = stdout or b"", stderr or b""
+    return ExecResult(
+        exit_code=result.exit_code,
+        stdout=stdout[:max_output].decode(errors="replace"),
+        stderr=stderr[:max_output].decode(errors="replace"),
+        timed_out=result.exit_code == 137 and duration >= timeout,
+        truncated=len(stdout) > max_output or len(stderr) > max_output,
+        duration=duration,
+    )
@@ -0,0 +1,274 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future
+from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils.instrumentation import record, registry, retries
+
+queue_wait = registry.histogram(
+    "assistant_gateway_wait_seconds", "Time calls waited for a rate limit token.", ("provider", "model"))
+coalesced = registry.counter(
+    "assistant_gateway_coalesced_total", "Calls that shared the result of an identical in-flight call.", ("provider",))
+
+_LIMIT = re.compile(r"^\s*([^=\s]+)\s*=\s*([0-9.]+)\s*/\s*([sm])(?:\s*@\s*([0-9.]+))?\s*$")
+
+class RateLimited(Exception):
+    """A provider answered 429 without raising, e.g. the Tavily tool's error string."""
+
+def parse_limits(spec):
+    """{name: (requests per second, burst)} from "openai=5/s@10,openai:gpt-4o=60/m"."""
+    limits = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        match = _LIMIT.match(part)
+        if not match:
+            raise ValueError(f"Bad rate limit {part.strip()!r}; expected name=rate/s or name=rate/m, optionally @burst")
+        name, rate, unit, burst = match.groups()
+        per_second = float(rate) / (60 if unit == "m" else 1)
+        limits[name] = (per_second, float(burst) if burst else max(1.0, per_second))
+    return limits
+
+class TokenBucket:
+    """Refills at rate tokens per second up to burst. Callers reserve a token and sleep off any deficit,
+    so waiters are served in arrival order and nobody spins."""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, returning how many seconds to wait until it's actually available."""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+class SingleFlight:
+    """Runs one call per key at a time; callers arriving while it's in flight wait for its outcome."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Returns (result, shared). Exceptions reach every caller."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines: one call per key and event loop at a time."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    async def do(self, key, fn):
+        loop = asyncio.get_running_loop()
+        key = (id(loop), key)  # Futures can't be awaited from another loop
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = loop.create_future()
+        if not leader:
+            # Shielded: a waiter being cancelled mustn't cancel the call the others are waiting on
+            return await asyncio.shield(call), True
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as e:
+            call.set_exception(e)
+            call.exception()  # Retrieved here, so no waiters isn't logged as an unhandled error
+            raise
+        else:
+            call.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+def _status(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+def is_retryable(exc) -> bool:
+    """429s and timeouts. Providers raise their own types (openai.RateLimitError, httpx.ReadTimeout, ...),
+    so they're recognised by status code and name rather than imported."""
+    if isinstance(exc, (RateLimited, TimeoutError)) or _status(exc) == 429:
+        return True
+    name = type(exc).__name__
+    return "RateLimit" in name or "Timeout" in name
+
+def retry_after(exc):
+    """The provider's Retry-After in seconds, if it sent one."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class Gateway:
+    """Process-wide front door for provider calls.
+
+    Every call waits for a token from its provider's bucket and its
+    provider:model bucket (when configured), is retried with jittered
+    exponential backoff on 429s and timeouts, and, given a key, is shared
+    with any identical call already in flight.
+    """
+
+    def __init__(self, limits=None, coalesce=None, max_retries=None, backoff=None, backoff_max=None,
+                 clock=time.monotonic, sleep=time.sleep, asleep=asyncio.sleep, rng=None):
+        self.limits = parse_limits(config.RATE_LIMITS) if limits is None else dict(limits)
+        self.coalesce = config.GATEWAY_COALESCE if coalesce is None else coalesce
+        self.max_retries = config.GATEWAY_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = config.GATEWAY_BACKOFF if backoff is None else backoff
+        self.backoff_max = config.GATEWAY_BACKOFF_MAX if backoff_max is None else backoff_max
+        self.clock = clock
+        self.sleep = sleep
+        self.asleep = asleep
+        self.rng = rng or random.Random()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self._aflights = AsyncSingleFlight()
+
+    def _bucket(self, name):
+        if name not in self.limits:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(name)
+            if bucket is None:
+                bucket = self._buckets[name] = TokenBucket(*self.limits[name], clock=self.clock)
+            return bucket
+
+    def _reserve(self, provider, model):
+        buckets = [b for b in (self._bucket(provider), self._bucket(f"{provider}:{model}") if model else None) if b]
+        if not buckets:
+            return None
+        # Reserve from every bucket first, then wait once for the slowest
+        return max(b.reserve() for b in buckets)
+
+    def _waited(self, provider, model, wait):
+        if wait > 0:
+            record("queue", provider, wait)
+        queue_wait.observe(wait, provider=provider, model=model or "")
+
+    def wait_turn(self, provider, model=None) -> float:
+        """Block until provider (and provider:model) allow another call; returns the seconds waited."""
+        wait = self._reserve(provider, model)
+        if wait is None:
+            return 0.0
+        if wait > 0:
+            self.sleep(wait)
+        self._waited(provider, model, wait)
+        return wait
+
+    async def await_turn(self, provider, model=None) -> float:
+        """wait_turn without blocking the event loop."""
+        wait = self._reserve(provider, model)
+        if wait is None:
+            return 0.0
+        if wait > 0:
+            await self.asleep(wait)
+        self._waited(provider, model, wait)
+        return wait
+
+    def retry_delay(self, exc, attempt):
+        """Seconds to wait before retrying after the attempt-th failure (0-based), or None to give up."""
+        if attempt >= self.max_retries or not is_retryable(exc):
+            return None
+        # Full jitter, so callers throttled together don't retry together; never sooner than Retry-After
+        delay = self.rng.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+        return max(delay, min(retry_after(exc) or 0.0, self.backoff_max))
+
+    def call(self, provider, model, fn, key=None):
+        """fn() under the provider's rate limit, with retries; calls with the same key share one result."""
+        def attempts():
+            attempt = 0
+            while True:
+                self.wait_turn(provider, model)
+                try:
+                    return fn()
+                except Exception as e:
+                    delay = self.retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+                retries.inc(kind="gateway", name=provider)
+                self.sleep(delay)
+                attempt += 1
+
+        if key is None or not self.coalesce:
+            return attempts()
+        result, shared = self._flights.do((provider, model, key), attempts)
+        if shared:
+            coalesced.inc(provider=provider)
+        return result
+
+    async def acall(self, provider, model, fn, key=None):
+        """call() for a coroutine function: await fn() under the same limits, retries and sharing."""
+        async def attempts():
+            attempt = 0
+            while True:
+                await self.await_turn(provider, model)
+                try:
+                    return await fn()
+                except Exception as e:
+                    delay = self.retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+                retries.inc(kind="gateway", name=provider)
+                await self.asleep(delay)
+                attempt += 1
+
+        if key is None or not self.coalesce:
+            return await attempts()
+        result, shared = await self._aflights.do((provider, model, key), attempts)
+        if shared:
+            coalesced.inc(provider=provider)
+        return result
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+def get_gateway() -> Gateway:
+    """The process-wide gateway, configured from config on first use."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = Gateway()
+    return _gateway
+
+def set_gateway(gateway):
+    """Swap the gateway (e.g. for tests); None rebuilds it from config on next use."""
+    global _gateway
+    _gateway = gateway
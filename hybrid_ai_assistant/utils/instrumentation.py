@@ -0,0 +1,262 @@
+import contextvars
+import functools
+import inspect
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from hybrid_ai_assistant.config.config import config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace("\"", "\\\"")
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in items]
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, totals = self._values.setdefault(key, ([0] * len(self.buckets), [0.0, 0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def value(self, **labels):
+        """(count, sum) for one label set."""
+        with self._lock:
+            _, totals = self._values.get(self._key(labels), (None, [0.0, 0]))
+            return totals[1], totals[0]
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(c), list(t))) for key, (c, t) in self._values.items())
+        lines = []
+        for key, (counts, (total, count)) in items:
+            # Buckets were counted cumulatively in observe()
+            for bound, n in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {n}")
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+class Registry:
+    """Counters and histograms, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labels, **kwargs)
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            lines += [f"# HELP {m.name} {m.help}", f"# TYPE {m.name} {m.type}"] + m.samples()
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+span_seconds = registry.histogram(
+    "assistant_span_duration_seconds", "Duration of graph nodes and of LLM, search, sandbox and checkpoint calls.",
+    ("kind", "name"))
+span_errors = registry.counter("assistant_span_errors_total", "Calls that raised or reported a failure.", ("kind", "name"))
+payload_bytes = registry.histogram(
+    "assistant_payload_bytes", "Size of prompts, responses, search results, files and checkpoints.",
+    ("kind", "name", "direction"), buckets=SIZE_BUCKETS)
+llm_tokens = registry.counter("assistant_llm_tokens_total", "LLM tokens by node, model and direction.", ("node", "model", "direction"))
+retries = registry.counter("assistant_retries_total", "Attempts after the first one.", ("kind", "name"))
+
+class RunTimings:
+    """Per-run totals by (kind, name) for the most recent runs, for end-of-run summaries."""
+
+    def __init__(self, max_runs=256):
+        self.max_runs = max_runs
+        self._runs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, trace_id, kind, name, seconds, error=False):
+        with self._lock:
+            run = self._runs.get(trace_id)
+            if run is None:
+                run = self._runs[trace_id] = {}
+                while len(self._runs) > self.max_runs:
+                    self._runs.popitem(last=False)
+            row = run.setdefault((kind, name), {"kind": kind, "name": name, "calls": 0, "seconds": 0.0, "errors": 0})
+            row["calls"] += 1
+            row["seconds"] += seconds
+            row["errors"] += bool(error)
+
+    def summary(self, trace_id):
+        with self._lock:
+            rows = [dict(r) for r in self._runs.get(trace_id, {}).values()]
+        return sorted(rows, key=lambda r: (r["kind"] != "node", r["kind"], -r["seconds"]))
+
+run_timings = RunTimings()
+
+class Span:
+    def __init__(self, kind, name, trace_id, parent_id=None):
+        self.kind = kind
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.error = False
+
+    def fail(self):
+        """Mark the call as failed when it reports an error instead of raising."""
+        self.error = True
+
+    def payload(self, direction, size):
+        observe_payload(self.kind, self.name, direction, size)
+
+    def tag(self):
+        return f"[trace:{self.trace_id} span:{self.span_id}] "
+
+def observe_payload(kind, name, direction, size):
+    payload_bytes.observe(size, kind=kind, name=name, direction=direction)
+
+_current = contextvars.ContextVar("span", default=None)
+
+def current_span():
+    return _current.get()
+
+def record(kind, name, seconds, trace_id=None, error=False):
+    """Record a call that was timed elsewhere (e.g. streams, checkpoint writes)."""
+    span_seconds.observe(seconds, kind=kind, name=name)
+    if error:
+        span_errors.inc(kind=kind, name=name)
+    if trace_id is None and _current.get() is not None:
+        trace_id = _current.get().trace_id
+    if trace_id is not None:
+        run_timings.record(trace_id, kind, name, seconds, error)
+
+@contextmanager
+def span(kind, name, trace_id=None):
+    """Time a call as a child of the current span (or a new trace) and record it.
+
+    Worker threads don't inherit the current span; submit work with
+    contextvars.copy_context().run to keep it in the caller's trace.
+    """
+    parent = _current.get()
+    trace_id = trace_id or (parent.trace_id if parent else uuid.uuid4().hex)
+    s = Span(kind, name, trace_id, parent.span_id if parent else None)
+    token = _current.set(s)
+    started = time.perf_counter()
+    try:
+        yield s
+    except Exception:
+        s.error = True
+        raise
+    finally:
+        _current.reset(token)
+        record(kind, name, time.perf_counter() - started, trace_id, s.error)
+
+def _tag_logs(s, before, result):
+    lines = result.get("logs") if isinstance(result, dict) else None
+    if config.TRACE_LOG_IDS and isinstance(lines, list):
+        # In place: nodes append to the list they were given, see state.append_new
+        for i in range(before, len(lines)):
+            lines[i] = s.tag() + lines[i]
+    return result
+
+def _log_count(state):
+    logs = state.get("logs")
+    return len(logs) if isinstance(logs, list) else 0
+
+def traced_node(name, fn):
+    """Wrap a graph node (plain or async) in a span whose trace id is the run id, tagging the log lines it adds."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(state):
+            with span("node", name, trace_id=state.get("run_id")) as s:
+                before = _log_count(state)
+                return _tag_logs(s, before, await fn(state))
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(state):
+        with span("node", name, trace_id=state.get("run_id")) as s:
+            before = _log_count(state)
+            return _tag_logs(s, before, fn(state))
+    return wrapper
+
+def count_tokens(node, model, prompt, message=None, text=None):
+    """Token counts from the response's usage metadata, else estimated from the text."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    if text is None:
+        text = getattr(message, "content", "") or ""
+    input_tokens = usage.get("input_tokens") or (len(prompt) + 3) // 4
+    output_tokens = usage.get("output_tokens") or (len(text) + 3) // 4
+    llm_tokens.inc(input_tokens, node=node, model=model, direction="input")
+    llm_tokens.inc(output_tokens, node=node, model=model, direction="output")
+
+def format_summary(trace_id) -> str:
+    """A table of one run's timings; node times include the calls made inside them."""
+    rows = run_timings.summary(trace_id)
+    if not rows:
+        return "No timings recorded."
+    lines = [f"{'kind':<11}{'name':<24}{'calls':>6}{'seconds':>10}{'errors':>8}"]
+    for r in rows:
+        lines.append(f"{r['kind']:<11}{r['name'][:23]:<24}{r['calls']:>6}{r['seconds']:>10.3f}{r['errors']:>8}")
+    return "\n".join(lines)
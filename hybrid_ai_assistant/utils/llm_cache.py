@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import time
+from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils.aio import offload
+from hybrid_ai_assistant.utils.disk_cache import DiskCache
+from hybrid_ai_assistant.utils.gateway import get_gateway
+from hybrid_ai_assistant.utils.llm_registry import provider_of
+from hybrid_ai_assistant.utils.instrumentation import count_tokens, observe_payload, record, span
+
+# Shared by all nodes; only consulted for nodes listed in config.LLM_CACHE_NODES
+llm_cache = DiskCache(
+    os.path.join(config.CACHE_DIR, "llm.db"),
+    ttl=config.LLM_CACHE_TTL,
+    max_bytes=config.LLM_CACHE_MAX_BYTES,
+)
+
+def is_enabled(node: str) -> bool:
+    return "*" in config.LLM_CACHE_NODES or node in config.LLM_CACHE_NODES
+
+def model_name(llm) -> str:
+    # ChatOpenAI exposes model_name, ChatOllama exposes model
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+def cache_key(model: str, prompt: str, schema=None, salt=None) -> str:
+    parts = {
+        "model": model,
+        "prompt": prompt,
+        "schema": json.dumps(schema.model_json_schema(), sort_keys=True) if schema else None,
+        "salt": salt,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+def _invoke(llm, prompt: str, node: str, key=None) -> str:
+    # Every uncached model call goes through here or stream_text, so this is where they're measured.
+    # Calls with the same key (the cache key) share one request while it's in flight.
+    def call():
+        with span("llm", node) as s:
+            s.payload("request", len(prompt))
+            message = llm.invoke(prompt)
+            s.payload("response", len(message.content))
+        count_tokens(node, model_name(llm), prompt, message)
+        return message.content
+
+    return get_gateway().call(provider_of(llm), model_name(llm), call, key=key)
+
+def invoke_text(llm, prompt: str, node: str, salt=None, cache=None) -> str:
+    """Invoke a chat model and return the response text, memoized if enabled for node.
+
+    salt distinguishes calls that share a prompt but must not share an answer,
+    e.g. successive retry attempts in execute_plan.
+    """
+    cache = cache or llm_cache
+    key = cache_key(model_name(llm), prompt, salt=salt)
+    if not is_enabled(node):
+        return _invoke(llm, prompt, node, key)
+
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    content = _invoke(llm, prompt, node, key)
+    cache.set(key, content)
+    return content
+
+async def _ainvoke(llm, prompt: str, node: str, key=None) -> str:
+    async def call():
+        with span("llm", node) as s:
+            s.payload("request", len(prompt))
+            message = await llm.ainvoke(prompt)
+            s.payload("response", len(message.content))
+        count_tokens(node, model_name(llm), prompt, message)
+        return message.content
+
+    return await get_gateway().acall(provider_of(llm), model_name(llm), call, key=key)
+
+async def ainvoke_text(llm, prompt: str, node: str, salt=None, cache=None) -> str:
+    """invoke_text for async nodes: awaits llm.ainvoke, so waiting on the model doesn't hold a thread.
+
+    Cache reads and writes go to SQLite on the blocking pool, off the event loop.
+    """
+    cache = cache or llm_cache
+    key = cache_key(model_name(llm), prompt, salt=salt)
+    if not is_enabled(node):
+        return await _ainvoke(llm, prompt, node, key)
+
+    hit = await offload(cache.get, key)
+    if hit is not None:
+        return hit
+    content = await _ainvoke(llm, prompt, node, key)
+    await offload(cache.set, key, content)
+    return content
+
+def stream_text(llm, prompt: str, node: str, salt=None, cache=None, keep=None):
+    """Stream response text chunks, memoized if enabled for node.
+
+    A cache hit is replayed as a single chunk. A response is cached when the
+    stream is exhausted, or when the caller stops early and keep(text) says
+    the partial text is worth keeping. Close the generator to stop the model.
+
+    Streams are rate limited and retried by the gateway, but only until the
+    first chunk arrives, and never shared between callers.
+    """
+    cache = cache or llm_cache
+    enabled = is_enabled(node)
+    key = cache_key(model_name(llm), prompt, salt=salt) if enabled else None
+    if enabled:
+        hit = cache.get(key)
+        if hit is not None:
+            yield hit
+            return
+
+    gateway, provider = get_gateway(), provider_of(llm)
+    parts = []
+    complete = failed = False
+    started = time.perf_counter()
+    try:
+        attempt = 0
+        while not complete:
+            gateway.wait_turn(provider, model_name(llm))
+            try:
+                for chunk in llm.stream(prompt):
+                    if chunk.content:
+                        parts.append(chunk.content)
+                        yield chunk.content
+                complete = True
+            except Exception as e:
+                # Once text has been yielded a retry would repeat it
+                delay = None if parts else gateway.retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                gateway.sleep(delay)
+                attempt += 1
+    except Exception:
+        failed = True
+        raise
+    finally:
+        text = "".join(parts)
+        # Timed by hand: a span can't stay current across yields. Stopping early isn't an error.
+        record("llm", node, time.perf_counter() - started, error=failed)
+        observe_payload("llm", node, "request", len(prompt))
+        observe_payload("llm", node, "response", len(text))
+        count_tokens(node, model_name(llm), prompt, text=text)
+        if enabled and (complete or (keep is not None and keep(text))):
+            cache.set(key, text)
+
+def _invoke_structured(llm, structured_llm, prompt: str, node: str, key=None):
+    def call():
+        with span("llm", node) as s:
+            s.payload("request", len(prompt))
+            result = structured_llm.invoke(prompt)
+            text = result.model_dump_json()
+            s.payload("response", len(text))
+        count_tokens(node, model_name(llm), prompt, text=text)
+        return result
+
+    return get_gateway().call(provider_of(llm), model_name(llm), call, key=key)
+
+def invoke_structured(llm, prompt: str, schema, node: str, salt=None, cache=None):
+    """Invoke llm.with_structured_output(schema), memoized if enabled for node."""
+    cache = cache or llm_cache
+    structured_llm = llm.with_structured_output(schema)
+    key = cache_key(model_name(llm), prompt, schema=schema, salt=salt)
+    if not is_enabled(node):
+        return _invoke_structured(llm, structured_llm, prompt, node, key)
+
+    hit = cache.get(key)
+    if hit is not None:
+        return schema.model_validate(hit)
+    result = _invoke_structured(llm, structured_llm, prompt, node, key)
+    cache.set(key, result.model_dump())
+    return result
+
+async def _ainvoke_structured(llm, structured_llm, prompt: str, node: str, key=None):
+    async def call():
+        with span("llm", node) as s:
+            s.payload("request", len(prompt))
+            result = await structured_llm.ainvoke(prompt)
+            text = result.model_dump_json()
+            s.payload("response", len(text))
+        count_tokens(node, model_name(llm), prompt, text=text)
+        return result
+
+    return await get_gateway().acall(provider_of(llm), model_name(llm), call, key=key)
+
+async def ainvoke_structured(llm, prompt: str, schema, node: str, salt=None, cache=None):
+    """invoke_structured for async nodes."""
+    cache = cache or llm_cache
+    structured_llm = llm.with_structured_output(schema)
+    key = cache_key(model_name(llm), prompt, schema=schema, salt=salt)
+    if not is_enabled(node):
+        return await _ainvoke_structured(llm, structured_llm, prompt, node, key)
+
+    hit = await offload(cache.get, key)
+    if hit is not None:
+        return schema.model_validate(hit)
+    result = await _ainvoke_structured(llm, structured_llm, prompt, node, key)
+    await offload(cache.set, key, result.model_dump())
+    return result
@@ -0,0 +1,73 @@
+import threading
+from hybrid_ai_assistant.config.config import config
+
+# One client per (provider, model, host), created on first use and shared process-wide
+_clients = {}
+_providers = {}  # id(client) -> provider, for rate limiting in utils.gateway
+_lock = threading.Lock()
+_factory = None
+
+def _default_factory(provider: str, model: str, host: str = None):
+    if provider == "openai":
+        import httpx
+        from langchain_openai import ChatOpenAI
+        limits = httpx.Limits(
+            max_connections=config.LLM_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=config.LLM_POOL_MAX_KEEPALIVE,
+        )
+        return ChatOpenAI(
+            model=model,
+            api_key=config.OPENAI_API_KEY,
+            base_url=host,
+            timeout=config.LLM_TIMEOUT,
+            max_retries=config.LLM_MAX_RETRIES,
+            http_client=httpx.Client(limits=limits, timeout=config.LLM_TIMEOUT),
+            http_async_client=httpx.AsyncClient(limits=limits, timeout=config.LLM_TIMEOUT),
+        )
+    if provider == "ollama":
+        from langchain_community.chat_models import ChatOllama
+        return ChatOllama(model=model, base_url=host or config.OLLAMA_HOST, timeout=int(config.LLM_TIMEOUT))
+    raise ValueError(f"Unknown LLM provider: {provider}")
+
+def get_llm(provider: str, model: str, host: str = None):
+    key = (provider, model, host)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = (_factory or _default_factory)(provider, model, host)
+                _clients[key] = client
+                _providers[id(client)] = provider
+    return client
+
+def provider_of(llm) -> str:
+    """The provider a client was created for; bound clients (see with_sampling) count as their client."""
+    llm = getattr(llm, "bound", llm)
+    return _providers.get(id(llm)) or type(llm).__name__
+
+def cloud_llm():
+    return get_llm("openai", config.CLOUD_LLM)
+
+def coder_llm():
+    return get_llm("ollama", config.LOCAL_CODER_MODEL, config.OLLAMA_HOST)
+
+def router_llm():
+    return get_llm("ollama", config.LOCAL_ROUTER_MODEL, config.OLLAMA_HOST)
+
+def with_sampling(llm, temperature=None, seed=None):
+    """The same client with per-call sampling options, e.g. for speculative candidates."""
+    options = {k: v for k, v in (("temperature", temperature), ("seed", seed)) if v is not None}
+    return llm.bind(**options) if options else llm
+
+def set_factory(factory):
+    """Swap the client factory (e.g. for a fake in tests) and drop cached clients.
+
+    factory is called as factory(provider, model, host); pass None to restore
+    the real providers.
+    """
+    global _factory
+    with _lock:
+        _factory = factory
+        _clients.clear()
+        _providers.clear()
@@ -1,27 +1,257 @@
 import ast
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
 
-def extract_signatures(tree):
-    # Helper to extract class/function signatures from AST
-    signatures = []
-    for node in ast.walk(tree):
+# Parsed signatures by content hash, shared by every index: a file is parsed once per distinct content
+_PARSE_CACHE_SIZE = 4096
+_parse_cache = OrderedDict()
+_parse_lock = threading.Lock()
+parse_stats = {"parsed": 0, "reused": 0}
+
+SKIP_DIRS = {"__pycache__", "node_modules", "venv", ".venv", ".git"}
+MAX_FILE_BYTES = 512 * 1024  # Larger files are listed but not parsed
+
+def _format_args(args: ast.arguments) -> str:
+    parts = []
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    for i, (arg, default) in enumerate(zip(positional, defaults)):
+        text = arg.arg + (f": {ast.unparse(arg.annotation)}" if arg.annotation else "")
+        if default is not None:
+            text += f"={ast.unparse(default)}"
+        parts.append(text)
+        if args.posonlyargs and i == len(args.posonlyargs) - 1:
+            parts.append("/")
+    if args.vararg:
+        parts.append("*" + args.vararg.arg)
+    elif args.kwonlyargs:
+        parts.append("*")
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        text = arg.arg + (f": {ast.unparse(arg.annotation)}" if arg.annotation else "")
+        if default is not None:
+            text += f"={ast.unparse(default)}"
+        parts.append(text)
+    if args.kwarg:
+        parts.append("**" + args.kwarg.arg)
+    return ", ".join(parts)
+
+def _signature_lines(body, depth=0):
+    lines = []
+    indent = "  " * depth
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            for decorator in node.decorator_list:
+                lines.append(f"{indent}@{ast.unparse(decorator)}")
         if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            args = [arg.arg for arg in node.args.args]
-            signatures.append(f"def {node.name}({', '.join(args)})")
+            prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+            returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+            lines.append(f"{indent}{prefix} {node.name}({_format_args(node.args)}){returns}")
         elif isinstance(node, ast.ClassDef):
-            signatures.append(f"class {node.name}")
-    return ", ".join(signatures)
+            bases = [ast.unparse(b) for b in node.bases] + [ast.unparse(k) for k in node.keywords]
+            lines.append(f"{indent}class {node.name}" + (f"({', '.join(bases)})" if bases else ""))
+            lines.extend(_signature_lines(node.body, depth + 1))
+    return lines
+
+def _imports(tree):
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.add(node.module)
+    return names
+
+def parse_source(content):
+    """(signature lines, imported module names) for Python source; lines is None on a syntax error."""
+    data = content.encode() if isinstance(content, str) else content
+    digest = hashlib.sha256(data).hexdigest()
+    with _parse_lock:
+        hit = _parse_cache.get(digest)
+        if hit is not None:
+            _parse_cache.move_to_end(digest)
+            parse_stats["reused"] += 1
+            return hit
+    try:
+        tree = ast.parse(data)
+        parsed = (_signature_lines(tree.body), _imports(tree))
+    except (SyntaxError, ValueError):
+        parsed = (None, set())
+    with _parse_lock:
+        parse_stats["parsed"] += 1
+        _parse_cache[digest] = parsed
+        while len(_parse_cache) > _PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    return parsed
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for code; close enough for budgeting
+    return (len(text) + 3) // 4
+
+class FileEntry:
+    def __init__(self, path, sha, size, signatures, imports, version):
+        self.path = path
+        self.sha = sha
+        self.size = size
+        self.signatures = signatures  # None: not Python, too large, or unparseable
+        self.imports = imports
+        self.version = version  # Index version at which this file last changed
+
+class RepoMapIndex:
+    """Signatures for a workspace, refreshed incrementally.
+
+    refresh() walks the directory but only re-reads files whose mtime or
+    size moved, and only re-parses files whose content hash is new.
+    render() ranks files and emits as many as fit a token budget.
+    """
+
+    def __init__(self, root=None):
+        self.root = root
+        self.files = {}  # path -> FileEntry
+        self._stat = {}  # path -> (mtime_ns, size) at last read
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def _set(self, path, data, size):
+        sha = hashlib.sha256(data).hexdigest()
+        current = self.files.get(path)
+        if current is not None and current.sha == sha:
+            return False
+        signatures, imports = None, set()
+        if path.endswith(".py") and size <= MAX_FILE_BYTES:
+            signatures, imports = parse_source(data)
+            if signatures is None:
+                signatures = ["(parse error)"]
+        self.files[path] = FileEntry(path, sha, size, signatures, imports, self.version)
+        return True
+
+    def update(self, files: dict) -> int:
+        """Index {path: content} exactly (paths not given are dropped); returns the number changed."""
+        with self._lock:
+            self.version += 1
+            changed = 0
+            for path, content in files.items():
+                data = content.encode() if isinstance(content, str) else content
+                changed += self._set(path, data, len(data))
+            for path in set(self.files) - set(files):
+                del self.files[path]
+                changed += 1
+            return changed
+
+    def refresh(self) -> int:
+        """Re-scan root; returns the number of files added, changed or removed."""
+        if not self.root or not os.path.isdir(self.root):
+            return 0
+        with self._lock:
+            self.version += 1
+            changed = 0
+            seen = set()
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith("."))
+                for name in filenames:
+                    if name.startswith(".") or name.endswith(".pyc"):
+                        continue
+                    full = os.path.join(dirpath, name)
+                    path = os.path.relpath(full, self.root).replace(os.sep, "/")
+                    seen.add(path)
+                    try:
+                        st = os.stat(full)
+                    except OSError:
+                        continue
+                    key = (st.st_mtime_ns, st.st_size)
+                    if self._stat.get(path) == key and path in self.files:
+                        continue
+                    try:
+                        with open(full, "rb") as f:
+                            data = f.read(MAX_FILE_BYTES + 1) if st.st_size > MAX_FILE_BYTES else f.read()
+                    except OSError:
+                        continue
+                    self._stat[path] = key
+                    changed += self._set(path, data, st.st_size)
+            for path in set(self.files) - seen:
+                del self.files[path]
+                self._stat.pop(path, None)
+                changed += 1
+            return changed
+
+    def manifest(self) -> dict:
+        """{path: {"sha": ..., "size": ...}} for file_system_state."""
+        with self._lock:
+            return {p: {"sha": e.sha[:16], "size": e.size} for p, e in sorted(self.files.items())}
+
+    def _rank(self, focus):
+        # Files imported by other files, recently changed files and files named in focus come first
+        modules = {}
+        for path in self.files:
+            if path.endswith(".py"):
+                module = path[:-3].replace("/", ".")
+                modules[module.removesuffix(".__init__")] = path
+        imported = dict.fromkeys(self.files, 0)
+        for entry in self.files.values():
+            for name in entry.imports:
+                target = modules.get(name) or modules.get(name.rsplit(".", 1)[-1])
+                if target and target != entry.path:
+                    imported[target] += 1
+        words = set(re.findall(r"[\w./-]+", focus.lower())) if focus else set()
+
+        def score(entry):
+            base = os.path.basename(entry.path).lower()
+            mentioned = entry.path.lower() in words or base in words or base.rsplit(".", 1)[0] in words
+            return (
+                5 * mentioned
+                + 2 * imported[entry.path]
+                + (2 if entry.version == self.version else 0)
+                + (1 if entry.signatures else 0)
+            )
+        return sorted(self.files.values(), key=lambda e: (-score(e), e.path))
+
+    def render(self, budget_tokens=None, focus=None) -> str:
+        """The map as text, best-ranked files first, within budget_tokens (None: no limit)."""
+        with self._lock:
+            ranked = self._rank(focus)
+        lines, used, omitted = [], 0, 0
+        for entry in ranked:
+            block = f"{entry.path}:" if entry.signatures else entry.path
+            if entry.signatures:
+                block += "\n" + "\n".join("  " + s for s in entry.signatures)
+            cost = estimate_tokens(block) + 1
+            if budget_tokens is not None and used + cost > budget_tokens:
+                # Fall back to just the path so the model still knows the file exists
+                cost = estimate_tokens(entry.path) + 1
+                if used + cost > budget_tokens:
+                    omitted += 1
+                    continue
+                block = entry.path
+            lines.append(block)
+            used += cost
+        if omitted:
+            lines.append(f"... ({omitted} more files)")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+_indexes = OrderedDict()  # root -> RepoMapIndex
+_indexes_lock = threading.Lock()
+MAX_INDEXES = 64
+
+def index_for(root: str) -> RepoMapIndex:
+    """The shared index for a workspace directory, kept across steps and attempts."""
+    root = os.path.realpath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = RepoMapIndex(root)
+            while len(_indexes) > MAX_INDEXES:
+                _indexes.popitem(last=False)
+        _indexes.move_to_end(root)
+        return index
+
+def extract_signatures(tree):
+    # Helper to extract class/function signatures from AST
+    return ", ".join(s.strip() for s in _signature_lines(tree.body))
 
-def generate_repo_map(file_tree: dict):
-    # Traverse files, extract signatures
+def generate_repo_map(file_tree: dict, budget_tokens=None, focus=None):
     # file_tree is expected to be {path: content}
-    map_str = ""
-    for file, content in file_tree.items():
-        if file.endswith('.py'):
-            try:
-                tree = ast.parse(content)
-                map_str += f"{file}: {extract_signatures(tree)}\n"
-            except:
-                map_str += f"{file}: (parse error)\n"
-        else:
-            map_str += f"{file}\n"
-    return map_str
+    index = RepoMapIndex()
+    index.update(file_tree)
+    return index.render(budget_tokens, focus)
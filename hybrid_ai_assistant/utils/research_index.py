@@ -0,0 +1,152 @@
+import hashlib
+import json
+import re
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.state import blobs
+from hybrid_ai_assistant.utils.repo_map import estimate_tokens
+
+_WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the this to was what when "
+    "which with you your".split()
+)
+
+# MinHash: NUM_PERM universal hash functions (a*x + b) mod p; with p < 2**31 the products fit in uint64
+NUM_PERM = 64
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)  # Fixed seed: signatures must agree between processes
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+def tokenize(text: str):
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+def chunk_results(results, max_words=None):
+    """Split search results into chunks of about max_words words.
+
+    results is what search_many returns; failed queries are skipped. Each
+    chunk is {"text", "url", "query"}.
+    """
+    max_words = max_words or config.RESEARCH_CHUNK_WORDS
+    chunks = []
+    for entry in results or []:
+        hits = entry.get("results")
+        if not isinstance(hits, list):
+            continue  # A failed query, or an error string stored by an older version
+        for hit in hits:
+            if isinstance(hit, dict):
+                text, url = str(hit.get("content") or ""), hit.get("url", "")
+            else:
+                text, url = str(hit), ""
+            words = text.split()
+            for start in range(0, len(words), max_words):
+                chunks.append({"text": " ".join(words[start:start + max_words]), "url": url, "query": entry.get("query", "")})
+    return chunks
+
+def minhash(text: str, shingle=3) -> np.ndarray:
+    """MinHash signature of the text's word shingles; equal fractions of two signatures estimate Jaccard similarity."""
+    words = _WORD.findall(text.lower())
+    grams = {" ".join(words[i:i + shingle]) for i in range(max(1, len(words) - shingle + 1))}
+    hashes = np.fromiter((zlib.crc32(g.encode()) % _PRIME for g in grams), dtype=np.uint64, count=len(grams))
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0)
+
+def dedupe(chunks, threshold=None):
+    """Drop chunks whose estimated Jaccard similarity to an earlier kept chunk is at least threshold."""
+    threshold = config.RESEARCH_DEDUP_THRESHOLD if threshold is None else threshold
+    kept, signatures = [], np.empty((0, NUM_PERM), dtype=np.uint64)
+    for chunk in chunks:
+        sig = minhash(chunk["text"])
+        if len(signatures) and (signatures == sig).mean(axis=1).max() >= threshold:
+            continue
+        kept.append(chunk)
+        signatures = np.vstack([signatures, sig])
+    return kept
+
+class BM25:
+    """Okapi BM25 over a dense term-frequency matrix (documents x vocabulary)."""
+
+    def __init__(self, docs, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.vocab = {}
+        rows = [tokenize(d) for d in docs]
+        for tokens in rows:
+            for t in tokens:
+                self.vocab.setdefault(t, len(self.vocab))
+        self.tf = np.zeros((len(rows), len(self.vocab)), dtype=np.float32)
+        for i, tokens in enumerate(rows):
+            np.add.at(self.tf[i], [self.vocab[t] for t in tokens], 1)
+        lengths = self.tf.sum(axis=1)
+        avg = lengths.mean() if len(rows) else 0.0
+        # Per-document part of the denominator, k1 * (1 - b + b * dl / avgdl)
+        self.norm = k1 * (1 - b + b * lengths / avg) if avg else np.full(len(rows), k1, dtype=np.float32)
+        df = (self.tf > 0).sum(axis=0)
+        n = len(rows)
+        self.idf = np.log(1 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    def scores(self, query: str) -> np.ndarray:
+        terms = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if not terms:
+            return np.zeros(self.tf.shape[0], dtype=np.float32)
+        tf = self.tf[:, terms]
+        return (tf * (self.k1 + 1) / (tf + self.norm[:, None])) @ self.idf[terms]
+
+class ResearchIndex:
+    """Deduplicated, BM25-ranked chunks of a run's search results.
+
+    Built once per set of results (see index_for) and shared by reflection,
+    option generation and step generation, each taking the top chunks that
+    fit its token budget.
+    """
+
+    def __init__(self, results, max_words=None, threshold=None):
+        chunks = chunk_results(results, max_words)
+        self.chunks = dedupe(chunks, threshold)
+        self.stats = {"chunks": len(chunks), "kept": len(self.chunks), "duplicates": len(chunks) - len(self.chunks)}
+        self.bm25 = BM25([c["text"] for c in self.chunks])
+
+    def top(self, query: str, budget_tokens=None, k=None):
+        """Best-matching chunks for query, best first, within budget_tokens (and at most k)."""
+        budget = config.RESEARCH_CONTEXT_TOKENS if budget_tokens is None else budget_tokens
+        if not self.chunks:
+            return []
+        scores = self.bm25.scores(query)
+        # Stable, so ties keep search order (Tavily already ranks within a query)
+        order = np.argsort(-scores, kind="stable")
+        picked, used = [], 0
+        for i in order[:k] if k else order:
+            cost = estimate_tokens(self.chunks[i]["text"]) + 8  # Plus the source line
+            if used + cost > budget:
+                continue
+            picked.append(self.chunks[i])
+            used += cost
+        return picked
+
+    def render(self, query: str, budget_tokens=None, k=None) -> str:
+        return "\n".join(f"[{n}] {c['text']} ({c['url']})" if c["url"] else f"[{n}] {c['text']}"
+                         for n, c in enumerate(self.top(query, budget_tokens, k), 1))
+
+_indexes = OrderedDict()  # research_memory digest -> ResearchIndex
+_indexes_lock = threading.Lock()
+MAX_INDEXES = 32
+
+def index_for(research_memory) -> ResearchIndex:
+    """The index for a run's research_memory (a blob ref or the raw results), built on first use."""
+    if blobs.is_ref(research_memory):
+        key = research_memory[blobs.REF_KEY]
+    else:
+        key = hashlib.sha256(json.dumps(research_memory, sort_keys=True, default=str).encode()).hexdigest()
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    index = ResearchIndex(blobs.load(research_memory) or [])
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
@@ -1,10 +1,207 @@
-from langchain_community.chat_models import ChatOllama
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+import numpy as np
 from hybrid_ai_assistant.state.state import ProjectState
 from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils.disk_cache import DiskCache
+from hybrid_ai_assistant.utils.llm_registry import router_llm
+from hybrid_ai_assistant.utils.llm_cache import invoke_text
 
-def route_task(state: ProjectState) -> str:
-    llm = ChatOllama(model=config.LOCAL_ROUTER_MODEL, base_url=config.OLLAMA_HOST)
-    response = llm.invoke(f"Classify task: {state['objective']}. Research/Plan or Execute?")
-    if "research" in response.content.lower():
+N_FEATURES = 1 << 16  # Hashed word unigrams and bigrams
+
+# Seed weights for the keyword scorer; positive leans "cloud" (research/plan), negative "local" (execute)
+KEYWORDS = {
+    "research": 2.0, "compare": 2.0, "comparison": 2.0, "design": 1.5, "architecture": 2.0,
+    "plan": 1.5, "evaluate": 1.5, "investigate": 2.0, "explore": 1.5, "recommend": 1.5,
+    "strategy": 1.5, "tradeoffs": 2.0, "trade offs": 2.0, "options": 1.0, "which": 1.0,
+    "best": 1.0, "should i": 1.5, "pros": 1.5, "cons": 1.0, "scalable": 1.0, "platform": 1.0,
+    "system": 0.5, "analyze": 1.0, "survey": 2.0, "choose": 1.5, "alternatives": 2.0,
+    "fix": -2.0, "bug": -2.0, "script": -1.5, "function": -1.5, "rename": -2.0, "refactor": -1.5,
+    "implement": -1.0, "write a": -1.0, "unit tests": -1.5, "convert": -1.5, "print": -1.5,
+    "parse": -1.0, "format": -1.0, "hello world": -2.5, "calculator": -1.5, "simple": -1.0,
+    "add a": -1.0, "file": -0.5, "regex": -1.5, "cli": -1.0, "one liner": -2.0,
+}
+
+def _grams(text):
+    words = re.findall(r"[a-z0-9+#]+", text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def _index(gram):
+    # crc32 rather than hash(): it must be stable across processes for saved models
+    return zlib.crc32(gram.encode()) % N_FEATURES
+
+def features(text) -> np.ndarray:
+    """Indices of the hashed n-grams present in text (binary features)."""
+    return np.unique(np.fromiter((_index(g) for g in _grams(text)), dtype=np.int64))
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+class RouterModel:
+    """Logistic regression over hashed n-grams; predict() gives P(cloud)."""
+
+    def __init__(self, weights=None, bias=0.0):
+        self.weights = np.zeros(N_FEATURES, dtype=np.float32) if weights is None else weights.astype(np.float32)
+        self.bias = float(bias)
+
+    @classmethod
+    def from_keywords(cls, keywords=None):
+        model = cls()
+        for phrase, weight in (keywords or KEYWORDS).items():
+            model.weights[_index(phrase)] += weight
+        return model
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["weights"], float(data["bias"]))
+
+    def save(self, path):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        # Mostly zeros, so this compresses to a few KB
+        with open(path, "wb") as f:
+            np.savez_compressed(f, weights=self.weights, bias=np.float32(self.bias))
+
+    def predict(self, text) -> float:
+        return float(_sigmoid(self.weights[features(text)].sum() + self.bias))
+
+    def fit(self, texts, labels, epochs=30, lr=0.5, l2=1e-4):
+        """Full-batch gradient descent on (text, label) pairs, label 1 for cloud, 0 for local."""
+        rows = [features(t) for t in texts]
+        y = np.asarray(labels, dtype=np.float32)
+        for _ in range(epochs):
+            z = np.array([self.weights[r].sum() for r in rows]) + self.bias
+            error = _sigmoid(z) - y
+            grad = np.zeros_like(self.weights)
+            for r, e in zip(rows, error):
+                grad[r] += e
+            self.weights -= lr * (grad / len(rows) + l2 * self.weights)
+            self.bias -= lr * float(error.mean())
+        return self
+
+class Router:
+    """Routes objectives to "cloud" (research/plan) or "local" (execute) without a model call when it can.
+
+    The linear model answers when it is at least config.ROUTER_CONFIDENCE
+    sure; otherwise the local router LLM decides. Decisions are memoized
+    per objective and appended to a JSONL log for offline retraining.
+    With use_llm=False, or when the LLM call fails, the model's own decision
+    stands and isn't memoized, so a later call can still ask the LLM.
+    """
+
+    def __init__(self, model=None, cache=None, log_path=None, threshold=None, llm_route=None):
+        self.model = model
+        self.cache = cache
+        self.log_path = log_path
+        self.threshold = threshold
+        self.llm_route = llm_route or llm_route_objective
+        self._lock = threading.Lock()
+        self.stats = {"model": 0, "llm": 0, "cached": 0}
+
+    def _model(self):
+        if self.model is None:
+            path = config.ROUTER_MODEL_PATH
+            self.model = RouterModel.load(path) if os.path.exists(path) else RouterModel.from_keywords()
+        return self.model
+
+    def _cache(self):
+        if self.cache is None:
+            self.cache = DiskCache(os.path.join(config.CACHE_DIR, "routing.db"), ttl=config.ROUTER_CACHE_TTL)
+        return self.cache
+
+    def route(self, objective: str, use_llm=True) -> str:
+        key = " ".join(objective.lower().split())
+        hit = self._cache().get(key)
+        if hit is not None:
+            self.stats["cached"] += 1
+            return hit
+
+        started = time.perf_counter()
+        p_cloud = self._model().predict(objective)
+        confidence = max(p_cloud, 1 - p_cloud)
+        threshold = config.ROUTER_CONFIDENCE if self.threshold is None else self.threshold
+        route, source = ("cloud" if p_cloud >= 0.5 else "local"), "model"
+        settled = confidence >= threshold
+        if not settled and use_llm:
+            try:
+                route, source, settled = self.llm_route(objective), "llm", True
+            except Exception as e:
+                print(f"Warning: Router LLM failed, using the model's guess: {e}")
+        self.stats[source] += 1
+        if settled:
+            self._cache().set(key, route)
+        self.log({
+            "ts": time.time(), "objective": objective, "route": route, "source": source,
+            "p_cloud": round(p_cloud, 4), "seconds": round(time.perf_counter() - started, 4),
+        })
+        return route
+
+    def log(self, record):
+        path = self.log_path or config.ROUTER_LOG_PATH
+        if not path:
+            return
+        try:
+            with self._lock:
+                parent = os.path.dirname(path)
+                if parent:
+                    os.makedirs(parent, exist_ok=True)
+                with open(path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Warning: Could not log routing decision: {e}")
+
+def llm_route_objective(objective: str) -> str:
+    llm = router_llm()
+    response = invoke_text(llm, f"Classify task: {objective}. Research/Plan or Execute?", node="routing")
+    if "research" in response.lower():
         return "cloud"
     return "local"
+
+router = Router()
+
+def route_task(state: ProjectState) -> str:
+    # The route only changes the graph's path when local runs may skip research;
+    # otherwise it isn't worth an LLM call
+    return router.route(state["objective"], use_llm=config.ROUTE_LOCAL_SKIP_RESEARCH)
+
+def train_from_log(log_path, model_path, sources=("llm",)):
+    """Retrain from logged decisions (those from the given sources, or with a "label" field set by hand)."""
+    texts, labels = [], []
+    with open(log_path) as f:
+        for line in f:
+            record = json.loads(line)
+            route = record.get("label") or (record["route"] if record.get("source") in sources else None)
+            if route in ("cloud", "local"):
+                texts.append(record["objective"])
+                labels.append(1 if route == "cloud" else 0)
+    if not texts:
+        return 0
+    model = RouterModel.from_keywords().fit(texts, labels)
+    model.save(model_path)
+    return len(texts)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["train"]:
+        log_path = argv[1] if len(argv) > 1 else config.ROUTER_LOG_PATH
+        model_path = argv[2] if len(argv) > 2 else config.ROUTER_MODEL_PATH
+        count = train_from_log(log_path, model_path)
+        print(f"Trained on {count} decisions -> {model_path}")
+        return 0 if count else 1
+    if argv[:1] == ["route"] and len(argv) > 1:
+        model = router._model()
+        p_cloud = model.predict(argv[1])
+        print(f"p(cloud)={p_cloud:.3f}")
+        return 0
+    print("Usage: python -m hybrid_ai_assistant.utils.routing [train [log] [model] | route <objective>]")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from hybrid_ai_assistant.config.config import config
+from hybrid_ai_assistant.utils.container_files import WORKSPACE, resolve_path
+from hybrid_ai_assistant.utils.exec_session import ExecResult
+from hybrid_ai_assistant.utils.instrumentation import span
+
+class Sandbox:
+    """Where execute_plan writes and runs generated code.
+
+    A sandbox id is opaque to callers; it is what gets stored in
+    state["container_id"]. Backends: "docker" (a container per run) and
+    "local" (subprocesses in a per-run directory).
+    """
+
+    name = None
+
+    def warm(self):
+        pass
+
+    def acquire(self, run_id=None, existing_id=None):
+        raise NotImplementedError
+
+    def release(self, run_id=None, sandbox_id=None):
+        raise NotImplementedError
+
+    def write_files(self, sandbox_id, files: dict) -> dict:
+        raise NotImplementedError
+
+    def read_files(self, sandbox_id, paths) -> dict:
+        raise NotImplementedError
+
+    def run(self, sandbox_id, cmd: str, timeout=None, on_output=None) -> ExecResult:
+        raise NotImplementedError
+
+    def workspace(self, sandbox_id, run_id=None):
+        """Host directory holding the sandbox's /workspace, or None if it isn't on this host."""
+        return None
+
+class DockerSandbox(Sandbox):
+    name = "docker"
+
+    # docker_utils connects to the daemon on import, so it's only loaded when this backend is used
+    def _docker(self):
+        from hybrid_ai_assistant.utils import docker_utils
+        return docker_utils
+
+    def warm(self):
+        try:
+            self._docker().warm_pool()
+        except Exception as e:
+            # No daemon yet shouldn't stop the CLI or API from starting; acquire() reports it per run
+            print(f"Warning: Could not warm the container pool: {e}")
+
+    def acquire(self, run_id=None, existing_id=None):
+        return self._docker().get_or_create_container(existing_id=existing_id, run_id=run_id)
+
+    def release(self, run_id=None, sandbox_id=None):
+        self._docker().release_container(run_id=run_id, container_id=sandbox_id)
+
+    def write_files(self, sandbox_id, files):
+        return self._docker().write_files(sandbox_id, files)
+
+    def read_files(self, sandbox_id, paths):
+        return self._docker().read_files(sandbox_id, paths)
+
+    def run(self, sandbox_id, cmd, timeout=None, on_output=None):
+        return self._docker().run_in_container(sandbox_id, cmd, timeout=timeout, on_output=on_output)
+
+    def workspace(self, sandbox_id, run_id=None):
+        # Run containers bind-mount PROJECT_DIR/<run_id> at /workspace
+        return os.path.join(config.PROJECT_DIR, run_id) if run_id else None
+
+class _Collector:
+    def __init__(self, name, max_output, on_output):
+        self.name = name
+        self.max_output = max_output
+        self.on_output = on_output
+        self.chunks = []
+        self.size = 0
+        self.truncated = False
+
+    def drain(self, pipe):
+        for data in iter(lambda: os.read(pipe.fileno(), 65536), b""):
+            if self.size >= self.max_output:
+                self.truncated = True
+                continue  # Keep reading so the process never blocks on a full pipe
+            if self.size + len(data) > self.max_output:
+                data = data[: self.max_output - self.size]
+                self.truncated = True
+            self.size += len(data)
+            self.chunks.append(data)
+            if self.on_output is not None:
+                self.on_output(self.name, data.decode(errors="replace"))
+        pipe.close()
+
+    @property
+    def text(self):
+        return b"".join(self.chunks).decode(errors="replace")
+
+class LocalSandbox(Sandbox):
+    """Runs commands as host subprocesses in <project_dir>/<run_id>.
+
+    Each command gets its own process group, a scrubbed environment and
+    rlimits on CPU time, address space and file size. This
+    is much lighter than a container but is not a security boundary: use
+    it for trusted workloads and for running without Docker.
+    """
+
+    name = "local"
+
+    def __init__(self, project_dir=None, cpu_seconds=None, memory_mb=None, file_size_mb=None):
+        self.project_dir = project_dir or config.PROJECT_DIR
+        self.cpu_seconds = config.SANDBOX_CPU_SECONDS if cpu_seconds is None else cpu_seconds
+        self.memory_mb = config.SANDBOX_MEMORY_MB if memory_mb is None else memory_mb
+        self.file_size_mb = config.SANDBOX_FILE_SIZE_MB if file_size_mb is None else file_size_mb
+
+    def workspace(self, sandbox_id, run_id=None):
+        path = os.path.realpath(os.path.join(self.project_dir, sandbox_id))
+        if os.path.dirname(path) != os.path.realpath(self.project_dir):
+            raise ValueError(f"Invalid sandbox id: {sandbox_id}")
+        return path
+
+    def acquire(self, run_id=None, existing_id=None):
+        sandbox_id = existing_id or run_id or uuid.uuid4().hex
+        os.makedirs(self.workspace(sandbox_id), exist_ok=True)
+        return sandbox_id
+
+    def release(self, run_id=None, sandbox_id=None):
+        pass  # Nothing keeps running between commands; the workspace is kept like Docker's
+
+    def _host_path(self, sandbox_id, path):
+        # Paths are resolved as if the workspace were mounted at /workspace
+        relative = os.path.relpath(resolve_path(path), WORKSPACE)
+        return os.path.join(self.workspace(sandbox_id), relative)
+
+    def write_files(self, sandbox_id, files):
+        results = {}
+        for path, content in files.items():
+            try:
+                host_path = self._host_path(sandbox_id, path)
+                os.makedirs(os.path.dirname(host_path), exist_ok=True)
+                data = content.encode() if isinstance(content, str) else content
+                with open(host_path, "wb") as f:
+                    f.write(data)
+                results[path] = "ok"
+            except Exception as e:
+                results[path] = f"Error: {e}"
+        return results
+
+    def read_files(self, sandbox_id, paths):
+        results = {}
+        for path in paths:
+            try:
+                with open(self._host_path(sandbox_id, path), "rb") as f:
+                    results[path] = f.read()
+            except Exception as e:
+                results[path] = f"Error: {e}"
+        return results
+
+    def _env(self, cwd):
+        # Only what a script needs; nothing from the host environment (API keys etc.) leaks in
+        python_bin = os.path.dirname(sys.executable)
+        return {
+            "PATH": f"{python_bin}:/usr/local/bin:/usr/bin:/bin",
+            "HOME": cwd,
+            "TMPDIR": cwd,
+            "LANG": "C.UTF-8",
+            "PYTHONUNBUFFERED": "1",
+            "PYTHONDONTWRITEBYTECODE": "1",
+        }
+
+    def _limited(self, cmd):
+        # The shell sets the rlimits itself: preexec_fn can deadlock the child between fork and exec
+        # when other threads are running, and steps and candidates call run() from several at once.
+        # There's no process-count limit, since RLIMIT_NPROC counts every process the user owns.
+        limits = [
+            ("-t", self.cpu_seconds),            # Seconds
+            ("-v", self.memory_mb * 1024),       # KiB
+            ("-f", self.file_size_mb * 2048),    # 512-byte blocks in a POSIX sh
+        ]
+        prefix = "".join(f"ulimit {flag} {value} || exit 126\n" for flag, value in limits if value)
+        return prefix + cmd
+
+    def run(self, sandbox_id, cmd, timeout=None, on_output=None):
+        timeout = timeout or config.EXEC_TIMEOUT
+        max_output = config.EXEC_MAX_OUTPUT
+        if not sandbox_id:
+            return ExecResult(exit_code=None, stderr="Error: No sandbox ID provided.")
+        started = time.monotonic()
+        try:
+            cwd = self.workspace(sandbox_id)
+            proc = subprocess.Popen(
+                ["sh", "-c", self._limited(cmd)], cwd=cwd, env=self._env(cwd),
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                start_new_session=True,
+            )
+        except Exception as e:
+            return ExecResult(exit_code=None, stderr=str(e))
+
+        out = _Collector("stdout", max_output, on_output)
+        err = _Collector("stderr", max_output, on_output)
+        readers = [threading.Thread(target=c.drain, args=(p,), daemon=True) for c, p in ((out, proc.stdout), (err, proc.stderr))]
+        for reader in readers:
+            reader.start()
+        timed_out = False
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+        # Kill the whole group so children the command left behind don't hold the pipes open
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        proc.wait()
+        for reader in readers:
+            reader.join()
+        return ExecResult(
+            exit_code=None if timed_out else proc.returncode,
+            stdout=out.text,
+            stderr=err.text,
+            timed_out=timed_out,
+            truncated=out.truncated or err.truncated,
+            duration=time.monotonic() - started,
+        )
+
+BACKENDS = {"docker": DockerSandbox, "local": LocalSandbox}
+
+class MeasuredSandbox(Sandbox):
+    """Wraps a backend so each call is recorded as a "sandbox" span; see utils.instrumentation."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+
+    def __getattr__(self, attr):
+        # Anything backend-specific (pool stats, counters on fakes) passes through
+        return getattr(self.backend, attr)
+
+    def warm(self):
+        with span("sandbox", "warm"):
+            return self.backend.warm()
+
+    def acquire(self, run_id=None, existing_id=None):
+        with span("sandbox", "acquire"):
+            return self.backend.acquire(run_id=run_id, existing_id=existing_id)
+
+    def release(self, run_id=None, sandbox_id=None):
+        with span("sandbox", "release"):
+            return self.backend.release(run_id=run_id, sandbox_id=sandbox_id)
+
+    def write_files(self, sandbox_id, files):
+        with span("sandbox", "write_files") as s:
+            s.payload("request", sum(len(c) for c in files.values()))
+            written = self.backend.write_files(sandbox_id, files)
+            if any(r != "ok" for r in written.values()):
+                s.fail()
+        return written
+
+    def read_files(self, sandbox_id, paths):
+        with span("sandbox", "read_files") as s:
+            contents = self.backend.read_files(sandbox_id, paths)
+            # Files read back are bytes; failures are "Error: ..." strings and carry no payload
+            s.payload("response", sum(len(c) for c in contents.values() if isinstance(c, (bytes, bytearray))))
+        return contents
+
+    def run(self, sandbox_id, cmd, timeout=None, on_output=None):
+        # A non-zero exit is the generated code failing, not the sandbox; a timeout counts as an error
+        with span("sandbox", "run") as s:
+            result = self.backend.run(sandbox_id, cmd, timeout=timeout, on_output=on_output)
+            s.payload("response", len(result.stdout) + len(result.stderr))
+            if result.timed_out:
+                s.fail()
+        return result
+
+    def workspace(self, sandbox_id, run_id=None):
+        return self.backend.workspace(sandbox_id, run_id=run_id)
+
+_sandbox = None
+_sandbox_lock = threading.Lock()
+
+def get_sandbox() -> Sandbox:
+    """The process-wide sandbox for config.SANDBOX_BACKEND."""
+    global _sandbox
+    if _sandbox is None:
+        with _sandbox_lock:
+            if _sandbox is None:
+                if config.SANDBOX_BACKEND not in BACKENDS:
+                    raise ValueError(f"Unknown SANDBOX_BACKEND: {config.SANDBOX_BACKEND}")
+                _sandbox = MeasuredSandbox(BACKENDS[config.SANDBOX_BACKEND]())
+    return _sandbox
+
+def set_sandbox(sandbox):
+    """Swap the sandbox (e.g. for tests); None goes back to the configured backend."""
+    global _sandbox
+    if sandbox is not None and not isinstance(sandbox, MeasuredSandbox):
+        sandbox = MeasuredSandbox(sandbox)
+    _sandbox = sandbox
@@ -0,0 +1,65 @@
+import contextvars
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# "Write tests [after: 1, 3]" -> depends on the 1st and 3rd tasks; "[after: none]" -> independent
+_AFTER = re.compile(r"\[\s*after\s*:\s*([^\]]*)\]\s*$", re.IGNORECASE)
+_NUMBERING = re.compile(r"^\s*(?:[-*]|\d+[.)])\s+")
+
+def sequential(n: int):
+    """Dependencies for a plain ordered list: each step waits for the one before it."""
+    return [[i - 1] if i else [] for i in range(n)]
+
+def parse_steps(text: str):
+    """Parse one task per line into (steps, dependencies).
+
+    dependencies[i] lists the indices of earlier steps that step i waits for.
+    A line without an [after: ...] annotation waits for the previous step,
+    so an unannotated list runs in order exactly as before.
+    """
+    steps, deps = [], []
+    for line in text.splitlines():
+        line = _NUMBERING.sub("", line).strip()
+        if not line:
+            continue
+        match = _AFTER.search(line)
+        i = len(steps)
+        if match:
+            line = line[:match.start()].strip()
+            numbers = [int(n) - 1 for n in re.findall(r"\d+", match.group(1))]
+            deps.append(sorted({n for n in numbers if 0 <= n < i}))
+        else:
+            deps.append([i - 1] if i else [])
+        steps.append(line)
+    return steps, deps
+
+def normalize(deps, n: int):
+    """Valid dependencies for n steps; only earlier steps count, so the graph is always acyclic."""
+    if not deps or len(deps) != n:
+        return sequential(n)
+    return [sorted({d for d in step_deps if isinstance(d, int) and 0 <= d < i}) for i, step_deps in enumerate(deps)]
+
+def run_dag(n: int, deps, fn, max_workers: int = 1):
+    """Call fn(i) for every step once its dependencies finished; returns results in step order.
+
+    Ready steps run concurrently on up to max_workers threads. A step runs
+    once its dependencies are done whether or not they succeeded, matching
+    the sequential loop it replaces.
+    """
+    deps = normalize(deps, n)
+    results = [None] * n
+    remaining = {i: set(d) for i, d in enumerate(deps)}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="step") as pool:
+        running = {}
+        while remaining or running:
+            for i in sorted(i for i, d in remaining.items() if not d):
+                del remaining[i]
+                # In a copy of the caller's context, so contextvars (e.g. the current trace span) carry over
+                running[pool.submit(contextvars.copy_context().run, fn, i)] = i
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                results[i] = future.result()
+                for waiting in remaining.values():
+                    waiting.discard(i)
+    return results